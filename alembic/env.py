@@ -23,6 +23,9 @@ if config.config_file_name is not None:
 from etf_service.src.etf_service.app.database import Base  # Base.metadata used by autogenerate
 target_metadata = Base.metadata
 from etf_service.src.etf_service.app.models.holding_record import HoldingRecord
+from etf_service.src.etf_service.app.models.portfolio_summary import PortfolioDailySummary
+from etf_service.src.etf_service.app.models.ingest_job import IngestJob
+from etf_service.src.etf_service.app.models.upload_digest import UploadDigest
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
     context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
@@ -0,0 +1,43 @@
+"""add holding_record unique key on date, security_code, shareholder_account
+
+Revision ID: 5f2a9c7d1e34
+Revises: c08c46841348
+Create Date: 2026-10-18 11:30:12.417205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c7d1e34'
+down_revision: Union[str, Sequence[str], None] = 'c08c46841348'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 重复上传产生的重复行只保留最新（id 最大）的一条，否则无法建立唯一索引
+    op.execute(
+        """
+        DELETE FROM holding_record
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM holding_record
+            GROUP BY date, security_code, COALESCE(shareholder_account, '')
+        )
+        """
+    )
+    op.create_index(
+        'uq_holding_record_date_code_account',
+        'holding_record',
+        ['date', 'security_code', sa.text("coalesce(shareholder_account, '')")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_holding_record_date_code_account', table_name='holding_record')
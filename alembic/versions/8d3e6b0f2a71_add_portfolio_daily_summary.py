@@ -0,0 +1,40 @@
+"""add portfolio_daily_summary
+
+Revision ID: 8d3e6b0f2a71
+Revises: 5f2a9c7d1e34
+Create Date: 2026-10-18 12:05:41.903318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3e6b0f2a71'
+down_revision: Union[str, Sequence[str], None] = '5f2a9c7d1e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 建表后执行 python -m etf_service rebuild-summary 回填历史数据
+    op.create_table('portfolio_daily_summary',
+    sa.Column('date', sa.Date(), nullable=False, comment='持仓日期'),
+    sa.Column('position_count', sa.Integer(), nullable=False, comment='持仓证券数'),
+    sa.Column('total_market_value', sa.Float(), nullable=False, comment='总市值'),
+    sa.Column('total_cost', sa.Float(), nullable=False, comment='总持仓成本'),
+    sa.Column('total_holding_profit', sa.Float(), nullable=False, comment='总持仓盈亏'),
+    sa.Column('total_daily_profit', sa.Float(), nullable=False, comment='当日总盈亏'),
+    sa.Column('weights', sa.JSON(), nullable=True, comment='各证券市值占比 {证券代码: 占比}'),
+    sa.Column('create_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_time', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('date')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('portfolio_daily_summary')
@@ -0,0 +1,61 @@
+"""holding_record composite (security_code, date) covering index, optional monthly partitioning
+
+Revision ID: b4c7e2d9f018
+Revises: 8d3e6b0f2a71
+Create Date: 2026-10-18 13:20:07.551846
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from etf_service.app.database.partitioning import (
+    convert_to_partitioned,
+    convert_to_plain,
+    is_partitioned,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c7e2d9f018'
+down_revision: Union[str, Sequence[str], None] = '8d3e6b0f2a71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def partition_requested() -> bool:
+    """alembic -x partition=true upgrade head 时才转换为按月分区表"""
+    value = context.get_x_argument(as_dictionary=True).get("partition", "")
+    return value.lower() in ("1", "true", "yes")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_holding_record_code_date',
+        'holding_record',
+        ['security_code', 'date'],
+        postgresql_include=['holding_amount', 'cost_price'],
+    )
+    # 主键本身已有唯一索引；security_code 单列索引是新复合索引的前缀，
+    # date 单列索引是唯一索引 (date, security_code, coalesce(shareholder_account, '')) 的前缀
+    op.drop_index('ix_holding_record_id', table_name='holding_record')
+    op.drop_index('ix_holding_record_security_code', table_name='holding_record')
+    op.drop_index('ix_holding_record_date', table_name='holding_record')
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and partition_requested():
+        convert_to_partitioned(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and is_partitioned(bind):
+        convert_to_plain(bind)
+
+    op.create_index('ix_holding_record_date', 'holding_record', ['date'], unique=False)
+    op.create_index('ix_holding_record_security_code', 'holding_record', ['security_code'], unique=False)
+    op.create_index('ix_holding_record_id', 'holding_record', ['id'], unique=False)
+    op.drop_index('ix_holding_record_code_date', table_name='holding_record')
@@ -0,0 +1,42 @@
+"""add ingest_job
+
+Revision ID: c3d8f5a1b642
+Revises: b4c7e2d9f018
+Create Date: 2026-10-18 14:02:33.108415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8f5a1b642'
+down_revision: Union[str, Sequence[str], None] = 'b4c7e2d9f018'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingest_job',
+    sa.Column('id', sa.String(length=32), nullable=False, comment='任务 ID'),
+    sa.Column('filename', sa.String(length=255), nullable=False, comment='上传文件名'),
+    sa.Column('path', sa.String(length=500), nullable=False, comment='保存路径'),
+    sa.Column('upsert', sa.Boolean(), nullable=False, comment='是否按唯一键原地更新'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='queued/running/succeeded/failed'),
+    sa.Column('processed_rows', sa.Integer(), nullable=False, comment='已处理数据行数'),
+    sa.Column('result', sa.JSON(), nullable=True, comment='导入结果（各项计数、失败行、失败批次）'),
+    sa.Column('error', sa.Text(), nullable=True, comment='任务失败原因'),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True, comment='开始处理时间'),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+    sa.Column('create_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_time', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ingest_job')
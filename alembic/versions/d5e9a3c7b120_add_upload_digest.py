@@ -0,0 +1,49 @@
+"""add upload_digest and ingest_job.sha256
+
+Revision ID: d5e9a3c7b120
+Revises: c3d8f5a1b642
+Create Date: 2026-10-18 16:21:07.552301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e9a3c7b120'
+down_revision: Union[str, Sequence[str], None] = 'c3d8f5a1b642'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_digest',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False, comment='上传内容的 sha256'),
+    sa.Column('default_date', sa.Date(), nullable=True, comment='缺少日期的行补全使用的日期，文件自带全部日期时为空'),
+    sa.Column('filename', sa.String(length=255), nullable=False, comment='首次上传的文件名'),
+    sa.Column('size', sa.BigInteger(), nullable=False, comment='文件字节数'),
+    sa.Column('upsert', sa.Boolean(), nullable=False, comment='是否按唯一键原地更新'),
+    sa.Column('result', sa.JSON(), nullable=True, comment='首次导入的结果'),
+    sa.Column('create_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('update_time', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # NULL 在唯一约束中互不相等（PostgreSQL），default_date 为空时按固定日期参与唯一键
+    op.create_index(
+        'uq_upload_digest_sha256_default_date',
+        'upload_digest',
+        ['sha256', sa.text("coalesce(default_date, '1900-01-01')")],
+        unique=True,
+    )
+    op.add_column('ingest_job', sa.Column('sha256', sa.String(length=64), nullable=True, comment='上传内容的 sha256'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingest_job', 'sha256')
+    op.drop_index('uq_upload_digest_sha256_default_date', table_name='upload_digest')
+    op.drop_table('upload_digest')
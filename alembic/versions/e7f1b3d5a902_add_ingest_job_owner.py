@@ -0,0 +1,30 @@
+"""add ingest_job.owner and heartbeat_at
+
+Revision ID: e7f1b3d5a902
+Revises: d5e9a3c7b120
+Create Date: 2026-10-18 21:40:12.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1b3d5a902'
+down_revision: Union[str, Sequence[str], None] = 'd5e9a3c7b120'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingest_job', sa.Column('owner', sa.String(length=100), nullable=True, comment='创建任务的服务进程（主机名:pid:启动标识）'))
+    op.add_column('ingest_job', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True, comment='创建进程最近一次心跳，超时的未完成任务标记为 failed'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingest_job', 'heartbeat_at')
+    op.drop_column('ingest_job', 'owner')
@@ -0,0 +1,89 @@
+# benchmarks/bench_bulk_writer.py
+"""
+对比 holding_record 批量写入后端的吞吐量（rows/sec）
+
+用法:
+    DATABASE_URL=... python benchmarks/bench_bulk_writer.py --rows 50000 --repeat 3
+
+每次写入都在事务中执行后回滚，不会在目标库中留下数据。
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+import pandas as pd
+
+from etf_service.app.database.base import Base
+from etf_service.app.database.session import SessionLocal, engine
+from etf_service.app.services.bulk_writer import BULK_WRITERS, resolve_backend, write_batch
+from etf_service.app.services.holding_parser import BATCH_COLUMNS, HoldingBatch
+
+
+def make_batch(n: int, seed: int = 0) -> HoldingBatch:
+    rng = np.random.default_rng(seed)
+    start = date(2020, 1, 1)
+    price = rng.uniform(0.5, 10, n).round(3)
+    frame = pd.DataFrame({
+        "date": [start + timedelta(days=int(d)) for d in rng.integers(0, 2000, n)],
+        "security_code": rng.integers(510000, 520000, n),
+        "security_name": [f"ETF{i % 500}" for i in range(n)],
+        "holding_amount": rng.integers(100, 100000, n),
+        "available_amount": rng.integers(0, 100000, n),
+        "cost_price": price,
+        "latest_price": (price * rng.uniform(0.8, 1.2, n)).round(3),
+        "holding_profit_ratio": rng.normal(0, 10, n).round(2),
+        "holding_profit": rng.normal(0, 1000, n).round(2),
+        "daily_profit_ratio": rng.normal(0, 2, n).round(2),
+        "daily_profit": rng.normal(0, 100, n).round(2),
+        "avg_buy_price": price,
+        "position_ratio": rng.uniform(0, 100, n).round(2),
+        "latest_value": rng.uniform(1000, 1e6, n).round(2),
+        "market": "上海A股",
+        "shareholder_account": "A123456789",
+        "currency": "人民币",
+    })[BATCH_COLUMNS]
+    return HoldingBatch(frame=frame, total_rows=n)
+
+
+def available_backends():
+    """COPY 仅在 PostgreSQL + psycopg2 下可用"""
+    with SessionLocal() as db:
+        has_copy = resolve_backend(db, "auto") == "copy"
+    return [b for b in BULK_WRITERS if b != "copy" or has_copy]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="*", default=None, help="默认测试当前数据库可用的全部后端")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    batch = make_batch(args.rows)
+    backends = args.backends or available_backends()
+
+    results = {}
+    for backend in backends:
+        best = None
+        for _ in range(args.repeat):
+            with SessionLocal() as db:
+                stats = write_batch(db, batch, backend=backend)
+                db.rollback()
+            best = stats if best is None or stats.seconds < best.seconds else best
+        results[backend] = best
+
+    baseline = results.get("orm")
+    print(f"dialect={engine.dialect.name} rows={args.rows} repeat={args.repeat}")
+    print(f"{'backend':<12}{'seconds':>10}{'rows/sec':>14}{'vs orm':>10}")
+    for backend, stats in results.items():
+        speedup = f"{baseline.seconds / stats.seconds:.1f}x" if baseline else "-"
+        print(f"{backend:<12}{stats.seconds:>10.3f}{stats.rows_per_sec:>14.0f}{speedup:>10}")
+
+
+if __name__ == "__main__":
+    main()
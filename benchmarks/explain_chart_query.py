@@ -0,0 +1,167 @@
+# benchmarks/explain_chart_query.py
+"""
+图表查询的索引 / 分区方案对比（仅 PostgreSQL）
+
+在三个临时 schema 中生成相同的多年合成持仓数据（按日期顺序写入，与每日上传一致）:
+    legacy        原索引: id / date / security_code 单列索引
+    composite     (security_code, date) INCLUDE (holding_amount, cost_price) 复合覆盖索引
+    partitioned   复合覆盖索引 + 按月 RANGE 分区
+
+对图表查询执行 EXPLAIN (ANALYZE, BUFFERS)，输出计划节点、执行时间中位数和访问的缓冲页数，
+并测量写入一个交易日数据的耗时（索引越多写入越慢）。
+
+用法:
+    DATABASE_URL=postgresql+psycopg2://... python benchmarks/explain_chart_query.py --codes 300 --years 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import text
+
+from etf_service.app.database.partitioning import convert_to_partitioned
+from etf_service.app.database.session import engine
+from etf_service.app.models.holding_record import HoldingRecord
+
+LAYOUTS = ["legacy", "composite", "partitioned"]
+
+QUERIES = {
+    "chart_full": (
+        "SELECT date, holding_amount, cost_price FROM holding_record "
+        "WHERE security_code = :code ORDER BY date"
+    ),
+    "chart_1y": (
+        "SELECT date, holding_amount, cost_price FROM holding_record "
+        "WHERE security_code = :code AND date BETWEEN :start AND :end ORDER BY date"
+    ),
+    "chart_v1_all_columns": "SELECT * FROM holding_record WHERE security_code = :code ORDER BY date",
+}
+
+GENERATE_SQL = """
+INSERT INTO holding_record (
+    date, security_code, security_name, holding_amount, available_amount,
+    cost_price, latest_price, latest_value, holding_profit, market, currency
+)
+SELECT d::date, 510000 + c, 'ETF' || c, (random() * 100000)::int, (random() * 100000)::int,
+       1 + random() * 4, 1 + random() * 4, random() * 1e6, random() * 1e4 - 5e3, '上海A股', '人民币'
+FROM generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS d,
+     generate_series(1, :codes) AS c
+WHERE extract(isodow FROM d) < 6
+ORDER BY d, c
+"""
+
+
+def build_layout(conn, layout: str, start: date, end: date, codes: int):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS bench_{layout} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA bench_{layout}"))
+    conn.execute(text(f"SET search_path TO bench_{layout}"))
+    table = HoldingRecord.__table__
+    table.create(conn)
+    if layout == "legacy":
+        conn.execute(text("DROP INDEX ix_holding_record_code_date"))
+        conn.execute(text("CREATE INDEX ix_holding_record_id ON holding_record (id)"))
+        conn.execute(text("CREATE INDEX ix_holding_record_security_code ON holding_record (security_code)"))
+    conn.execute(text(GENERATE_SQL), {"start": start, "end": end, "codes": codes})
+    if layout == "partitioned":
+        convert_to_partitioned(conn, months_ahead=1)
+    conn.execute(text("COMMIT"))
+    conn.execute(text("VACUUM ANALYZE holding_record"))
+
+
+def plan_nodes(plan: dict) -> list:
+    nodes = [plan["Node Type"] + (f" ({plan['Index Name']})" if "Index Name" in plan else "")]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def summarize_nodes(nodes: list) -> str:
+    """合并各月分区上的同类节点: Index Only Scan (holding_record_yYYYYmMM_...) x60"""
+    counts: dict = {}
+    for node in nodes:
+        node = re.sub(r"_y\d{4}m\d{2}", "_yYYYYmMM", node)
+        counts[node] = counts.get(node, 0) + 1
+    return " > ".join(n if c == 1 else f"{n} x{c}" for n, c in counts.items())
+
+
+def explain(conn, sql: str, params: dict, repeat: int) -> dict:
+    times, result = [], None
+    for _ in range(repeat):
+        result = conn.execute(
+            text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), params
+        ).scalar()[0]
+        times.append(result["Execution Time"])
+    plan = result["Plan"]
+    return {
+        "execution_ms": round(statistics.median(times), 3),
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "rows": plan["Actual Rows"],
+        "nodes": plan_nodes(plan),
+    }
+
+
+def write_one_day(conn, day: date, codes: int) -> float:
+    start = time.perf_counter()
+    conn.execute(text(GENERATE_SQL), {"start": day, "end": day, "codes": codes})
+    conn.execute(text("COMMIT"))
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=300, help="证券数量")
+    parser.add_argument("--years", type=int, default=5, help="数据年数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询执行次数，取中位数")
+    parser.add_argument("--output", help="结果保存为 JSON 文件")
+    parser.add_argument("--keep", action="store_true", help="保留临时 schema")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("仅支持 PostgreSQL")
+
+    end = date(2025, 12, 31)
+    start = date(end.year - args.years + 1, 1, 1)
+    code = 510000 + args.codes // 2
+    params = {"code": code, "start": date(end.year, 1, 1), "end": end}
+    results = {"codes": args.codes, "start": str(start), "end": str(end), "layouts": {}}
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for layout in LAYOUTS:
+            t0 = time.perf_counter()
+            build_layout(conn, layout, start, end, args.codes)
+            rows = conn.execute(text("SELECT count(*) FROM holding_record")).scalar()
+            size = conn.execute(text(
+                "SELECT pg_size_pretty(sum(pg_total_relation_size(c.oid))) FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')"
+            )).scalar()
+            entry = {
+                "rows": rows,
+                "total_size": size,
+                "build_seconds": round(time.perf_counter() - t0, 2),
+                "queries": {name: explain(conn, sql, params, args.repeat) for name, sql in QUERIES.items()},
+                "write_one_day_ms": round(write_one_day(conn, date(end.year + 1, 1, 5), args.codes), 2),
+            }
+            results["layouts"][layout] = entry
+            print(f"\n== {layout}: {rows} 行, {size}")
+            for name, q in entry["queries"].items():
+                print(f"  {name:<22} {q['execution_ms']:>9.3f} ms  buffers={q['buffers']:<6} {summarize_nodes(q['nodes'])}")
+            print(f"  write one day          {entry['write_one_day_ms']:>9.2f} ms")
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA bench_{layout} CASCADE"))
+        conn.execute(text("SET search_path TO DEFAULT"))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
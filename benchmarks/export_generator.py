@@ -0,0 +1,142 @@
+# benchmarks/export_generator.py
+"""
+合成券商持仓导出文件（制表符分隔，表头与 HoldingRecordCreate 的中文别名一致）
+
+- 每个交易日每只证券一行（股东账号按市场固定），(日期, 证券代码, 股东账号) 不重复
+- 盈亏比例、仓位为带 % 的字符串，可选字段按比例留空
+- 可按比例混入无法解析的脏数据行，编码可选 utf-8 / utf-8-sig / gbk（gbk 时使用 CRLF 换行）
+
+用法:
+    python benchmarks/export_generator.py --rows 100000 --codes 300 --encoding gbk -o /tmp/export.txt
+"""
+import argparse
+import io
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+import pandas as pd
+
+from etf_service.app.services.holding_parser import REQUIRED_COLUMNS
+
+HEADERS = [
+    "证券代码", "证券名称", "持仓数量", "可用数量", "成本价", "最新价",
+    "持仓盈亏比例", "持仓盈亏", "当日盈亏比例", "当日盈亏", "买入均价", "个股仓位",
+    "最新市值", "交易市场", "股东账号", "币种",
+]
+NAME_PREFIXES = ["沪深300", "中证500", "创业板", "科创50", "红利", "恒生科技", "纳指", "黄金", "医药", "半导体"]
+ACCOUNTS = {"上海A股": "A123456789", "深圳A股": "0123456789"}
+
+
+def trading_days(count: int, start: date = date(2020, 1, 2)) -> pd.DatetimeIndex:
+    return pd.bdate_range(start=start, periods=count)
+
+
+def generate_frame(
+    rows: int,
+    codes: int = 300,
+    seed: int = 0,
+    blank_ratio: float = 0.05,
+    bad_ratio: float = 0.0,
+    with_date: bool = True,
+) -> pd.DataFrame:
+    """生成约 rows 行的导出内容（字符串 DataFrame，列名为中文表头）"""
+    rng = np.random.default_rng(seed)
+    codes = max(1, min(codes, rows))
+    days = -(-rows // codes)
+    code_values = np.concatenate([
+        rng.choice(np.arange(510000, 520000), codes // 2, replace=False),
+        rng.choice(np.arange(159000, 160000), codes - codes // 2, replace=False),
+    ])
+    day_index = np.repeat(np.arange(days), codes)[:rows]
+    code_index = np.tile(np.arange(codes), days)[:rows]
+    code = code_values[code_index]
+    market = np.where(code >= 500000, "上海A股", "深圳A股")
+
+    # 每只证券一条随机游走价格序列
+    walk = np.exp(np.cumsum(rng.normal(0, 0.015, (codes, days)), axis=1)) * rng.uniform(0.5, 5, (codes, 1))
+    latest = walk[code_index, day_index]
+    cost = latest * rng.uniform(0.8, 1.2, rows)
+    prev = latest / (1 + rng.normal(0, 0.015, rows))
+    qty = rng.integers(1, 1000, rows) * 100
+    available = np.minimum(qty, rng.integers(0, 1000, rows) * 100)
+    value = latest * qty
+
+    frame = pd.DataFrame({
+        "证券代码": code.astype(str),
+        "证券名称": [f"{NAME_PREFIXES[c % len(NAME_PREFIXES)]}ETF{c % 97:02d}" for c in code_index],
+        "持仓数量": qty.astype(str),
+        "可用数量": available.astype(str),
+        "成本价": np.round(cost, 3).astype(str),
+        "最新价": np.round(latest, 3).astype(str),
+        "持仓盈亏比例": pd.Series(np.round((latest / cost - 1) * 100, 2)).map("{:.2f}%".format),
+        "持仓盈亏": np.round((latest - cost) * qty, 2).astype(str),
+        "当日盈亏比例": pd.Series(np.round((latest / prev - 1) * 100, 2)).map("{:.2f}%".format),
+        "当日盈亏": np.round((latest - prev) * qty, 2).astype(str),
+        "买入均价": np.round(cost, 3).astype(str),
+        "个股仓位": pd.Series(rng.uniform(0, 30, rows).round(2)).map("{:.2f}%".format),
+        "最新市值": np.round(value, 2).astype(str),
+        "交易市场": market,
+        "股东账号": [ACCOUNTS[m] for m in market],
+        "币种": "人民币",
+    })[HEADERS]
+
+    optional = [h for h in HEADERS if h not in REQUIRED_COLUMNS]
+    for column in optional:
+        blank = rng.random(rows) < blank_ratio
+        frame.loc[blank, column] = ""
+
+    if bad_ratio > 0:
+        bad = np.flatnonzero(rng.random(rows) < bad_ratio)
+        frame.loc[bad[0::3], "持仓数量"] = "N/A"
+        frame.loc[bad[1::3], "成本价"] = ""
+        frame.loc[bad[2::3], "证券代码"] = "ETF"
+
+    if with_date:
+        frame.insert(0, "date", trading_days(days)[day_index].strftime("%Y-%m-%d"))
+    return frame
+
+
+def generate_export(
+    rows: int,
+    codes: int = 300,
+    seed: int = 0,
+    encoding: str = "utf-8",
+    blank_ratio: float = 0.05,
+    bad_ratio: float = 0.0,
+    with_date: bool = True,
+) -> bytes:
+    """生成导出文件内容（bytes）"""
+    frame = generate_frame(rows, codes, seed, blank_ratio, bad_ratio, with_date)
+    buf = io.StringIO()
+    line_end = "\r\n" if encoding.lower() == "gbk" else "\n"
+    frame.to_csv(buf, sep="\t", index=False, lineterminator=line_end)
+    return buf.getvalue().encode(encoding)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--codes", type=int, default=300, help="证券数量")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--encoding", default="utf-8", choices=["utf-8", "utf-8-sig", "gbk"])
+    parser.add_argument("--blank-ratio", type=float, default=0.05, help="可选字段留空比例")
+    parser.add_argument("--bad-ratio", type=float, default=0.0, help="脏数据行比例")
+    parser.add_argument("--no-date", action="store_true", help="不输出 date 列（单日导出）")
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    content = generate_export(
+        args.rows, args.codes, args.seed, args.encoding,
+        args.blank_ratio, args.bad_ratio, with_date=not args.no_date,
+    )
+    with open(args.output, "wb") as f:
+        f.write(content)
+    print(f"已生成 {args.output}: {args.rows} 行, {len(content) / 1e6:.1f} MB, {args.encoding}")
+
+
+if __name__ == "__main__":
+    main()
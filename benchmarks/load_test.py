@@ -0,0 +1,74 @@
+# benchmarks/load_test.py
+"""
+读接口并发压测：统计吞吐量（req/s）和 p50/p99 延迟
+
+用法（先启动服务）:
+    uvicorn etf_service.app.main:app --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 64 --requests 5000
+
+分别对同步 Session 版本和 AsyncSession 版本的服务执行，即可比较两者在相同并发下的吞吐差异。
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, paths, queue: asyncio.Queue, latencies, errors):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        path = random.choice(paths)
+        start = time.perf_counter()
+        try:
+            resp = await client.get(path)
+            if resp.status_code >= 500:
+                errors.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, concurrency: int, total: int, codes_limit: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        codes = (await client.get("/api/v1/holding/security-codes")).json()[:codes_limit]
+        paths = ["/api/v1/holding/security-codes"] + [f"/api/v1/holding/chart/{c}" for c in codes]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+        latencies, errors = [], []
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, paths, queue, latencies, errors) for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def p(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    print(f"url={url} concurrency={concurrency} requests={total} codes={len(codes)}")
+    print(f"throughput: {total / elapsed:.1f} req/s  elapsed: {elapsed:.2f}s  errors: {len(errors)}")
+    print(f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={p(0.5):.1f} p99={p(0.99):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--codes", type=int, default=20, help="参与压测的证券代码数量")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.codes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# benchmarks/run_benchmarks.py
+"""
+解析 / 入库 / 查询全链路基准测试
+
+用合成券商导出文件（export_generator.py）依次测量:
+    parse_whole        parse_excel 整文件解析
+    parse_stream       iter_holding_batches 分块解析（每块一个样本）
+    insert             insert_records_bulk 分块写入（每块一个样本）
+    upsert_unchanged   upsert_records_bulk 重复导入同一文件（全部未变化）
+    chart_v1           GET /api/v1/holding/chart/{code}（关闭响应缓存）
+    chart_v1_cached    同上，开启响应缓存
+    chart_v2           GET /api/v2/holding/chart/{code}
+    security_codes     GET /api/v1/holding/security-codes（关闭响应缓存）
+每个阶段输出 rows/sec（查询阶段为 req/s）、p50/p99 延迟和阶段内进程峰值 RSS，结果保存为 JSON。
+
+用法:
+    python benchmarks/run_benchmarks.py --rows 100000                   # 临时 SQLite
+    python benchmarks/run_benchmarks.py --database-url postgresql+psycopg2://... --reset
+    python benchmarks/run_benchmarks.py --rows 100000 --compare benchmarks/results/baseline.json
+
+指定 --database-url 时会写入 holding_record，目标表非空时需要 --reset 清空（只用于测试库）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class PeakRSS:
+    """后台线程每 5ms 采样一次 /proc/self/statm，记录阶段内的峰值 RSS（MB）"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except OSError:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak / 1024 / 1024
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def stage_result(units: int, seconds: float, samples, peak_mb: float) -> dict:
+    samples_ms = [s * 1000 for s in samples]
+    return {
+        "units": units,
+        "seconds": round(seconds, 4),
+        "per_sec": round(units / seconds, 1) if seconds > 0 else 0.0,
+        "samples": len(samples_ms),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 0.5), 3),
+        "p99_ms": round(percentile(samples_ms, 0.99), 3),
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def run_ingest_stages(content: bytes, batch_size: int) -> dict:
+    import io
+
+    from starlette.datastructures import UploadFile
+
+    from etf_service.app.database.session import SessionLocal
+    from etf_service.app.services.holding_parser import iter_holding_batches
+    from etf_service.app.services.holding_record_service import (
+        insert_records_bulk, parse_excel, upsert_records_bulk
+    )
+
+    stages = {}
+    with PeakRSS() as rss:
+        batch, seconds = timed(lambda: parse_excel(UploadFile(io.BytesIO(content), filename="bench.txt")))
+    stages["parse_whole"] = stage_result(batch.total_rows, seconds, [seconds], rss.peak_mb)
+    del batch
+
+    with PeakRSS() as rss:
+        batches, samples = [], []
+        iterator = iter_holding_batches(io.BytesIO(content), batch_size)
+        while True:
+            start = time.perf_counter()
+            chunk = next(iterator, None)
+            if chunk is None:
+                break
+            samples.append(time.perf_counter() - start)
+            batches.append(chunk)
+    rows = sum(b.total_rows for b in batches)
+    stages["parse_stream"] = stage_result(rows, sum(samples), samples, rss.peak_mb)
+
+    for name, write in (("insert", insert_records_bulk), ("upsert_unchanged", upsert_records_bulk)):
+        samples = []
+        with PeakRSS() as rss, SessionLocal() as db:
+            for chunk in batches:
+                samples.append(timed(lambda: write(db, chunk, raise_on_error=True))[1])
+        stages[name] = stage_result(sum(len(b) for b in batches), sum(samples), samples, rss.peak_mb)
+    return stages
+
+
+async def run_query_stages(requests: int, seed: int = 0) -> dict:
+    import httpx
+
+    from etf_service.app.cache import response_cache
+    from etf_service.app.main import app
+
+    rng = random.Random(seed)
+    stages = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        codes = (await client.get("/api/v1/holding/security-codes")).json()
+        plans = {
+            "chart_v1": (False, lambda: f"/api/v1/holding/chart/{rng.choice(codes)}"),
+            "chart_v1_cached": (True, lambda: f"/api/v1/holding/chart/{rng.choice(codes)}"),
+            "chart_v2": (False, lambda: f"/api/v2/holding/chart/{rng.choice(codes)}"),
+            "security_codes": (False, lambda: "/api/v1/holding/security-codes"),
+        }
+        for name, (cached, path) in plans.items():
+            response_cache.enabled = cached
+            response_cache.backend.clear()
+            samples = []
+            with PeakRSS() as rss:
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    resp = await client.get(path())
+                    samples.append(time.perf_counter() - start)
+                    if resp.status_code != 200:
+                        raise RuntimeError(f"{name}: HTTP {resp.status_code} {resp.text[:200]}")
+            stages[name] = stage_result(requests, sum(samples), samples, rss.peak_mb)
+    return stages
+
+
+def prepare_database(reset: bool):
+    from sqlalchemy import func, select
+
+    from etf_service.app.database.base import Base
+    from etf_service.app.database.session import SessionLocal, engine
+    from etf_service.app.models.holding_record import HoldingRecord
+    from etf_service.app.models.portfolio_summary import PortfolioDailySummary
+    import etf_service.app.models.ingest_job  # noqa: F401
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        count = db.scalar(select(func.count()).select_from(HoldingRecord))
+        if count and not reset:
+            raise SystemExit(f"holding_record 已有 {count} 行，基准测试需要空表（使用 --reset 清空测试库）")
+        db.query(HoldingRecord).delete()
+        db.query(PortfolioDailySummary).delete()
+        db.commit()
+    return engine.dialect.name
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """对比两次结果，返回回退超过 threshold 的阶段描述"""
+    regressions = []
+    print(f"\n对比基准 {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')})")
+    print(f"{'stage':<18}{'per_sec':>12}{'Δ':>9}{'p99_ms':>10}{'Δ':>9}")
+    for name, stage in current["stages"].items():
+        old = baseline["stages"].get(name)
+        if not old:
+            continue
+        speed = stage["per_sec"] / old["per_sec"] - 1 if old["per_sec"] else 0.0
+        p99 = stage["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0.0
+        print(f"{name:<18}{stage['per_sec']:>12.1f}{speed:>+9.1%}{stage['p99_ms']:>10.2f}{p99:>+9.1%}")
+        if speed < -threshold or p99 > threshold:
+            regressions.append(f"{name}: 吞吐 {speed:+.1%}, p99 {p99:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--codes", type=int, default=300)
+    parser.add_argument("--encoding", default="utf-8", choices=["utf-8", "utf-8-sig", "gbk"])
+    parser.add_argument("--bad-ratio", type=float, default=0.001, help="脏数据行比例")
+    parser.add_argument("--batch-size", type=int, default=5000, help="分块解析/写入的行数")
+    parser.add_argument("--requests", type=int, default=300, help="每个查询阶段的请求数")
+    parser.add_argument("--database-url", help="目标数据库，默认使用临时 SQLite 文件")
+    parser.add_argument("--reset", action="store_true", help="清空目标库中的 holding_record")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/bench-<时间>.json")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对变化")
+    args = parser.parse_args()
+
+    # 未指定 --database-url 时总是使用临时 SQLite，避免误写 .env 中配置的数据库
+    tmp_db = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp_db = os.path.join(tempfile.mkdtemp(prefix="etf-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp_db}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    # 每个批次的 INFO 日志会淹没输出
+    import logging
+    for name in ("etf_service", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    from export_generator import generate_export
+
+    content = generate_export(args.rows, args.codes, encoding=args.encoding, bad_ratio=args.bad_ratio)
+    dialect = prepare_database(args.reset or tmp_db is not None)
+
+    stages = run_ingest_stages(content, args.batch_size)
+    stages.update(asyncio.run(run_query_stages(args.requests)))
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "dialect": dialect,
+            "rows": args.rows,
+            "codes": args.codes,
+            "encoding": args.encoding,
+            "file_mb": round(len(content) / 1e6, 2),
+            "batch_size": args.batch_size,
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "stages": stages,
+    }
+
+    print(f"dialect={dialect} rows={args.rows} file={result['meta']['file_mb']}MB revision={result['meta']['revision']}")
+    print(f"{'stage':<18}{'per_sec':>12}{'p50_ms':>10}{'p99_ms':>10}{'peak_rss_mb':>13}")
+    for name, stage in stages.items():
+        print(f"{name:<18}{stage['per_sec']:>12.1f}{stage['p50_ms']:>10.2f}{stage['p99_ms']:>10.2f}{stage['peak_rss_mb']:>13.1f}")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+    if tmp_db:
+        shutil.rmtree(os.path.dirname(tmp_db), ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print("性能回退:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
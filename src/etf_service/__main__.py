@@ -0,0 +1,154 @@
+# src/etf_service/__main__.py
+"""
+命令行入口: python -m etf_service <command>
+
+    rebuild-summary     按日期区间分块重建 portfolio_daily_summary
+    ensure-partitions   为按月分区的 holding_record 预建后续月份分区
+    backfill            并行、可断点续传地回填目录下的历史导出文件
+    snapshot            增量导出 holding_record 的 Parquet 快照
+    serve               启动多 worker 的 API 服务（按连接预算分配连接池）
+"""
+import argparse
+from datetime import date
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须为正整数: {value}")
+    return number
+
+
+def rebuild_summary_command(args):
+    from etf_service.app.database.session import SessionLocal
+    from etf_service.app.services.portfolio_summary_service import rebuild_summary
+
+    with SessionLocal() as db:
+        days = rebuild_summary(db, args.start, args.end, chunk_days=args.chunk_days)
+    print(f"组合汇总重建完成，共 {days} 天")
+
+
+def ensure_partitions_command(args):
+    from etf_service.app.database.partitioning import ensure_future_partitions
+    from etf_service.app.database.session import engine
+
+    with engine.begin() as conn:
+        created = ensure_future_partitions(conn, months_ahead=args.months_ahead)
+    print(f"新建分区 {created} 个")
+
+
+def backfill_command(args):
+    from etf_service.app.events import event_broker
+    from etf_service.app.services.backfill_service import run_backfill
+
+    # 写入后发布导入事件，服务进程据此失效缓存
+    event_broker.start()
+    try:
+        stats = run_backfill(
+            args.directory,
+            workers=args.workers,
+            writers=args.writers,
+            max_in_flight=args.max_in_flight,
+            manifest_path=args.manifest,
+            suffix=tuple(s.strip() for s in args.suffix.split(",")),
+            upsert=not args.no_upsert,
+        )
+    except KeyboardInterrupt:
+        print("回填已中断，已完成的文件记录在清单中，重新执行相同命令即可继续")
+        raise SystemExit(130)
+    finally:
+        event_broker.close()
+    print(
+        f"回填完成：文件 {stats.files} 个（完成 {stats.done}，跳过 {stats.skipped}，失败 {stats.failed}），"
+        f"导入 {stats.rows} 行，解析失败 {stats.failed_rows} 行，"
+        f"耗时 {stats.seconds:.1f}s，{stats.rows_per_sec:.0f} 行/秒"
+    )
+    if stats.failed:
+        raise SystemExit(1)
+
+
+def snapshot_command(args):
+    from etf_service.app.database.session import SessionLocal
+    from etf_service.app.services.snapshot_service import export_snapshot
+    from etf_service.config import SNAPSHOT_DIR
+
+    stats = export_snapshot(SessionLocal, root=args.dir or SNAPSHOT_DIR, full=args.full)
+    if stats.skipped:
+        print("已有快照导出正在进行，本次跳过")
+        raise SystemExit(1)
+    print(
+        f"快照导出完成：{stats.partitions} 个分区，重写 {len(stats.written)}，未变化 {stats.unchanged}，"
+        f"删除 {len(stats.removed)}，{stats.rows} 行，耗时 {stats.seconds:.1f}s"
+    )
+
+
+def serve_command(args):
+    from etf_service.app.server import serve
+
+    try:
+        serve(
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            keepalive=args.keepalive,
+            backlog=args.backlog,
+            graceful_timeout=args.graceful_timeout,
+            max_connections=args.db_max_connections,
+        )
+    except ValueError as e:
+        print(f"启动失败：{e}")
+        raise SystemExit(2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m etf_service")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-summary", help="重建每日组合汇总表")
+    rebuild.add_argument("--start", type=date.fromisoformat, default=None, help="起始日期，默认最早持仓日期")
+    rebuild.add_argument("--end", type=date.fromisoformat, default=None, help="结束日期，默认最晚持仓日期")
+    rebuild.add_argument("--chunk-days", type=positive_int, default=31, help="每次重建并提交的天数")
+    rebuild.set_defaults(func=rebuild_summary_command)
+
+    partitions = commands.add_parser("ensure-partitions", help="预建 holding_record 月分区（仅分区表）")
+    partitions.add_argument("--months-ahead", type=int, default=3, help="从本月起预建的月数")
+    partitions.set_defaults(func=ensure_partitions_command)
+
+    backfill = commands.add_parser("backfill", help="回填目录下的历史导出文件（日期取自文件名或 date 列）")
+    backfill.add_argument("directory", help="导出文件目录（递归扫描）")
+    backfill.add_argument("--workers", type=int, default=None, help="解析进程数，默认 CPU 核数")
+    backfill.add_argument("--writers", type=int, default=2, help="写入线程数（同时占用的数据库连接数）")
+    backfill.add_argument("--max-in-flight", type=int, default=None, help="已提交未完成的文件数上限")
+    backfill.add_argument("--manifest", default=None, help="清单文件路径，默认 <目录>/.backfill_manifest.json")
+    backfill.add_argument("--suffix", default=".txt", help="导入的文件后缀，多个用逗号分隔（如 .txt,.xlsx,.xls）")
+    backfill.add_argument("--no-upsert", action="store_true", help="直接插入，不按唯一键更新已存在的记录")
+    backfill.set_defaults(func=backfill_command)
+
+    snapshot = commands.add_parser("snapshot", help="增量导出 holding_record 的 Parquet 快照（需要 pyarrow）")
+    snapshot.add_argument("--dir", default=None, help="快照目录，默认 SNAPSHOT_DIR")
+    snapshot.add_argument("--full", action="store_true", help="全部重写，不比较各月指纹")
+    snapshot.set_defaults(func=snapshot_command)
+
+    from etf_service import config
+
+    serve = commands.add_parser("serve", help="启动 API 服务（uvicorn 多 worker，优雅关闭）")
+    serve.add_argument("--host", default=config.APP_HOST, help="监听地址，默认 APP_HOST")
+    serve.add_argument("--port", type=int, default=config.APP_PORT, help="监听端口，默认 APP_PORT")
+    serve.add_argument("--workers", type=int, default=config.WEB_WORKERS, help="worker 进程数，0 为 CPU 核数，默认 WEB_WORKERS")
+    serve.add_argument("--keepalive", type=int, default=config.WEB_KEEPALIVE, help="空闲 keep-alive 连接保持秒数")
+    serve.add_argument("--backlog", type=int, default=config.WEB_BACKLOG, help="监听队列长度")
+    serve.add_argument(
+        "--graceful-timeout", type=int, default=config.WEB_GRACEFUL_TIMEOUT, help="关闭时等待进行中请求的秒数"
+    )
+    serve.add_argument(
+        "--db-max-connections", type=int, default=config.DB_MAX_CONNECTIONS,
+        help="全部 worker 合计的数据库连接上限，0 不限制（使用 DB_POOL_SIZE 等设置）",
+    )
+    serve.set_defaults(func=serve_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
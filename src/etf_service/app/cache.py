@@ -0,0 +1,138 @@
+# src/etf_service/app/cache.py
+"""
+图表 / 证券代码接口的响应缓存
+
+- 缓存已序列化的 JSON 响应体和对应 ETag，按证券代码分 key
+- 默认后端为进程内 LRU（按条目数限制大小）；多 worker 部署可通过
+  set_backend 换成共享后端（实现 CacheBackend 的 get/set/delete 即可）
+- 导入数据后调用 invalidate_codes，只失效受影响证券代码的缓存
+- 未命中时先取 generation 再查库，put 时传回；期间发生过失效则不写入缓存，
+  避免在导入提交前读到的旧数据在失效之后才写入、一直被当作最新结果返回
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import FrozenSet, Iterable, Optional, Protocol
+
+import orjson
+from fastapi import Request, Response
+
+from etf_service.config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES
+
+SECURITY_CODES_KEY = "security-codes"
+
+
+def chart_key(security_code: int) -> str:
+    return f"chart:{security_code}"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    body: bytes
+    etag: str
+    # 证券代码列表的缓存记录其包含的代码，用于判断导入后是否需要失效
+    codes: FrozenSet[int] = field(default_factory=frozenset)
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[CacheEntry]: ...
+    def set(self, key: str, entry: CacheEntry) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def clear(self) -> None: ...
+
+
+class LRUCacheBackend:
+    """进程内 LRU，线程安全（导入在线程池中完成并触发失效）"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        # 每次失效加一；检查和写入在同一把锁内，与失效互斥
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self.backend.get(key) if self.enabled else None
+
+    def put(self, key: str, payload, codes: Iterable[int] = (), generation: Optional[int] = None) -> CacheEntry:
+        """
+        序列化 payload 并写入缓存，返回带 ETag 的缓存项
+        generation 为查库前取得的 self.generation，之后发生过失效时只返回缓存项、不写入
+        """
+        body = orjson.dumps(payload)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = CacheEntry(body=body, etag=etag, codes=frozenset(codes))
+        if self.enabled:
+            with self._lock:
+                if generation is None or generation == self.generation:
+                    self.backend.set(key, entry)
+        return entry
+
+    def invalidate_codes(self, codes: Iterable[int]) -> None:
+        """失效这些证券代码的图表缓存；出现新代码时同时失效证券代码列表"""
+        codes = {int(c) for c in codes}
+        if not codes or not self.enabled:
+            return
+        with self._lock:
+            self.generation += 1
+            for code in codes:
+                self.backend.delete(chart_key(code))
+            listed = self.backend.get(SECURITY_CODES_KEY)
+            if listed is not None and not codes <= listed.codes:
+                self.backend.delete(SECURITY_CODES_KEY)
+
+    def clear(self) -> None:
+        """失效全部缓存（无法确定受影响的证券时）"""
+        with self._lock:
+            self.generation += 1
+            self.backend.clear()
+
+    def set_backend(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+
+def cached_response(request: Request, entry: CacheEntry) -> Response:
+    """If-None-Match 命中时返回 304，否则返回缓存的 JSON 响应体（压缩后的弱 ETag 同样匹配）"""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(
+    LRUCacheBackend(RESPONSE_CACHE_MAX_ENTRIES), enabled=RESPONSE_CACHE_ENABLED
+)
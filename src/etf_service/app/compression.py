@@ -0,0 +1,227 @@
+# src/etf_service/app/compression.py
+"""
+响应压缩和静态文件缓存
+
+- CompressionMiddleware：纯 ASGI 中间件，按 Accept-Encoding 选择 br（安装了 brotli 时）或 gzip，
+  只压缩不小于 COMPRESSION_MIN_SIZE 字节的文本类响应（JSON、HTML、CSV 等）；
+  流式响应逐块压缩并 flush，SSE（text/event-stream）和已编码的响应原样透传；
+  压缩后的 ETag 改为弱校验（W/），与未压缩的表示区分
+- CachedStaticFiles：静态文件带 Cache-Control（HTML 每次协商，其余 STATIC_MAX_AGE 秒），
+  客户端接受时直接返回预压缩的 .br / .gz 文件（比原文件旧时忽略）
+- precompress_static：为静态目录中的文本类文件生成 .gz / .br（最高压缩级别，只在源文件更新后重新生成）
+"""
+import gzip
+import os
+import zlib
+from mimetypes import guess_type
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+
+from etf_service.app.logging_config import logger
+from etf_service.config import BROTLI_QUALITY, COMPRESSION_MIN_SIZE, GZIP_LEVEL, STATIC_MAX_AGE
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只用 gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/x-ndjson", "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon",
+)
+# 不压缩：逐条推送的事件流
+STREAMING_TYPES = ("text/event-stream",)
+PRECOMPRESS_SUFFIXES = (".html", ".css", ".js", ".json", ".svg", ".txt", ".map", ".ico")
+VARIANT_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+def supported_encodings() -> List[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str, available: Optional[List[str]] = None) -> Optional[str]:
+    """按 Accept-Encoding（含 q 值）从 available 中选择编码，同 q 值时按 available 的顺序优先"""
+    available = supported_encodings() if available is None else available
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(STREAMING_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._flush, self._finish = self._obj.process, self._obj.flush, self._obj.finish
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._obj.compress
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        out = self._compress(data)
+        return out + self._flush() if flush else out
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # 响应头可能是元组，复制为列表后才能原地修改
+                start_message = {**message, "headers": list(message.get("headers", []))}
+                return
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                # http.response.pathsend 等扩展消息：不压缩
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not _compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                if more_body:
+                    del headers["content-length"]
+                    await send(start_message)
+                else:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+            if more_body:
+                await send({"type": "http.response.body", "body": encoder.compress(body, flush=True), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": encoder.compress(body) + encoder.finish()})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class CachedStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope):
+        response = None
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is not None:
+            response = self._precompressed(path, encoding, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            cache = "no-cache" if path.endswith((".html", ".htm")) else f"public, max-age={STATIC_MAX_AGE}"
+            response.headers["Cache-Control"] = cache
+            response.headers.add_vary_header("Accept-Encoding")
+        return response
+
+    def _precompressed(self, path: str, encoding: str, scope):
+        """存在且不比原文件旧的 .br / .gz 文件，不存在时返回 None"""
+        source_path, source_stat = self.lookup_path(path)
+        if source_stat is None:
+            return None
+        full_path, stat = self.lookup_path(path + VARIANT_SUFFIX[encoding])
+        if stat is None or stat.st_mtime < source_stat.st_mtime:
+            return None
+        response = self.file_response(full_path, stat, scope)
+        if response.status_code == 200:
+            response.headers["Content-Type"] = guess_type(source_path)[0] or "application/octet-stream"
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def precompress_static(directory: str, minimum_size: int = COMPRESSION_MIN_SIZE) -> int:
+    """生成静态文件的预压缩版本，返回新生成的文件数"""
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith(PRECOMPRESS_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            if stat.st_size < minimum_size:
+                continue
+            for encoding in supported_encodings():
+                target = path + VARIANT_SUFFIX[encoding]
+                if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                if encoding == "br":
+                    data = brotli.compress(data, quality=11)
+                else:
+                    data = gzip.compress(data, compresslevel=9, mtime=0)
+                tmp = f"{target}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, target)
+                written += 1
+    if written:
+        logger.info(f"已生成 {written} 个预压缩静态文件")
+    return written
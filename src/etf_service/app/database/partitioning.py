@@ -0,0 +1,118 @@
+# app/database/partitioning.py
+"""
+holding_record 按月 RANGE 分区（仅 PostgreSQL，可选）
+
+分区表的主键和唯一索引都必须包含分区键，因此分区后主键为 (id, date)。
+每个月一个分区 holding_record_yYYYYmMM，另有 DEFAULT 分区兜底；
+新月份的分区需要提前创建（python -m etf_service ensure-partitions），
+否则数据会落入 DEFAULT 分区，之后再建对应月份分区会失败。
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# 与模型 / 迁移中保持一致的索引定义
+INDEX_DDL = [
+    "CREATE UNIQUE INDEX uq_{table}_date_code_account ON {table} "
+    "(date, security_code, coalesce(shareholder_account, ''))",
+    "CREATE INDEX ix_{table}_code_date ON {table} (security_code, date) "
+    "INCLUDE (holding_amount, cost_price)",
+]
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def is_partitioned(conn: Connection, table: str = "holding_record") -> bool:
+    return bool(conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": table},
+    ).scalar())
+
+
+def create_month_partitions(
+    conn: Connection, start: date, end: date, table: str = "holding_record"
+) -> int:
+    """为 [start, end] 覆盖的每个月创建分区（已存在则跳过），返回新建数量"""
+    created = 0
+    month = month_start(start)
+    while month <= end:
+        name = f"{table}_y{month.year}m{month.month:02d}"
+        exists = conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar()
+        if not exists:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+            ))
+            created += 1
+        month = next_month(month)
+    return created
+
+
+def convert_to_partitioned(
+    conn: Connection, months_ahead: int = 3, table: str = "holding_record"
+) -> None:
+    """把现有 holding_record 转换为按月分区表并迁移数据"""
+    old = f"{table}_unpartitioned"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(text(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey"))
+    for index in ("uq_{t}_date_code_account", "ix_{t}_date", "ix_{t}_code_date"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.format(t=table)}"))
+
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING COMMENTS) "
+        f"PARTITION BY RANGE (date)"
+    ))
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, date)"))
+    for ddl in INDEX_DDL:
+        conn.execute(text(ddl.format(table=table)))
+
+    first, last = conn.execute(text(f"SELECT min(date), max(date) FROM {old}")).one()
+    today = date.today()
+    first = first or today
+    last = max(last or today, today)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    create_month_partitions(conn, first, last, table=table)
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}"))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+
+def convert_to_plain(conn: Connection, table: str = "holding_record") -> None:
+    """分区表还原为普通表（迁移降级使用）"""
+    old = f"{table}_partitioned"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(text(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey"))
+    for index in ("uq_{t}_date_code_account", "ix_{t}_date", "ix_{t}_code_date"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.format(t=table)}"))
+
+    conn.execute(text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING COMMENTS)"))
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id)"))
+    for ddl in INDEX_DDL:
+        conn.execute(text(ddl.format(table=table)))
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}"))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {old} CASCADE"))
+
+
+def ensure_future_partitions(
+    conn: Connection, months_ahead: int = 3, today: Optional[date] = None
+) -> int:
+    """在分区表上预建从本月起 months_ahead 个月的分区；未分区时不做任何事"""
+    if not is_partitioned(conn):
+        return 0
+    start = month_start(today or date.today())
+    end = start
+    for _ in range(months_ahead):
+        end = next_month(end)
+    return create_month_partitions(conn, start, end)
@@ -1,11 +1,143 @@
 # app/database/session.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from etf_service.config import DATABASE_URL
+import time
+from typing import AsyncIterator
 
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
-# 设置 echo=False 生产中关闭，开发时可 True 便于调试
-engine = create_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+from etf_service.app.metrics import POOL_CHECKOUT_SECONDS, POOL_CONNECTIONS
+from etf_service.config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_SYNC_MAX_OVERFLOW,
+    DB_SYNC_POOL_SIZE,
+)
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """由同步连接地址推导异步驱动地址"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"不支持的异步数据库: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def pool_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW) -> dict:
+    """连接池参数；SQLite 使用 SQLAlchemy 默认的连接池"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    记录获取连接的等待时间（包装连接池的 _do_get，连接池已满时这里会阻塞），
+    并注册 checked_out / idle / overflow 连接数指标；dispose() 重建连接池后重新包装
+    """
+
+    def wrap(pool):
+        do_get = pool._do_get
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, engine=name)
+
+        pool._do_get = timed_do_get
+
+    def connections():
+        pool, stats = engine.pool, {}
+        for state, attr in (("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, attr):
+                # QueuePool.overflow() 在连接数未达 pool_size 时为负数
+                stats[(name, state)] = max(getattr(pool, attr)(), 0)
+        return stats
+
+    wrap(engine.pool)
+    event.listen(engine, "engine_disposed", lambda e: wrap(e.pool))
+    POOL_CONNECTIONS.set_function(connections, key=name)
+
+
+# 引擎在首次使用（或应用 lifespan 启动）时创建，导入本模块不会加载数据库驱动；
+# 会话工厂先创建，绑定在 init_engines() 中完成
+_engines: dict = {}
+_session_factory = sessionmaker(autoflush=False, autocommit=False, future=True)
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def init_engines() -> None:
+    """创建同步、异步引擎并绑定会话工厂（已创建时不做任何事）"""
+    if _engines:
+        return
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL not set")
+    # 设置 echo=False 生产中关闭，开发时可 True 便于调试
+    # 同步引擎：上传解析入库（线程池中执行，COPY 依赖 psycopg2）
+    engine = create_engine(
+        DATABASE_URL, echo=False, future=True,
+        **pool_options(DATABASE_URL, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW),
+    )
+    _session_factory.configure(bind=engine)
+    instrument_engine(engine, "sync")
+
+    # 异步引擎：API 读写接口
+    async_database_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(async_database_url, echo=False, **pool_options(async_database_url))
+    _async_session_factory.configure(bind=async_engine)
+    instrument_engine(async_engine.sync_engine, "async")
+    _engines.update(engine=engine, async_engine=async_engine)
+
+
+async def dispose_engines() -> None:
+    """关闭两个引擎的全部连接（应用关闭时调用），之后再次使用会重新创建"""
+    if not _engines:
+        return
+    _engines["engine"].dispose()
+    await _engines["async_engine"].dispose()
+    _engines.clear()
+
+
+def __getattr__(name: str):
+    # from etf_service.app.database.session import engine 时按需创建引擎
+    if name in ("engine", "async_engine"):
+        init_engines()
+        return _engines[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def SessionLocal() -> Session:
+    init_engines()
+    return _session_factory()
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    init_engines()
+    return _async_session_factory()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """路由共享的 AsyncSession 依赖"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,331 @@
+# src/etf_service/app/events.py
+"""
+导入事件的发布/订阅（供 SSE 推送，见 routers/events_api）
+
+- 写入持仓后发布 {"codes": 证券代码, "start": 最早日期, "end": 最晚日期, "rows": 行数, "source": 来源}，
+  前端据此只增量拉取受影响证券在 start 之后的数据
+- 默认后端为进程内直接投递；多 worker 部署时设置 EVENT_BACKEND=postgres，
+  通过 PostgreSQL LISTEN/NOTIFY 在各 worker 之间广播（也可通过 set_backend 换成其它实现，
+  实现 EventBackend 的 publish/start/close 即可）
+- 每个订阅者一个有界 asyncio.Queue；消费跟不上时丢弃事件并标记 lagged，由订阅方通知客户端全量刷新
+- 服务关闭时 close_subscriptions() 唤醒并结束全部订阅，长连接不拖住优雅关闭
+- 阻塞的后端（postgres）在事件循环中发布时放到默认线程池执行，不阻塞事件循环；
+  LISTEN 连接断开后按退避间隔重连，重连后通知全部订阅者全量刷新（断开期间的事件已丢失）
+- 事件带发布进程的 origin；add_listener 注册的回调只接收其它进程（其它 worker、回填命令）的事件，
+  用于失效本进程的响应缓存和时间序列存储（见 main.invalidate_caches）
+"""
+import asyncio
+import json
+import select
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, Optional, Protocol, Set
+
+from etf_service.app.logging_config import logger
+from etf_service.config import EVENT_BACKEND, EVENT_QUEUE_SIZE
+
+CHANNEL = "etf_ingest_events"
+# NOTIFY 负载上限 8000 字节，超出时省略证券代码（订阅方按全部证券处理）
+MAX_PAYLOAD_BYTES = 7900
+# LISTEN 连接断开后的重连间隔（秒），每次失败翻倍
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+class EventBackend(Protocol):
+    # publish 是否做阻塞 I/O（为 True 时在事件循环中发布会放到线程池执行）
+    blocking: bool
+
+    def publish(self, payload: str) -> None: ...
+    # deliver(None) 表示可能丢失了事件（如监听连接重连），订阅方应全量刷新
+    def start(self, deliver: Callable[[Optional[str]], None]) -> None: ...
+    def close(self) -> None: ...
+
+
+class LocalBackend:
+    """单进程：发布即投递给本进程的订阅者"""
+
+    blocking = False
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[Optional[str]], None]] = None
+
+    def publish(self, payload: str) -> None:
+        if self._deliver is not None:
+            self._deliver(payload)
+
+    def start(self, deliver: Callable[[Optional[str]], None]) -> None:
+        self._deliver = deliver
+
+    def close(self) -> None:
+        self._deliver = None
+
+
+class PostgresNotifyBackend:
+    """
+    PostgreSQL LISTEN/NOTIFY：发布时用连接池中的连接执行 pg_notify（任一 worker 或线程），
+    每个 worker 用一个脱离连接池的专用连接在后台线程中 LISTEN，断开后自动重连
+    """
+
+    blocking = True
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, payload: str) -> None:
+        from sqlalchemy import text
+
+        from etf_service.app.database.session import engine
+
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    def _connect(self):
+        from etf_service.app.database.session import engine
+
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        return conn
+
+    def start(self, deliver: Callable[[Optional[str]], None]) -> None:
+        # 首次连接在启动时完成，连不上数据库时启动失败
+        conn = self._connect()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen, args=(conn, deliver), name="event-listener", daemon=True
+        )
+        self._thread.start()
+
+    def _listen(self, conn, deliver: Callable[[Optional[str]], None]) -> None:
+        backoff = RECONNECT_MIN_SECONDS
+        while not self._stop.is_set():
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception as e:
+                    logger.warning(f"导入事件监听重连失败: {e}，{backoff:.0f}s 后重试")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+                    continue
+                logger.info("导入事件监听已重新连接")
+                backoff = RECONNECT_MIN_SECONDS
+                deliver(None)
+            try:
+                if select.select([conn], [], [], 1.0)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        deliver(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"导入事件监听连接断开: {e}")
+                _close_quietly(conn)
+                conn = None
+        if conn is not None:
+            _close_quietly(conn)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class Subscription:
+    """单个订阅者：有界队列，满时丢弃事件并标记 lagged"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(maxsize)
+        self.lagged = False
+        self.closed = False
+
+    def _lag(self) -> None:
+        # 在订阅者的事件循环线程中执行：标记需要全量刷新，并唤醒等待中的 get
+        self.lagged = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def _put(self, event: dict) -> None:
+        # 在订阅者的事件循环线程中执行
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def _close(self) -> None:
+        # 在订阅者的事件循环线程中执行；放入 None 唤醒等待中的 get（队列满时 get 不会阻塞）
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def drain(self) -> None:
+        """清空队列并清除 lagged 标记"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagged = False
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """等待下一个事件，超时或订阅已关闭时返回 None（以 closed 区分）"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    def __init__(self, backend: EventBackend, queue_size: int = 100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: List[Callable[[Optional[dict]], None]] = []
+        self._lock = threading.Lock()
+        self._started = False
+        # 本进程发布的事件带上 origin，监听回调据此跳过本进程的事件
+        self.origin = uuid.uuid4().hex
+
+    def start(self) -> None:
+        """开始接收后端的事件（应用 lifespan 启动时调用）"""
+        if not self._started:
+            self.backend.start(self._deliver)
+            self._started = True
+
+    def close(self) -> None:
+        if self._started:
+            self.backend.close()
+            self._started = False
+
+    def set_backend(self, backend: EventBackend) -> None:
+        started = self._started
+        self.close()
+        self.backend = backend
+        if started:
+            self.start()
+
+    def add_listener(self, listener: Callable[[Optional[dict]], None]) -> None:
+        """
+        注册其它进程发布的事件的回调（在后端线程中调用，重复注册只保留一个）
+        参数为 None 时表示可能丢失了事件，应按全部证券处理
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def _deliver(self, payload: Optional[str]) -> None:
+        """后端收到事件时调用（任意线程），投递到各订阅者所在的事件循环；payload 为 None 时通知全量刷新"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+        if not subscribers and not listeners:
+            return
+        event = json.loads(payload) if payload is not None else None
+        if event is None or event.get("origin") != self.origin:
+            for listener in listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"处理导入事件失败: {e}")
+        for sub in subscribers:
+            try:
+                if event is None:
+                    sub.loop.call_soon_threadsafe(sub._lag)
+                else:
+                    sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+    @contextmanager
+    def subscribe(self) -> Iterator[Subscription]:
+        """在事件循环中调用，退出时取消订阅"""
+        sub = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                self._subscribers.discard(sub)
+
+    def close_subscriptions(self) -> None:
+        """结束全部订阅（任意线程调用），订阅方在 closed 为 True 时退出"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._close)
+            except RuntimeError:
+                pass
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: dict) -> None:
+        """
+        发布事件；发布失败只记录日志，不影响写入
+        在事件循环中调用且后端会阻塞时，交给默认线程池执行后立即返回
+        """
+        if not self._started:
+            return
+        event = {**event, "origin": self.origin}
+        payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+            payload = json.dumps({**event, "codes": None}, ensure_ascii=False, separators=(",", ":"))
+        if self.backend.blocking:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                loop.run_in_executor(None, self._publish, self.backend, payload)
+                return
+        self._publish(self.backend, payload)
+
+    @staticmethod
+    def _publish(backend: EventBackend, payload: str) -> None:
+        try:
+            backend.publish(payload)
+        except Exception as e:
+            logger.warning(f"发布导入事件失败: {e}")
+
+    def publish_ingest(self, codes: Iterable[int], dates: Iterable[date], rows: int, source: str) -> None:
+        """发布一次写入涉及的证券代码和日期范围（没有新增或变化的行时不发布）"""
+        code_list: List[int] = sorted({int(c) for c in codes})
+        date_list = sorted(dates)
+        if not code_list or not date_list:
+            return
+        self.publish({
+            "codes": code_list,
+            "start": date_list[0].isoformat(),
+            "end": date_list[-1].isoformat(),
+            "rows": int(rows),
+            "source": source,
+        })
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _backend() -> EventBackend:
+    if EVENT_BACKEND == "postgres":
+        return PostgresNotifyBackend()
+    if EVENT_BACKEND != "local":
+        raise ValueError(f"EVENT_BACKEND 必须为 local / postgres，当前为 {EVENT_BACKEND}")
+    return LocalBackend()
+
+
+event_broker = EventBroker(_backend(), queue_size=EVENT_QUEUE_SIZE)
@@ -0,0 +1,33 @@
+# src/etf_service/app/executors.py
+"""
+上传解析/入库线程池
+
+首次使用时创建（导入本模块不启动线程），应用关闭时由 lifespan 等待执行中的任务后关闭
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from etf_service.app.metrics import EXECUTOR_QUEUE
+from etf_service.config import INGEST_WORKERS
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """可根据服务器CPU调整线程数（INGEST_WORKERS）"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+    return _executor
+
+
+def shutdown(wait: bool = True) -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+EXECUTOR_QUEUE.set_function(
+    lambda: {("ingest",): _executor._work_queue.qsize() if _executor is not None else 0}, key="ingest"
+)
@@ -0,0 +1,18 @@
+# src/etf_service/app/lifecycle.py
+"""
+服务进程的关闭状态
+
+收到 SIGTERM / SIGINT 后由 app/server.py 的 DrainingServer 调用 begin_drain()：
+/ready 返回 503，负载均衡器不再分配新请求；SSE 连接随即结束，浏览器重连到其它 worker
+在信号处理函数中调用，只设置标志，不加锁
+"""
+_draining = False
+
+
+def begin_drain() -> None:
+    global _draining
+    _draining = True
+
+
+def is_draining() -> bool:
+    return _draining
@@ -1,11 +1,157 @@
 # src/logging_config.py
+"""
+日志配置
+
+- LOG_FORMAT=json 时每条日志输出一行 JSON（ts / level / logger / msg / pid，extra 传入的字段原样并入），
+  text 为原来的单行文本格式
+- 导入时安装同步的 stderr handler（命令行、后台导入子进程直接使用）；服务进程在 lifespan 中调用
+  start_async_logging()，改为 QueueHandler 入队、后台线程格式化和写出，请求线程不做 I/O；
+  队列满（LOG_QUEUE_SIZE）时丢弃并计数，不阻塞调用方
+- 高频日志带 extra={"sample_key": ...} 时按 key 限流：LOG_SAMPLE_SECONDS 秒内只输出第一条，
+  下一条输出时带上期间省略的条数（suppressed）
+"""
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from etf_service.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_SECONDS
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# LogRecord 自带的属性，其余为 extra 传入的字段（color_message 为 uvicorn 终端着色用）
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "sample_key", "sampled", "color_message"
+}
+
+# 丢弃（队列满）和限流省略的日志条数，由 /metrics 输出
+counts = {"dropped": 0, "sampled": 0}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return orjson.dumps(data, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """按 sample_key 限流，没有 sample_key 的日志不受影响"""
+
+    def __init__(self, interval: float = LOG_SAMPLE_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        # 入队前已放行的日志（关闭异步日志时队列中剩余的）不再重复判断
+        if key is None or self.interval <= 0 or getattr(record, "sampled", False):
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, -self.interval) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                counts["sampled"] += 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        record.sampled = True
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃日志并计数；入队前只合并消息参数和异常文本，格式化在监听线程中完成"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            counts["dropped"] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+_stream_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_sampling = SamplingFilter()
+
+
+def setup_logging() -> None:
+    """安装同步的 stderr handler（重复调用不做任何事）"""
+    global _stream_handler
+    if _stream_handler is not None:
+        return
+    _stream_handler = logging.StreamHandler()
+    _stream_handler.setFormatter(_formatter())
+    _stream_handler.addFilter(_sampling)
+    root = logging.getLogger()
+    root.addHandler(_stream_handler)
+    root.setLevel(LOG_LEVEL)
+
+
+def start_async_logging() -> None:
+    """根 logger 改为入队，由后台线程写出（服务进程启动时调用）"""
+    global _listener
+    setup_logging()
+    if _listener is not None:
+        return
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    # 限流在入队前完成，被省略的日志不占队列
+    handler.addFilter(_sampling)
+    _stream_handler.removeFilter(_sampling)
+    _listener = logging.handlers.QueueListener(handler.queue, _stream_handler, respect_handler_level=True)
+    _listener.start()
+    root = logging.getLogger()
+    root.removeHandler(_stream_handler)
+    root.addHandler(handler)
+
+
+def stop_async_logging() -> None:
+    """写出队列中剩余的日志并恢复同步 handler（服务进程关闭时调用）"""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            root.removeHandler(handler)
+    _stream_handler.addFilter(_sampling)
+    root.addHandler(_stream_handler)
+    _listener.stop()
+    _listener = None
+
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-    )
 setup_logging()
 # 可创建全局 logger
-logger = logging.getLogger("etf_service")
\ No newline at end of file
+logger = logging.getLogger("etf_service")
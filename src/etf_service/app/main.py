@@ -1,26 +1,114 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
-from etf_service.app.logging_config import logger
-from etf_service.app.logging_config import setup_logging
-from fastapi.staticfiles import StaticFiles
+from etf_service.app.logging_config import logger, start_async_logging, stop_async_logging
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse
 import os
-from etf_service.config import UPLOAD_DIR
+from etf_service.config import (
+    COMPRESSION_ENABLED, METRICS_ENABLED, SERIES_STORE_ENABLED, SERIES_STORE_WARM,
+    SNAPSHOT_INTERVAL_SECONDS, STATIC_MAX_AGE, STATIC_PRECOMPRESS, UPLOAD_DIR
+)
+from etf_service.app.compression import CachedStaticFiles, CompressionMiddleware, precompress_static
+from etf_service.app.metrics import REGISTRY, MetricsMiddleware
 from etf_service.app.routers import holding_upload
 from etf_service.app.routers import holding_record_api
+from etf_service.app.routers import holding_chart_v2
+from etf_service.app.routers import portfolio_api
+from etf_service.app.routers import grid_api
+from etf_service.app.routers import snapshot_api
+from etf_service.app.routers import events_api
+from etf_service.app.services import ingest_job_service
+from etf_service.app import executors
+from etf_service.app.database.session import SessionLocal, dispose_engines, init_engines
+from etf_service.app.cache import response_cache
+from etf_service.app.events import event_broker
+from etf_service.app.lifecycle import is_draining
 
-setup_logging()
-app = FastAPI(title="etf_ingest_service")
+
+def invalidate_caches(event: Optional[dict]) -> None:
+    """
+    其它进程（其它 worker、回填命令）写入后失效本进程的响应缓存和时间序列存储
+    事件可能丢失（监听重连）或省略了证券代码时全部清空
+    """
+    codes = event.get("codes") if event is not None else None
+    if codes is None:
+        response_cache.clear()
+    else:
+        response_cache.invalidate_codes(codes)
+    if SERIES_STORE_ENABLED:
+        from etf_service.app.series_store import series_store
+
+        if codes is None:
+            series_store.clear()
+        else:
+            series_store.invalidate_codes(codes)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 导入阶段不创建引擎和线程池（pandas 等重依赖在首次使用时加载），worker 启动时再创建引擎
+    start_async_logging()
+    init_engines()
+    event_broker.add_listener(invalidate_caches)
+    event_broker.start()
+    # 刷新本进程导入任务的心跳，回收已退出进程遗留的任务
+    heartbeat_task = asyncio.create_task(ingest_job_service.run_heartbeat())
+    if STATIC_PRECOMPRESS:
+        try:
+            precompress_static(static_dir)
+        except OSError as e:
+            # 只读部署目录：直接返回原文件，由压缩中间件按需压缩
+            logger.warning(f"生成预压缩静态文件失败: {e}")
+    if SERIES_STORE_ENABLED and SERIES_STORE_WARM:
+        # 在线程池中预热时间序列存储，不阻塞启动；预热完成前的请求按需从数据库加载
+        from etf_service.app.series_store import series_store
+
+        asyncio.get_running_loop().run_in_executor(executors.get_executor(), series_store.warm, SessionLocal)
+    snapshot_task = None
+    if SNAPSHOT_INTERVAL_SECONDS > 0:
+        from etf_service.app.services.snapshot_service import run_periodic_export
+
+        snapshot_task = asyncio.create_task(
+            run_periodic_export(SessionLocal, executors.get_executor(), SNAPSHOT_INTERVAL_SECONDS)
+        )
+    yield
+    heartbeat_task.cancel()
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+    event_broker.close()
+    # 等待执行中的后台导入任务和线程池任务完成后再关闭连接池；在线程中等待，不阻塞事件循环
+    await asyncio.to_thread(ingest_job_service.shutdown)
+    await asyncio.to_thread(executors.shutdown)
+    await dispose_engines()
+    stop_async_logging()
+
+
+# 默认用 orjson 序列化响应
+app = FastAPI(title="etf_ingest_service", lifespan=lifespan, default_response_class=ORJSONResponse)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+# 指标中间件在最外层，记录的耗时包含压缩
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # 注册 v1 路由
 app.include_router(holding_upload.router, prefix="/api/v1")
 app.include_router(holding_record_api.router, prefix="/api/v1")
+app.include_router(portfolio_api.router, prefix="/api/v1")
+app.include_router(grid_api.router, prefix="/api/v1")
+app.include_router(snapshot_api.router, prefix="/api/v1")
+app.include_router(events_api.router, prefix="/api/v1")
+
+# 注册 v2 路由
+app.include_router(holding_chart_v2.router, prefix="/api/v2")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # app 的上级目录
 static_dir = os.path.join(BASE_DIR, "static")  # 指向 src/etf_service/static
 
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", CachedStaticFiles(directory=static_dir), name="static")
 # Ensure upload dir exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -33,10 +121,25 @@ def root():
     return {"message": "etf_ingest_service running"}
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
-    return FileResponse("../static/favicon.ico")
+    return FileResponse(
+        os.path.join(static_dir, "favicon.ico"), headers={"Cache-Control": f"public, max-age={STATIC_MAX_AGE}"}
+    )
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus 文本格式指标"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """就绪检查：服务关闭中返回 503，负载均衡器据此摘除本实例"""
+    if is_draining():
+        return ORJSONResponse({"status": "draining"}, status_code=503)
+    return {"status": "ok"}
 
 # 示例路由
 @app.get("/ping")
 async def ping():
-    logger.info("Ping 请求被调用")  # 使用全局 logger
+    logger.info("Ping 请求被调用", extra={"sample_key": "ping"})  # 使用全局 logger
     return {"message": "pong"}
\ No newline at end of file
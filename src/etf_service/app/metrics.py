@@ -0,0 +1,247 @@
+# src/etf_service/app/metrics.py
+"""
+进程内指标（Prometheus 文本格式，由 /metrics 输出）
+
+- Counter / Histogram 在热路径上只做一次加锁和 bisect，开销在微秒级
+- Gauge 在抓取时调用回调取值（连接池、线程池队列等），平时没有任何开销
+- stage("read_csv") 计时导入流水线的各个阶段；请求内的各阶段耗时同时汇总到当前请求的
+  breakdown 中，慢请求日志会带上这份明细
+- MetricsMiddleware 按路由模板记录请求延迟直方图和状态码计数
+
+指标只在当前进程内汇总，多 worker 部署时每个 worker 各自输出。
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from etf_service.app import logging_config
+from etf_service.app.logging_config import logger
+from etf_service.config import SLOW_REQUEST_MS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数（非累计）..., +Inf 桶计数, 总和]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Gauge:
+    """
+    抓取时调用回调取值；回调返回数值，或 {标签值元组: 数值}
+    同一 key 再次注册时替换原回调（例如引擎重建后）
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._functions: Dict[object, Callable] = {}
+
+    def set_function(self, fn: Callable, key: Optional[str] = None) -> None:
+        self._functions[key if key is not None else fn] = fn
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for fn in list(self._functions.values()):
+            try:
+                value = fn()
+            except Exception as e:
+                logger.warning(f"指标 {self.name} 取值失败: {e}")
+                continue
+            items = value.items() if isinstance(value, dict) else [((), value)]
+            for key, v in items:
+                yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "etf_http_request_duration_seconds", "HTTP 请求耗时", ["method", "route"]
+))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "etf_http_requests_total", "HTTP 请求数", ["method", "route", "status"]
+))
+INGEST_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "etf_ingest_stage_duration_seconds", "导入流水线各阶段耗时", ["stage"]
+))
+INGEST_ROWS_TOTAL = REGISTRY.register(Counter(
+    "etf_ingest_rows_total", "导入行数（written 为写入，failed 为解析失败）", ["result"]
+))
+POOL_CHECKOUT_SECONDS = REGISTRY.register(Histogram(
+    "etf_db_pool_checkout_wait_seconds", "从连接池获取连接的等待时间", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+))
+POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "etf_db_pool_connections", "连接池状态（checked_out / idle / overflow）", ["engine", "state"]
+))
+EXECUTOR_QUEUE = REGISTRY.register(Gauge(
+    "etf_executor_queue_depth", "等待执行的任务数", ["executor"]
+))
+SERIES_STORE_LOOKUPS = REGISTRY.register(Counter(
+    "etf_series_store_lookups_total", "时间序列存储查找次数（hit / miss）", ["result"]
+))
+SERIES_STORE_SIZE = REGISTRY.register(Gauge(
+    "etf_series_store_size", "时间序列存储驻留的证券数（entries）和字节数（bytes）", ["kind"]
+))
+RECONCILE_FIELDS_TOTAL = REGISTRY.register(Counter(
+    "etf_reconcile_fields_total", "导入核对的字段数（filled 为补全空值，mismatch 为超出容差）", ["field", "result"]
+))
+LOG_RECORDS = REGISTRY.register(Gauge(
+    "etf_log_records_discarded", "累计未输出的日志条数（dropped 为队列满丢弃，sampled 为限流省略）", ["reason"]
+))
+LOG_RECORDS.set_function(lambda: {(k,): v for k, v in logging_config.counts.items()})
+
+# 当前请求的各阶段耗时汇总（慢请求日志使用）；线程池任务需在 copy_context() 中运行才能汇总
+_breakdown: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "ingest_breakdown", default=None
+)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    INGEST_STAGE_SECONDS.observe(seconds, stage=name)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown[name] = breakdown.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """记录一个流水线阶段的耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_breakdown():
+    """在当前上下文中汇总各阶段耗时，返回 {阶段: 秒}"""
+    breakdown: Dict[str, float] = {}
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def format_breakdown(breakdown: Dict[str, float]) -> str:
+    return ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in breakdown.items())
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：按路由模板记录延迟和状态码，超过 SLOW_REQUEST_MS 时输出慢请求日志"""
+
+    def __init__(self, app, slow_request_ms: int = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with collect_breakdown() as breakdown:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                method = scope["method"]
+                REQUEST_LATENCY.observe(elapsed, method=method, route=route)
+                REQUESTS_TOTAL.inc(method=method, route=route, status=status)
+                if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                    detail = format_breakdown(breakdown)
+                    logger.warning(
+                        f"慢请求 {method} {scope['path']} {status} 耗时 {elapsed * 1000:.0f}ms"
+                        + (f"（{detail}）" if detail else ""),
+                        extra={"sample_key": f"slow:{method}:{route}", "elapsed_ms": round(elapsed * 1000)},
+                    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column,Date, Float, ForeignKey, Integer, String
+from sqlalchemy import Column,Date, Float, ForeignKey, Index, Integer, String, text
 from etf_service.app.database.base import Base, TimestampMixin
 
 class HoldingRecord(Base,TimestampMixin):
@@ -8,10 +8,10 @@ class HoldingRecord(Base,TimestampMixin):
         """
         __tablename__ = "holding_record"
         
-        id = Column(Integer, primary_key=True, index=True)
-        date = Column(Date,nullable=False, index=True,comment="持仓日期")
+        id = Column(Integer, primary_key=True)
+        date = Column(Date,nullable=False, comment="持仓日期")
         
-        security_code = Column(Integer,nullable=False, index=True, comment="证券代码")  
+        security_code = Column(Integer,nullable=False, comment="证券代码")  
         security_name = Column(String(100),nullable=False, comment="证券名称")
 
         holding_amount = Column(Float,nullable=False, comment="持仓数量")
@@ -33,3 +33,23 @@ class HoldingRecord(Base,TimestampMixin):
         market = Column(String(50), comment="交易市场")
         shareholder_account = Column(String(50), comment="股东账号")
         currency = Column(String(20), comment="币种")
+
+        # 同一日期、证券、股东账号只保留一条记录（股东账号为空时按空字符串处理）；
+        # 以 date 开头，同时用于按日期查询
+        __table_args__ = (
+                Index(
+                        "uq_holding_record_date_code_account",
+                        "date",
+                        "security_code",
+                        text("coalesce(shareholder_account, '')"),
+                        unique=True,
+                ),
+                # 图表查询按证券代码取日期区间：(security_code, date) 有序，
+                # PostgreSQL 上附带图表默认列，可走 index-only scan；也替代了原 security_code 单列索引
+                Index(
+                        "ix_holding_record_code_date",
+                        "security_code",
+                        "date",
+                        postgresql_include=["holding_amount", "cost_price"],
+                ),
+        )
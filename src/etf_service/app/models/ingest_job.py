@@ -0,0 +1,26 @@
+from sqlalchemy import JSON, Boolean, Column, DateTime, Integer, String, Text
+from etf_service.app.database.base import Base, TimestampMixin
+
+class IngestJob(Base, TimestampMixin):
+        """
+        后台导入任务
+        上传文件保存到 UPLOAD_DIR 后入队，由导入进程池解析入库并在此更新进度；
+        状态保存在数据库中，多个服务进程都能查询
+        """
+        __tablename__ = "ingest_job"
+
+        id = Column(String(32), primary_key=True, comment="任务 ID")
+        filename = Column(String(255), nullable=False, comment="上传文件名")
+        path = Column(String(500), nullable=False, comment="保存路径")
+        upsert = Column(Boolean, nullable=False, default=True, comment="是否按唯一键原地更新")
+        sha256 = Column(String(64), comment="上传内容的 sha256")
+        owner = Column(String(100), comment="创建任务的服务进程（主机名:pid:启动标识）")
+        heartbeat_at = Column(DateTime(timezone=True), comment="创建进程最近一次心跳，超时的未完成任务标记为 failed")
+
+        status = Column(String(20), nullable=False, default="queued", comment="queued/running/succeeded/failed")
+        processed_rows = Column(Integer, nullable=False, default=0, comment="已处理数据行数")
+        result = Column(JSON, comment="导入结果（各项计数、失败行、失败批次）")
+        error = Column(Text, comment="任务失败原因")
+
+        started_at = Column(DateTime(timezone=True), comment="开始处理时间")
+        finished_at = Column(DateTime(timezone=True), comment="结束时间")
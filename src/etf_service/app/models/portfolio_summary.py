@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, Column, Date, Float, Integer
+from etf_service.app.database.base import Base, TimestampMixin
+
+class PortfolioDailySummary(Base, TimestampMixin):
+        """
+        每日组合汇总
+        由 holding_record 按日期聚合，导入数据时在同一事务中增量维护
+        """
+        __tablename__ = "portfolio_daily_summary"
+
+        date = Column(Date, primary_key=True, comment="持仓日期")
+        position_count = Column(Integer, nullable=False, comment="持仓证券数")
+
+        total_market_value = Column(Float, nullable=False, comment="总市值")
+        total_cost = Column(Float, nullable=False, comment="总持仓成本")
+        total_holding_profit = Column(Float, nullable=False, comment="总持仓盈亏")
+        total_daily_profit = Column(Float, nullable=False, comment="当日总盈亏")
+
+        weights = Column(JSON, comment="各证券市值占比 {证券代码: 占比}")
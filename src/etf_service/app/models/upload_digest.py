@@ -0,0 +1,28 @@
+from sqlalchemy import JSON, BigInteger, Boolean, Column, Date, Index, Integer, String, text
+from etf_service.app.database.base import Base, TimestampMixin
+
+class UploadDigest(Base, TimestampMixin):
+        """
+        已成功导入的上传文件（按内容 sha256 去重）
+        文件中有行缺少日期、按上传当天补全时记录 default_date，
+        同一文件在另一天上传代表另一天的持仓，不视为重复
+        """
+        __tablename__ = "upload_digest"
+        # NULL 在唯一约束中互不相等，default_date 为空时按固定日期参与唯一键；
+        # 以 sha256 开头，同时用于按内容查找
+        __table_args__ = (
+                Index(
+                        "uq_upload_digest_sha256_default_date",
+                        "sha256",
+                        text("coalesce(default_date, '1900-01-01')"),
+                        unique=True,
+                ),
+        )
+
+        id = Column(Integer, primary_key=True, autoincrement=True)
+        sha256 = Column(String(64), nullable=False, comment="上传内容的 sha256")
+        default_date = Column(Date, comment="缺少日期的行补全使用的日期，文件自带全部日期时为空")
+        filename = Column(String(255), nullable=False, comment="首次上传的文件名")
+        size = Column(BigInteger, nullable=False, comment="文件字节数")
+        upsert = Column(Boolean, nullable=False, comment="是否按唯一键原地更新")
+        result = Column(JSON, comment="首次导入的结果")
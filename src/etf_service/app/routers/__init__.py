@@ -1,2 +1,7 @@
 from . import holding_upload
-from . import holding_record_api
\ No newline at end of file
+from . import holding_record_api
+from . import holding_chart_v2
+from . import portfolio_api
+from . import grid_api
+from . import snapshot_api
+from . import events_api
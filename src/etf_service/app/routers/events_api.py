@@ -0,0 +1,71 @@
+# src/etf_service/app/routers/events_api.py
+import json
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from etf_service.app.events import event_broker
+from etf_service.app.lifecycle import is_draining
+from etf_service.config import EVENT_HEARTBEAT_SECONDS, EVENT_STREAM_MAX_SECONDS
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# 浏览器断开后重连的等待时间（毫秒）
+RETRY_MS = 3000
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+@router.get("", summary="导入事件推送（Server-Sent Events）")
+async def stream_events(
+    request: Request,
+    codes: Optional[str] = Query(None, description="逗号分隔的证券代码，只推送涉及这些证券的事件，默认全部"),
+):
+    """
+    text/event-stream，事件类型：
+    - ready：连接建立（重连后客户端应按已有的最后日期增量拉取一次，补上断开期间的数据）
+    - ingest：{"codes", "start", "end", "rows", "source"}，codes 为 null 时表示涉及的证券过多、未列出
+    - reset：事件积压被丢弃或监听连接重连（期间的事件可能丢失），客户端应全量刷新
+    连接保持 EVENT_STREAM_MAX_SECONDS 秒（服务关闭时立即）由服务端关闭，浏览器 EventSource 会自动重连
+    """
+    if is_draining():
+        raise HTTPException(status_code=503, detail="服务正在关闭")
+    try:
+        wanted = {int(c) for c in codes.split(",") if c.strip()} if codes else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="证券代码必须为整数")
+
+    async def events():
+        deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+        with event_broker.subscribe() as sub:
+            yield f"retry: {RETRY_MS}\n" + sse("ready", {})
+            while time.monotonic() < deadline:
+                event = await sub.get(min(EVENT_HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0)))
+                if sub.closed or await request.is_disconnected():
+                    # 服务关闭中：结束本连接，浏览器按 retry 间隔重连
+                    return
+                if sub.lagged:
+                    # 积压的事件一并丢弃，客户端全量刷新即可
+                    sub.drain()
+                    yield sse("reset", {})
+                    continue
+                if event is None:
+                    # 心跳注释行，防止代理因空闲断开
+                    yield ": ping\n\n"
+                    continue
+                if wanted is not None and event["codes"] is not None:
+                    matched = [c for c in event["codes"] if c in wanted]
+                    if not matched:
+                        continue
+                    event = {**event, "codes": matched}
+                yield sse("ingest", event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,119 @@
+# src/etf_service/app/routers/grid_api.py
+from datetime import date
+from typing import Callable, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from etf_service.app.database.session import get_async_db
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.config import GRID_FEE_RATE, GRID_INITIAL_CAPITAL, SERIES_STORE_ENABLED
+
+router = APIRouter(prefix="/grid", tags=["grid"])
+
+MAX_SWEEP_COMBOS = 2000  # 单次请求最多的参数组合数
+MAX_GRID_LEVELS = 1000  # 上下各最多的网格层数
+
+
+def parse_values(value: str, cast: Callable, name: str) -> list:
+    """逗号分隔的参数列表"""
+    try:
+        values = [cast(v.strip()) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"参数格式错误: {name}")
+    if not values:
+        raise HTTPException(status_code=400, detail=f"参数不能为空: {name}")
+    return list(dict.fromkeys(values))
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+@router.get("/backtest/{security_code}", response_class=ORJSONResponse)
+async def grid_backtest(
+    security_code: int,
+    grid_percent: str = Query("0.05", description="网格间距，逗号分隔多个值时做参数扫描"),
+    levels: str = Query("10", description="上下各多少格，逗号分隔"),
+    multiplicative: str = Query("true", description="等比网格 true / 等差网格 false，逗号分隔"),
+    fee_rate: float = Query(GRID_FEE_RATE, ge=0, lt=1),
+    initial_capital: float = Query(GRID_INITIAL_CAPITAL, gt=0),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    用 holding_record 中的最新价序列回测香农半仓网格
+    返回所有参数组合的汇总（按收益率降序）和最优组合的持仓、现金、权益曲线及成交明细
+    """
+    # numpy / pandas 在首次回测时才加载
+    from etf_service.app.services.grid_backtest import grid_levels, param_grid, run_sweep
+
+    params = param_grid(
+        parse_values(grid_percent, float, "grid_percent"),
+        parse_values(levels, int, "levels"),
+        parse_values(multiplicative, parse_bool, "multiplicative"),
+    )
+    if len(params) > MAX_SWEEP_COMBOS:
+        raise HTTPException(status_code=400, detail=f"参数组合过多（{len(params)} > {MAX_SWEEP_COMBOS}）")
+    if any(p.grid_percent <= 0 or not 1 <= p.levels <= MAX_GRID_LEVELS for p in params):
+        raise HTTPException(
+            status_code=400, detail=f"网格间距必须大于 0，网格层数必须在 1 到 {MAX_GRID_LEVELS} 之间"
+        )
+
+    # 同一天可能有多个股东账号的记录，价格取平均
+    if SERIES_STORE_ENABLED:
+        from etf_service.app.series_store import series_store, to_dates
+
+        series = (await series_store.fetch(db, [security_code]))[security_code]
+        days, mean_prices = series.daily_mean("latest_price", series.window(start, end), positive=True)
+        dates, prices = to_dates(days), mean_prices.tolist()
+    else:
+        stmt = (
+            select(HoldingRecord.date, func.avg(HoldingRecord.latest_price))
+            .where(HoldingRecord.security_code == security_code, HoldingRecord.latest_price > 0)
+            .group_by(HoldingRecord.date)
+            .order_by(HoldingRecord.date)
+        )
+        if start is not None:
+            stmt = stmt.where(HoldingRecord.date >= start)
+        if end is not None:
+            stmt = stmt.where(HoldingRecord.date <= end)
+        rows = (await db.execute(stmt)).all()
+        dates, prices = (list(c) for c in zip(*rows)) if rows else ([], [])
+    if not dates:
+        raise HTTPException(status_code=404, detail="No data found")
+
+    result = await run_in_threadpool(
+        run_sweep, prices, params, fee_rate=fee_rate, initial_capital=initial_capital
+    )
+    summary = result.summary()
+    best = int(summary.index[0])
+    best_params = result.params[best]
+    return ORJSONResponse({
+        "security_code": security_code,
+        "sweep": {column: summary[column].tolist() for column in summary.columns},
+        "best": {
+            "grid_percent": best_params.grid_percent,
+            "levels": best_params.levels,
+            "multiplicative": best_params.multiplicative,
+            "grid_levels": grid_levels(
+                prices[0], best_params.grid_percent, best_params.levels,
+                best_params.levels, best_params.multiplicative,
+            ).tolist(),
+            "date": dates,
+            "price": prices,
+            "level": result.level[best].tolist(),
+            "position": result.position[best].tolist(),
+            "cash": result.cash[best].tolist(),
+            "equity": result.equity[best].tolist(),
+            "trades": result.trades(best, dates),
+        },
+    })
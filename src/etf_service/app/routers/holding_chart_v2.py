@@ -0,0 +1,140 @@
+# src/etf_service/app/routers/holding_chart_v2.py
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from etf_service.app.database.session import get_async_db
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.config import CHART_DEFAULT_POINTS, CHART_MAX_CODES, CHART_MAX_POINTS, SERIES_STORE_ENABLED
+
+router = APIRouter(prefix="/holding", tags=["holding"])
+
+# 可请求的序列名 -> holding_record 字段
+CHART_FIELDS = {
+    "holding_qty": HoldingRecord.holding_amount,
+    "available_qty": HoldingRecord.available_amount,
+    "cost_price": HoldingRecord.cost_price,
+    "latest_price": HoldingRecord.latest_price,
+    "avg_buy_price": HoldingRecord.avg_buy_price,
+    "holding_profit": HoldingRecord.holding_profit,
+    "holding_profit_ratio": HoldingRecord.holding_profit_ratio,
+    "daily_profit": HoldingRecord.daily_profit,
+    "daily_profit_ratio": HoldingRecord.daily_profit_ratio,
+    "position_ratio": HoldingRecord.position_ratio,
+    "latest_value": HoldingRecord.latest_value,
+}
+DEFAULT_FIELDS = ["holding_qty", "cost_price"]
+
+
+def parse_fields(fields: Optional[str]) -> list:
+    """逗号分隔的序列名，未指定时返回默认的持仓数量和成本价"""
+    if not fields:
+        return DEFAULT_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in CHART_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def parse_codes(codes: str) -> List[int]:
+    """逗号分隔的证券代码（去重，保持顺序）"""
+    try:
+        values = [int(c.strip()) for c in codes.split(",") if c.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="证券代码必须为整数")
+    values = list(dict.fromkeys(values))
+    if not values:
+        raise HTTPException(status_code=400, detail="参数不能为空: codes")
+    if len(values) > CHART_MAX_CODES:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {CHART_MAX_CODES} 个证券")
+    return values
+
+
+@router.get("/chart", response_class=ORJSONResponse)
+async def get_holding_charts(
+    codes: str = Query(..., description="逗号分隔的证券代码"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="逗号分隔的序列名，默认 holding_qty,cost_price"),
+    max_points: int = Query(CHART_DEFAULT_POINTS, ge=50, le=CHART_MAX_POINTS, description="每个证券最多返回的点数"),
+    method: Literal["lttb", "minmax"] = Query("lttb", description="降采样算法"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    多证券列式图表数据：一次查询取出全部证券的序列，点数超过 max_points 的序列在服务端降采样，
+    返回 {"series": {"510300": {"date": [...], "holding_qty": [...], "total_points": 原始点数}, ...}}
+    """
+    code_list = parse_codes(codes)
+    names = parse_fields(fields)
+    if SERIES_STORE_ENABLED:
+        # numpy 在首次请求时才加载
+        from etf_service.app.series_store import series_store
+        from etf_service.app.services.downsample import downsample_store_series
+
+        series = await series_store.fetch(db, code_list)
+        payload = await run_in_threadpool(
+            downsample_store_series, series, code_list, {n: CHART_FIELDS[n].key for n in names},
+            start, end, max_points, method,
+        )
+        return ORJSONResponse({"max_points": max_points, "method": method, "series": payload})
+
+    stmt = (
+        select(HoldingRecord.security_code, HoldingRecord.date, *[CHART_FIELDS[n] for n in names])
+        .where(HoldingRecord.security_code.in_(code_list))
+        .order_by(HoldingRecord.security_code, HoldingRecord.date)
+    )
+    if start is not None:
+        stmt = stmt.where(HoldingRecord.date >= start)
+    if end is not None:
+        stmt = stmt.where(HoldingRecord.date <= end)
+
+    rows = (await db.execute(stmt)).all()
+    # numpy 在首次请求时才加载；降采样在线程池中执行，不阻塞事件循环
+    from etf_service.app.services.downsample import downsample_rows
+
+    series = await run_in_threadpool(downsample_rows, rows, code_list, names, max_points, method)
+    return ORJSONResponse({"max_points": max_points, "method": method, "series": series})
+
+
+@router.get("/chart/{security_code}", response_class=ORJSONResponse)
+async def get_holding_chart_columns(
+    security_code: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="逗号分隔的序列名，默认 holding_qty,cost_price"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    列式图表数据：只查询需要的列，返回 {"date": [...], "holding_qty": [...], ...}
+    """
+    names = parse_fields(fields)
+    if SERIES_STORE_ENABLED:
+        from etf_service.app.series_store import series_store
+
+        series = (await series_store.fetch(db, [security_code]))[security_code]
+        window = series.window(start, end)
+        payload = {"date": series.dates(window)}
+        payload.update({n: series.values(CHART_FIELDS[n].key, window) for n in names})
+        return ORJSONResponse(payload)
+
+    stmt = (
+        select(HoldingRecord.date, *[CHART_FIELDS[n] for n in names])
+        .where(HoldingRecord.security_code == security_code)
+        .order_by(HoldingRecord.date)
+    )
+    if start is not None:
+        stmt = stmt.where(HoldingRecord.date >= start)
+    if end is not None:
+        stmt = stmt.where(HoldingRecord.date <= end)
+
+    rows = (await db.execute(stmt)).all()
+    columns = list(zip(*rows)) if rows else [()] * (len(names) + 1)
+    return ORJSONResponse({
+        key: list(values) for key, values in zip(["date"] + names, columns)
+    })
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from etf_service.app.database.session import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from etf_service.app.cache import SECURITY_CODES_KEY, cached_response, chart_key, response_cache
+from etf_service.app.database.session import get_async_db
 from etf_service.app.models.holding_record import HoldingRecord
 from pydantic import BaseModel
 from typing import List
@@ -12,34 +14,43 @@ class HoldingChartData(BaseModel):
     holding_qty: float
     cost_price: float
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
-
 @router.get("/chart/{security_code}", response_model=List[HoldingChartData])
-def get_holding_chart(security_code: str, db: Session = Depends(get_db)):
-    records = (
-        db.query(HoldingRecord)
-        .filter(HoldingRecord.security_code == int(security_code))
-        .order_by(HoldingRecord.date)
-        .all()
-    )
-    if not records:
-        raise HTTPException(status_code=404, detail="No data found")
-    return [
-        HoldingChartData(
-            date=r.date.isoformat(),
-            holding_qty=r.holding_amount,
-            cost_price=r.cost_price
+async def get_holding_chart(
+    security_code: str, request: Request, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    响应按证券代码缓存，导入数据时失效；支持 If-None-Match 返回 304
+    只查询需要的三列，直接组装字典后由 orjson 序列化（入库数据已符合 HoldingChartData，不再逐行构建模型）
+    """
+    code = int(security_code)
+    entry = response_cache.get(chart_key(code))
+    if entry is None:
+        generation = response_cache.generation
+        result = await db.execute(
+            select(HoldingRecord.date, HoldingRecord.holding_amount, HoldingRecord.cost_price)
+            .filter(HoldingRecord.security_code == code)
+            .order_by(HoldingRecord.date)
         )
-        for r in records
-    ]
+        rows = result.all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="No data found")
+        payload = [
+            {"date": day.isoformat(), "holding_qty": float(qty), "cost_price": float(cost)}
+            for day, qty, cost in rows
+        ]
+        entry = response_cache.put(chart_key(code), payload, generation=generation)
+    return cached_response(request, entry)
 
 @router.get("/security-codes", response_model=List[str])
-def get_security_codes(db: Session = Depends(get_db)):
+async def get_security_codes(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     返回数据库中所有证券代码，用于前端选择下拉列表
     """
-    codes = db.query(HoldingRecord.security_code).distinct().all()
-    # db 返回的是 list of tuples，需要展开成 list[str]
-    return [str(code[0]) for code in codes]
\ No newline at end of file
+    entry = response_cache.get(SECURITY_CODES_KEY)
+    if entry is None:
+        generation = response_cache.generation
+        result = await db.execute(select(HoldingRecord.security_code).distinct())
+        codes = result.scalars().all()
+        # 转成 list[str] 返回
+        entry = response_cache.put(SECURITY_CODES_KEY, [str(c) for c in codes], codes=codes, generation=generation)
+    return cached_response(request, entry)
@@ -1,46 +1,93 @@
 # src/etf_service/app/api/v1/holding.py
 from fastapi import APIRouter, UploadFile, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from etf_service.app.services.holding_record_service import (
-    insert_excel_to_db, insert_record
-)
-from etf_service.app.database.session import SessionLocal
+# holding_record_service 依赖 pandas，在首次同步导入时才加载，应用启动不必等待
+from etf_service.app.services.ingest_job_service import QueueFullError, get_job, submit_upload
+from etf_service.app.services.upload_digest_service import DuplicateUploadError, duplicate_result
+from etf_service.app.database.session import get_async_db
 from etf_service.app.schemas.holding_record import HoldingRecordCreate, ETFRecordRead
+from etf_service.app.schemas.ingest_job import IngestJobRead
 from etf_service.app.logging_config import logger
 
 router = APIRouter(prefix="/holding", tags=["Holding"])
 
-# 依赖注入 Session
-def get_db():
-    with SessionLocal() as db:
-        yield db
+# txt 为制表符分隔的导出文本，Excel 工作簿按只读模式逐行读取
+UPLOAD_SUFFIXES = (".txt", ".xlsx", ".xlsm", ".xls")
 
 # -----------------------
 # 上传 Excel
 # -----------------------
 @router.post("/upload", summary="上传 Excel 并批量插入")
-async def upload_excel(file: UploadFile):
-    if not file.filename.endswith((".txt")):
+async def upload_excel(
+    file: UploadFile,
+    stream: bool = False,
+    upsert: bool = True,
+    background: bool = True,
+    force: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    支持 txt 和 Excel（xlsx / xls，自动选择含表头的工作表和表头行）
+    background=true（默认）时保存文件并创建后台导入任务，立即返回 202 和任务 ID，
+    通过 GET /holding/jobs/{job_id} 查询进度；任务队列已满时返回 429
+    background=false 时在请求内同步导入：
+    stream=true 时按 INGEST_BATCH_SIZE 分块解析并逐批提交，适合大文件；
+    默认整个文件在一个事务中插入
+    upsert=true（默认）时按 (日期, 证券代码, 股东账号) 原地更新已存在的记录，
+    同一批次内重复的键只写入最后一条，丢弃的行数见 duplicates_in_batch_count；
+    upsert=false 时直接批量插入，遇到重复记录整批失败
+    内容（sha256）与已成功导入的文件相同时直接返回首次的导入结果（duplicate=true），
+    force=true 时忽略去重重新导入
+    """
+    if not file.filename or not file.filename.lower().endswith(UPLOAD_SUFFIXES):
         raise HTTPException(status_code=400, detail="文件格式错误")
+    if background:
+        try:
+            job = await submit_upload(db, file, upsert=upsert, force=force)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+        except DuplicateUploadError as e:
+            return duplicate_result(e.digest)
+        return ORJSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "status": job.status, "status_url": f"/api/v1/holding/jobs/{job.id}"},
+        )
+    from etf_service.app.services.holding_record_service import insert_excel_to_db, stream_excel_to_db
+
     try:
-        inserted_count = await insert_excel_to_db(file)
-        logger.info(f"成功插入 {inserted_count} 条数据")
-        return {"inserted_count": inserted_count}
+        if stream:
+            result = await stream_excel_to_db(file, upsert=upsert, force=force)
+        else:
+            result = await insert_excel_to_db(file, upsert=upsert, force=force)
+        logger.info(f"成功插入 {result['inserted_count']} 条数据")
+        return result
     except Exception as e:
         logger.error(f"Excel 上传失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# -----------------------
+# 导入任务状态
+# -----------------------
+@router.get("/jobs/{job_id}", response_model=IngestJobRead, summary="查询后台导入任务")
+async def get_upload_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
 # -----------------------
 # 单条数据插入
 # -----------------------
 @router.post("/", response_model=ETFRecordRead, summary="插入单条持仓记录")
-def create_holding(record_in: HoldingRecordCreate, db: Session = Depends(get_db)):
+async def create_holding(record_in: HoldingRecordCreate, db: AsyncSession = Depends(get_async_db)):
+    from etf_service.app.services.holding_record_service import insert_record
+
     try:
-        record = insert_record(db, record_in)
-        logger.info(f"插入单条记录: {record_in.dict()}")
-        return record
+        record = await insert_record(db, record_in)
+        logger.debug("插入单条记录: %s %s", record_in.code, record_in.date)
+        return ETFRecordRead(id=record.id, **record_in.model_dump())
     except Exception as e:
         logger.error(f"单条插入失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,47 @@
+# src/etf_service/app/routers/portfolio_api.py
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from etf_service.app.database.session import get_async_db
+from etf_service.app.models.portfolio_summary import PortfolioDailySummary
+
+router = APIRouter(prefix="/portfolio", tags=["portfolio"])
+
+SUMMARY_COLUMNS = [
+    "date",
+    "position_count",
+    "total_market_value",
+    "total_cost",
+    "total_holding_profit",
+    "total_daily_profit",
+]
+
+
+@router.get("/summary", response_class=ORJSONResponse)
+async def get_portfolio_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    weights: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    组合每日汇总时间序列，直接读取 portfolio_daily_summary（每天一行）
+    返回列数组；weights=true 时附带每日各证券市值占比
+    """
+    names = SUMMARY_COLUMNS + (["weights"] if weights else [])
+    stmt = select(*[PortfolioDailySummary.__table__.c[n] for n in names]).order_by(
+        PortfolioDailySummary.date
+    )
+    if start is not None:
+        stmt = stmt.where(PortfolioDailySummary.date >= start)
+    if end is not None:
+        stmt = stmt.where(PortfolioDailySummary.date <= end)
+
+    rows = (await db.execute(stmt)).all()
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return ORJSONResponse({name: list(values) for name, values in zip(names, columns)})
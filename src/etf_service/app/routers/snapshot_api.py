@@ -0,0 +1,96 @@
+# src/etf_service/app/routers/snapshot_api.py
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response
+
+from etf_service.app.database.session import SessionLocal
+from etf_service.app.services.snapshot_service import (
+    COLUMNS, SnapshotUnavailable, export_snapshot, query_snapshot, snapshot_status
+)
+from etf_service.config import SNAPSHOT_MAX_ROWS
+
+router = APIRouter(prefix="/snapshot", tags=["snapshot"])
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def parse_columns(fields: Optional[str]) -> list:
+    if not fields:
+        return COLUMNS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+@router.get("", response_class=ORJSONResponse, summary="快照状态")
+async def get_snapshot_status():
+    """已导出的月份分区、行数和导出时间"""
+    return ORJSONResponse(await run_in_threadpool(snapshot_status))
+
+
+@router.post("/export", response_class=ORJSONResponse, summary="增量导出快照")
+async def export(full: bool = False):
+    """
+    只重写上次导出后有变化的月份（full=true 时全部重写）；
+    其它进程正在导出时返回 409
+    """
+    try:
+        stats = await run_in_threadpool(export_snapshot, SessionLocal, full=full)
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if stats.skipped:
+        raise HTTPException(status_code=409, detail="已有快照导出正在进行")
+    return ORJSONResponse({
+        "partitions": stats.partitions,
+        "written": stats.written,
+        "removed": stats.removed,
+        "unchanged": stats.unchanged,
+        "rows": stats.rows,
+        "seconds": round(stats.seconds, 3),
+    })
+
+
+@router.get("/holdings", summary="从快照查询历史持仓")
+async def get_snapshot_holdings(
+    codes: Optional[str] = Query(None, description="逗号分隔的证券代码，默认全部"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="逗号分隔的字段（holding_record 列名），默认全部"),
+    limit: int = Query(100_000, ge=1, le=SNAPSHOT_MAX_ROWS),
+    format: Literal["json", "arrow"] = Query("json", description="json 为列式 JSON，arrow 为 Arrow IPC 流"),
+):
+    """
+    历史区间查询走 Parquet 快照（memory_map 读取），不访问数据库；数据截至最近一次导出
+    结果按 (日期, 证券代码) 排序，超过 limit 行时截断（truncated=true / X-Truncated 头）；
+    按月读取，读够 limit 行后不再读取后面的月份
+    """
+    try:
+        code_list = [int(c) for c in codes.split(",") if c.strip()] if codes else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="证券代码必须为整数")
+    columns = parse_columns(fields)
+    try:
+        table = await run_in_threadpool(query_snapshot, code_list, start, end, columns, limit=limit)
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    truncated = table.num_rows > limit
+    if truncated:
+        table = table.slice(0, limit)
+
+    if format == "arrow":
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(
+            content=sink.getvalue().to_pybytes(),
+            media_type=ARROW_STREAM_TYPE,
+            headers={"X-Truncated": str(truncated).lower()},
+        )
+    return ORJSONResponse({"rows": table.num_rows, "truncated": truncated, "columns": table.to_pydict()})
@@ -0,0 +1,19 @@
+# src/etf_service/app/schemas/ingest_job.py
+from datetime import datetime
+from typing import Optional
+
+from etf_service.app.schemas.holding_record import BaseSchema
+
+
+class IngestJobRead(BaseSchema):
+    id: str
+    filename: str
+    upsert: bool
+    sha256: Optional[str] = None
+    status: str
+    processed_rows: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    create_time: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,319 @@
+# src/etf_service/app/series_store.py
+"""
+热点证券的进程内时间序列存储（SERIES_STORE_ENABLED 开启）
+
+- 每个证券一份列式数组：日期为 int32 天数（1970-01-01 起），数值列为 float64，空值为 NaN
+- 图表、回测接口直接按日期切片数组，命中时不查询数据库；未命中的证券整段读入后放入存储
+- 批量写入提交后 merge 同一批数据（已驻留的证券原地合并，按 (日期, 股东账号) 后写覆盖），
+  其它进程完成的导入（后台任务）只能 invalidate_codes，下次读取时重新加载
+- 总大小超过 SERIES_STORE_MAX_BYTES 时按最近使用淘汰；启动时按最近有数据的证券预热到预算为止
+- 与响应缓存一样是进程内存储，其它 worker / 回填命令的写入经导入事件（EVENT_BACKEND=postgres）
+  invalidate_codes
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from etf_service.app.logging_config import logger
+from etf_service.app.metrics import SERIES_STORE_LOOKUPS, SERIES_STORE_SIZE
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.config import SERIES_STORE_ENABLED, SERIES_STORE_MAX_BYTES
+
+# 存储的数值列（holding_record 字段）
+FIELDS = [
+    "holding_amount", "available_amount", "cost_price", "latest_price", "avg_buy_price",
+    "holding_profit", "holding_profit_ratio", "daily_profit", "daily_profit_ratio",
+    "position_ratio", "latest_value",
+]
+INT_FIELDS = {"available_amount"}
+WARM_CHUNK_CODES = 50  # 预热时每次查询的证券数
+
+
+def to_days(values) -> np.ndarray:
+    """date 序列 -> int32 天数"""
+    return np.asarray(values, dtype="datetime64[D]").astype(np.int64).astype(np.int32)
+
+
+def day_of(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def to_dates(days: np.ndarray) -> List[date]:
+    """天数 -> date 列表"""
+    return days.astype("datetime64[D]").astype(object).tolist()
+
+
+@dataclass(frozen=True)
+class SecuritySeries:
+    """单个证券的全部记录，按 (日期, 股东账号) 排序；创建后不再修改，读者无需加锁"""
+    days: np.ndarray                # int32
+    accounts: np.ndarray            # int32，account_names 中的下标，-1 为空账号
+    account_names: tuple
+    columns: Dict[str, np.ndarray]  # float64
+
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.accounts.nbytes + sum(c.nbytes for c in self.columns.values())
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def window(self, start: Optional[date] = None, end: Optional[date] = None) -> slice:
+        """[start, end] 日期范围对应的切片"""
+        lo = 0 if start is None else int(np.searchsorted(self.days, day_of(start), side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, day_of(end), side="right"))
+        return slice(lo, hi)
+
+    def dates(self, index) -> List[date]:
+        return to_dates(self.days[index])
+
+    def values(self, field: str, index) -> list:
+        """按字段原类型返回 Python 列表（NaN -> None）"""
+        column = self.columns[field][index]
+        missing = np.isnan(column)
+        if field in INT_FIELDS and not missing.any():
+            return column.astype(np.int64).tolist()
+        out = column.tolist()
+        if missing.any():
+            for i in np.flatnonzero(missing):
+                out[i] = None
+        return out
+
+    def daily_mean(self, field: str, index=slice(None), positive: bool = False):
+        """同一天多个股东账号的记录取平均，返回 (天数, 均值)；positive=True 时只统计大于 0 的值"""
+        days, column = self.days[index], self.columns[field][index]
+        keep = column > 0 if positive else ~np.isnan(column)
+        days, column = days[keep], column[keep]
+        if not len(days):
+            return days, column
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        counts = np.diff(np.append(starts, len(days)))
+        return days[starts], np.add.reduceat(column, starts) / counts
+
+
+def build_series(days, accounts: Sequence[Optional[str]], columns: Mapping[str, Iterable]) -> SecuritySeries:
+    """
+    由同一证券的记录构建序列，同一 (日期, 账号) 的多条记录保留最后一条
+    与数据库唯一键 coalesce(shareholder_account, '') 一致，空账号（None / ''）视为同一个账号
+    """
+    days = to_days(days)
+    names = sorted({a for a in accounts if a})
+    lookup = {name: i for i, name in enumerate(names)}
+    account_idx = np.fromiter((lookup[a] if a else -1 for a in accounts), dtype=np.int32, count=len(days))
+    values = {f: np.asarray(columns[f], dtype=np.float64) for f in FIELDS}
+    seq = np.arange(len(days))
+    order = np.lexsort((seq, account_idx, days))
+    days, account_idx = days[order], account_idx[order]
+    # 后面一条与当前 (日期, 账号) 相同则丢弃当前条
+    duplicate = np.zeros(len(days), dtype=bool)
+    if len(days) > 1:
+        duplicate[:-1] = (days[:-1] == days[1:]) & (account_idx[:-1] == account_idx[1:])
+    keep = order[~duplicate]
+    return SecuritySeries(
+        days=days[~duplicate],
+        accounts=account_idx[~duplicate],
+        account_names=tuple(names),
+        columns={f: v[keep] for f, v in values.items()},
+    )
+
+
+def merge_series(old: SecuritySeries, days, accounts, columns: Mapping[str, Iterable]) -> SecuritySeries:
+    """把新写入的记录合并进已有序列（新记录覆盖同一 (日期, 账号) 的旧记录）"""
+    names = np.array(old.account_names + (None,), dtype=object)
+    old_accounts = names[np.where(old.accounts >= 0, old.accounts, len(old.account_names))]
+    return build_series(
+        np.concatenate((old.days.astype("datetime64[D]"), np.asarray(days, dtype="datetime64[D]"))),
+        old_accounts.tolist() + list(accounts),
+        {f: np.concatenate((old.columns[f], np.asarray(columns[f], dtype=np.float64))) for f in FIELDS},
+    )
+
+
+def _record_columns():
+    return [HoldingRecord.security_code, HoldingRecord.date, HoldingRecord.shareholder_account] + [
+        getattr(HoldingRecord, f) for f in FIELDS
+    ]
+
+
+def _series_from_rows(rows: list, codes: Iterable[int]) -> Dict[int, SecuritySeries]:
+    """(security_code, date, shareholder_account, *FIELDS) 查询结果 -> 每个证券的序列，没有记录的证券为空序列"""
+    grouped: Dict[int, list] = {int(c): [] for c in codes}
+    for row in rows:
+        grouped[int(row[0])].append(row)
+    out = {}
+    for code, records in grouped.items():
+        columns = list(zip(*records)) if records else [()] * (len(FIELDS) + 3)
+        out[code] = build_series(
+            columns[1], columns[2], {f: columns[i + 3] for i, f in enumerate(FIELDS)}
+        )
+    return out
+
+
+class SeriesStore:
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._data: "OrderedDict[int, SecuritySeries]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # 每次写入（merge / invalidate）加 1；加载期间有写入时加载结果不放入存储，避免覆盖新数据
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, code: int) -> Optional[SecuritySeries]:
+        with self._lock:
+            series = self._data.get(code)
+            if series is not None:
+                self._data.move_to_end(code)
+        SERIES_STORE_LOOKUPS.inc(result="hit" if series is not None else "miss")
+        return series
+
+    def put(self, code: int, series: SecuritySeries, generation: Optional[int] = None) -> bool:
+        """放入一个证券的序列；超过预算时淘汰最久未使用的证券，返回是否放入"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            return self._put_locked(code, series)
+
+    def _put_locked(self, code: int, series: SecuritySeries) -> bool:
+        size = series.nbytes
+        old = self._data.pop(code, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if size > self.max_bytes:
+            return False
+        while self._data and self._bytes + size > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= evicted.nbytes
+        self._data[code] = series
+        self._bytes += size
+        return True
+
+    def merge(self, frame) -> None:
+        """
+        写入提交后调用：frame 为 HoldingBatch.frame（或同样列名的映射），
+        只合并已驻留的证券，其它证券下次读取时从数据库加载
+        """
+        if not self.enabled or not len(frame["security_code"]):
+            return
+        codes = np.asarray(frame["security_code"], dtype=np.int64)
+        with self._lock:
+            self.generation += 1
+            resident = [c for c in np.unique(codes).tolist() if c in self._data]
+        if not resident:
+            return
+        days = np.asarray(frame["date"], dtype="datetime64[D]")
+        accounts = np.asarray(frame["shareholder_account"], dtype=object)
+        columns = {f: np.asarray(frame[f], dtype=np.float64) for f in FIELDS}
+        for code in resident:
+            mask = codes == code
+            with self._lock:
+                old = self._data.get(code)
+            if old is None:
+                continue
+            accounts_for_code = [None if a is None or a != a else a for a in accounts[mask]]
+            merged = merge_series(old, days[mask], accounts_for_code, {f: c[mask] for f, c in columns.items()})
+            self._replace(code, old, merged)
+
+    def _replace(self, code: int, old: SecuritySeries, new: SecuritySeries) -> None:
+        """条目仍是 old 时替换为 new；期间被其它写入替换或移出时直接移出，下次读取重新加载"""
+        with self._lock:
+            if self._data.get(code) is old:
+                self._put_locked(code, new)
+                return
+            current = self._data.pop(code, None)
+            if current is not None:
+                self._bytes -= current.nbytes
+
+    def invalidate_codes(self, codes: Iterable[int]) -> None:
+        """其它进程写入了这些证券：移出存储，下次读取时重新加载"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.generation += 1
+            for code in codes:
+                old = self._data.pop(int(code), None)
+                if old is not None:
+                    self._bytes -= old.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._bytes = 0
+
+    async def fetch(self, db: AsyncSession, codes: Sequence[int]) -> Dict[int, SecuritySeries]:
+        """返回这些证券的序列：驻留的直接返回，其余一次查询加载后放入存储"""
+        out, missing = {}, []
+        for code in codes:
+            series = self.get(code)
+            if series is None:
+                missing.append(code)
+            else:
+                out[code] = series
+        if missing:
+            generation = self.generation
+            stmt = (
+                select(*_record_columns())
+                .where(HoldingRecord.security_code.in_(missing))
+                .order_by(HoldingRecord.security_code, HoldingRecord.date)
+            )
+            rows = (await db.execute(stmt)).all()
+            for code, series in _series_from_rows(rows, missing).items():
+                self.put(code, series, generation)
+                out[code] = series
+        return out
+
+    def warm(self, session_factory) -> int:
+        """
+        按最近有数据的证券优先加载，直到占满预算，返回加载的证券数
+        （在线程池中执行，使用同步 Session）
+        """
+        loaded = 0
+        try:
+            with session_factory() as db:
+                codes = db.execute(
+                    select(HoldingRecord.security_code)
+                    .group_by(HoldingRecord.security_code)
+                    .order_by(func.max(HoldingRecord.date).desc())
+                ).scalars().all()
+                for i in range(0, len(codes), WARM_CHUNK_CODES):
+                    chunk = [c for c in codes[i:i + WARM_CHUNK_CODES] if c not in self._data]
+                    if not chunk:
+                        continue
+                    generation = self.generation
+                    rows = db.execute(
+                        select(*_record_columns())
+                        .where(HoldingRecord.security_code.in_(chunk))
+                        .order_by(HoldingRecord.security_code, HoldingRecord.date)
+                    ).all()
+                    for code, series in _series_from_rows(rows, chunk).items():
+                        # 预算已满（会淘汰先加载的热点证券）时停止
+                        if self._bytes + series.nbytes > self.max_bytes:
+                            logger.info(f"时间序列存储预热完成：{loaded} 个证券，{self._bytes} 字节（已达预算）")
+                            return loaded
+                        if self.put(code, series, generation):
+                            loaded += 1
+        except Exception as e:
+            logger.error(f"时间序列存储预热失败: {e}")
+            return loaded
+        logger.info(f"时间序列存储预热完成：{loaded} 个证券，{self._bytes} 字节")
+        return loaded
+
+
+series_store = SeriesStore(SERIES_STORE_MAX_BYTES, enabled=SERIES_STORE_ENABLED)
+
+SERIES_STORE_SIZE.set_function(
+    lambda: {("entries",): len(series_store), ("bytes",): series_store.nbytes}, key="series_store"
+)
@@ -0,0 +1,175 @@
+# src/etf_service/app/server.py
+"""
+生产部署入口（python -m etf_service serve）
+
+- 按 WEB_WORKERS 启动多个 uvicorn worker 进程共享同一个监听 socket；
+  安装了 uvloop / httptools 时使用它们，否则退回 asyncio / h11
+- DB_MAX_CONNECTIONS > 0 时按 worker 数平分连接预算，再扣除每个 worker 的后台导入子进程
+  （每个进程 2 个连接）和事件监听/发布连接，剩余的分给同步引擎（与 INGEST_WORKERS 线程数相同，
+  线程不会因等连接而阻塞）和异步引擎（一半常驻、一半溢出）
+- 预算在导入应用前写入环境变量和 config，worker 以 spawn 方式启动，重新读取配置时即生效
+- 多 worker 时响应缓存和时间序列存储经导入事件在 worker 之间失效，要求 EVENT_BACKEND=postgres
+  （或关闭这两项缓存）
+- 收到 SIGTERM / SIGINT 后先进入关闭状态（/ready 返回 503、结束 SSE 连接），
+  再由 uvicorn 停止接收新连接、等待进行中的请求（最多 WEB_GRACEFUL_TIMEOUT 秒），
+  最后执行 lifespan 关闭：等待后台导入任务和线程池，释放连接池
+"""
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import Dict
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from etf_service import config
+from etf_service.app.logging_config import logger
+
+APP = "etf_service.app.main:app"
+# 每个后台导入子进程占用的连接数（任务状态 + 入库）
+JOB_PROCESS_CONNECTIONS = 2
+
+
+@dataclass
+class WorkerBudget:
+    """单个 worker 的连接分配"""
+    workers: int
+    per_worker: int
+    reserved: int  # 后台导入子进程 + 事件监听/发布
+    sync_pool: int  # 同时也是 INGEST_WORKERS
+    sync_overflow: int
+    async_pool: int
+    async_overflow: int
+
+    def settings(self) -> Dict[str, int]:
+        return {
+            "DB_POOL_SIZE": self.async_pool,
+            "DB_MAX_OVERFLOW": self.async_overflow,
+            "DB_SYNC_POOL_SIZE": self.sync_pool,
+            "DB_SYNC_MAX_OVERFLOW": self.sync_overflow,
+            "INGEST_WORKERS": self.sync_pool,
+        }
+
+
+def plan_budget(
+    max_connections: int,
+    workers: int,
+    job_workers: int = config.INGEST_JOB_WORKERS,
+    ingest_workers: int = config.INGEST_WORKERS,
+    event_backend: str = config.EVENT_BACKEND,
+) -> WorkerBudget:
+    """由全部 worker 合计的连接上限计算每个 worker 的连接池和线程池大小，预算不足时抛出 ValueError"""
+    per_worker = max_connections // workers
+    # postgres 事件后端：一个 LISTEN 专用连接，发布时另占一个同步连接（同步池的溢出连接）
+    events = 2 if event_backend == "postgres" else 0
+    reserved = JOB_PROCESS_CONNECTIONS * job_workers + events
+    remaining = per_worker - reserved
+    if remaining < 2:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} 不足：{workers} 个 worker 每个 {per_worker} 个连接，"
+            f"后台导入和事件已占用 {reserved} 个，同步、异步引擎至少各需要 1 个"
+        )
+    sync_pool = max(1, min(ingest_workers, remaining // 2))
+    async_total = remaining - sync_pool
+    async_pool = max(1, async_total // 2)
+    return WorkerBudget(
+        workers=workers,
+        per_worker=per_worker,
+        reserved=reserved,
+        sync_pool=sync_pool,
+        sync_overflow=1 if events else 0,
+        async_pool=async_pool,
+        async_overflow=async_total - async_pool,
+    )
+
+
+def apply_budget(budget: WorkerBudget) -> None:
+    """
+    写入环境变量（spawn 启动的 worker、后台导入子进程重新读取配置）和当前进程的 config（单 worker 时）
+    必须在导入 app.database.session / app.executors 之前调用
+    """
+    for name, value in budget.settings().items():
+        os.environ[name] = str(value)
+        setattr(config, name, value)
+
+
+class DrainingServer(uvicorn.Server):
+    def handle_exit(self, sig, frame) -> None:
+        # 信号处理函数中不能获取锁（可能正被本线程持有），结束 SSE 订阅和日志交给事件循环执行
+        if not self.should_exit:
+            from etf_service.app.lifecycle import begin_drain
+
+            begin_drain()
+            try:
+                asyncio.get_running_loop().call_soon_threadsafe(self._drain, sig)
+            except RuntimeError:
+                pass
+        super().handle_exit(sig, frame)
+
+    @staticmethod
+    def _drain(sig) -> None:
+        from etf_service.app.events import event_broker
+
+        logger.info(f"worker {os.getpid()} 收到信号 {sig}，停止接收新请求，等待进行中的请求完成")
+        event_broker.close_subscriptions()
+
+
+def serve(
+    host: str = config.APP_HOST,
+    port: int = config.APP_PORT,
+    workers: int = config.WEB_WORKERS,
+    keepalive: int = config.WEB_KEEPALIVE,
+    backlog: int = config.WEB_BACKLOG,
+    graceful_timeout: int = config.WEB_GRACEFUL_TIMEOUT,
+    max_connections: int = config.DB_MAX_CONNECTIONS,
+) -> None:
+    workers = workers or os.cpu_count() or 1
+    if max_connections > 0:
+        budget = plan_budget(max_connections, workers)
+        apply_budget(budget)
+        logger.info(
+            f"连接预算 {max_connections}：{workers} 个 worker，每个 {budget.per_worker} 个"
+            f"（异步 {budget.async_pool}+{budget.async_overflow}，同步 {budget.sync_pool}+{budget.sync_overflow}，"
+            f"后台导入/事件 {budget.reserved}），INGEST_WORKERS={budget.sync_pool}"
+        )
+    else:
+        per_worker = (
+            config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW + config.DB_SYNC_POOL_SIZE + config.DB_SYNC_MAX_OVERFLOW
+            + JOB_PROCESS_CONNECTIONS * config.INGEST_JOB_WORKERS + (1 if config.EVENT_BACKEND == "postgres" else 0)
+        )
+        logger.info(f"未设置 DB_MAX_CONNECTIONS：{workers} 个 worker 最多可能占用 {workers * per_worker} 个数据库连接")
+    if workers > 1 and config.EVENT_BACKEND == "local":
+        if config.RESPONSE_CACHE_ENABLED or config.SERIES_STORE_ENABLED:
+            # 进程内缓存只在处理写入的 worker 中失效，其它 worker 会一直返回旧数据
+            raise ValueError(
+                "多 worker 部署时响应缓存 / 时间序列存储依赖导入事件在 worker 之间失效，"
+                "请设置 EVENT_BACKEND=postgres，或关闭 RESPONSE_CACHE_ENABLED 和 SERIES_STORE_ENABLED"
+            )
+        logger.warning("多 worker 部署时 EVENT_BACKEND=local 只能推送本 worker 的写入事件，建议设置为 postgres")
+
+    uvicorn_config = uvicorn.Config(
+        APP,
+        host=host,
+        port=port,
+        workers=workers,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        lifespan="on",
+        timeout_keep_alive=keepalive,
+        backlog=backlog,
+        timeout_graceful_shutdown=graceful_timeout,
+        # 不安装 uvicorn 自带的 handler，访问日志等经根 logger 走应用的（异步、JSON）日志配置
+        log_config=None,
+    )
+    logger.info(f"监听 {host}:{port}，{workers} 个 worker（{uvicorn_config.loop} / {uvicorn_config.http}）")
+    server = DrainingServer(uvicorn_config)
+    if workers > 1:
+        sock = uvicorn_config.bind_socket()
+        Multiprocess(uvicorn_config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+        if not server.started:
+            # 启动失败（端口占用、lifespan 出错等）
+            sys.exit(3)
@@ -0,0 +1,225 @@
+# src/etf_service/app/services/backfill_service.py
+"""
+历史导出文件目录的批量回填（python -m etf_service backfill <目录>）
+
+- 持仓日期取自文件名（20240102 / 2024-01-02 / 2024_01_02）或文件内容的 date 列，
+  两者都没有的文件记为失败，不会用当天日期补全
+- 文件在进程池（spawn）中解析，解析结果交给写入线程池，每个文件在一个事务中 upsert；
+  已解析未写完的文件数不超过 max_in_flight，内存占用有上限
+- 每个文件处理完后原子地更新清单（路径 -> sha256、行数、状态），
+  中断后重新执行时跳过内容未变化且已完成的文件，失败的文件会重试
+- 每个文件写入后发布导入事件；EVENT_BACKEND=postgres 时服务进程据此失效响应缓存和时间序列存储，
+  local 时回填在独立进程中运行，服务进程内的缓存不会随之失效，回填后需重启服务
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+from etf_service.app.logging_config import logger
+
+MANIFEST_NAME = ".backfill_manifest.json"
+
+_FILENAME_DATE = re.compile(r"(?<!\d)((?:19|20)\d{2})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)")
+
+
+def date_from_filename(name: str) -> Optional[date]:
+    """从文件名中取持仓日期，没有或不是合法日期时返回 None"""
+    for match in _FILENAME_DATE.finditer(os.path.basename(name)):
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            continue
+    return None
+
+
+def scan_files(directory: str, suffix: Union[str, Tuple[str, ...]] = ".txt") -> List[str]:
+    """递归列出目录下以 suffix（可为多个）结尾的文件（相对路径，按名称排序，跳过隐藏文件）"""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if name.endswith(suffix) and not name.startswith("."):
+                files.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(files)
+
+
+@dataclass
+class ManifestEntry:
+    sha256: str
+    status: str  # done / failed
+    date: Optional[str] = None
+    total_rows: int = 0
+    failed_rows: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+class Manifest:
+    """回填清单（JSON 文件），每次更新都写临时文件后 os.replace，中断时不会损坏"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = {name: ManifestEntry(**entry) for name, entry in data["files"].items()}
+
+    def update(self, name: str, entry: ManifestEntry) -> None:
+        entry.finished_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.entries[name] = entry
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": {k: asdict(v) for k, v in self.entries.items()}}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class ParsedFile:
+    name: str
+    sha256: str
+    date: Optional[date] = None
+    batch: object = None  # HoldingBatch；已完成的文件为 None
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+def parse_file(directory: str, name: str, done_sha256: Optional[str]) -> ParsedFile:
+    """
+    在子进程中执行：计算文件哈希，与清单中已完成的哈希一致时跳过，否则解析
+    解析错误（缺列、无法确定日期等）记录在 error 中返回
+    """
+    from etf_service.app.services.holding_parser import parse_holding_file
+
+    path = os.path.join(directory, name)
+    with open(path, "rb") as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 == done_sha256:
+        return ParsedFile(name, sha256, skipped=True)
+    default_date = date_from_filename(name)
+    try:
+        batch = parse_holding_file(io.BytesIO(content), default_date=default_date, require_date=True)
+    except ValueError as e:
+        return ParsedFile(name, sha256, default_date, error=str(e))
+    return ParsedFile(name, sha256, default_date, batch=batch)
+
+
+def write_file(parsed: ParsedFile, upsert: bool) -> dict:
+    """在写入线程中执行：整个文件在一个事务中写入，失败时回滚并抛出"""
+    from etf_service.app.database.session import SessionLocal
+    from etf_service.app.services.holding_record_service import write_records_bulk
+
+    with SessionLocal() as db:
+        return write_records_bulk(db, parsed.batch, upsert=upsert, raise_on_error=True)
+
+
+@dataclass
+class BackfillStats:
+    files: int = 0
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    rows: int = 0
+    failed_rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def run_backfill(
+    directory: str,
+    workers: Optional[int] = None,
+    writers: int = 2,
+    max_in_flight: Optional[int] = None,
+    manifest_path: Optional[str] = None,
+    suffix: Union[str, Tuple[str, ...]] = ".txt",
+    upsert: bool = True,
+) -> BackfillStats:
+    """
+    回填目录下的全部导出文件，返回统计
+    workers 默认为 CPU 核数；max_in_flight（解析中 + 等待写入 + 写入中的文件数）默认 workers + writers * 2
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers + writers * 2
+    manifest = Manifest(manifest_path or os.path.join(directory, MANIFEST_NAME))
+    names = scan_files(directory, suffix)
+    stats = BackfillStats(files=len(names))
+    start = time.perf_counter()
+
+    def finish(name: str, entry: ManifestEntry) -> None:
+        manifest.update(name, entry)
+        if entry.status == "done":
+            stats.done += 1
+            stats.rows += entry.total_rows - entry.failed_rows
+        else:
+            stats.failed += 1
+            logger.error(f"回填失败 {name}: {entry.error}")
+        stats.failed_rows += entry.failed_rows
+        logger.info(
+            f"回填进度 {stats.done + stats.failed + stats.skipped}/{stats.files}: {name} {entry.status}"
+        )
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    writer = ThreadPoolExecutor(max_workers=writers, thread_name_prefix="backfill-writer")
+    in_flight: Dict[Future, Tuple[str, str, Optional[ParsedFile]]] = {}
+    queue = iter(names)
+    try:
+        while True:
+            while len(in_flight) < max_in_flight:
+                name = next(queue, None)
+                if name is None:
+                    break
+                entry = manifest.entries.get(name)
+                done_sha256 = entry.sha256 if entry is not None and entry.status == "done" else None
+                in_flight[pool.submit(parse_file, directory, name, done_sha256)] = ("parse", name, None)
+            if not in_flight:
+                break
+
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                kind, name, parsed = in_flight.pop(future)
+                if kind == "parse":
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        # 读取文件失败或子进程异常退出
+                        finish(name, ManifestEntry("", "failed", error=str(e)))
+                        continue
+                    if parsed.skipped:
+                        stats.skipped += 1
+                    elif parsed.error is not None:
+                        finish(parsed.name, ManifestEntry(parsed.sha256, "failed", error=parsed.error))
+                    else:
+                        in_flight[writer.submit(write_file, parsed, upsert)] = ("write", name, parsed)
+                    continue
+
+                batch = parsed.batch
+                entry = ManifestEntry(
+                    parsed.sha256, "done",
+                    date=parsed.date.isoformat() if parsed.date else None,
+                    total_rows=batch.total_rows, failed_rows=batch.total_rows - len(batch),
+                )
+                try:
+                    entry.counts = future.result()
+                except Exception as e:
+                    entry.status, entry.error = "failed", str(e)
+                finish(name, entry)
+    finally:
+        # 中断（Ctrl+C）时丢弃尚未开始的解析任务；未记入清单的文件下次会重新导入（upsert 幂等）
+        pool.shutdown(wait=True, cancel_futures=True)
+        writer.shutdown(wait=True)
+
+    stats.seconds = time.perf_counter() - start
+    return stats
@@ -0,0 +1,166 @@
+# src/etf_service/app/services/bulk_writer.py
+"""
+holding_record 批量写入后端
+
+- copy:        PostgreSQL + psycopg2，使用 COPY FROM STDIN 从内存 CSV 缓冲区导入
+- executemany: SQLAlchemy Core insert + executemany（insertmanyvalues 分页），适用于所有方言
+- orm:         原有的 ORM add_all 写法，仅用于对比测试
+
+upsert_batch 按 (date, security_code, shareholder_account) 执行 INSERT ... ON CONFLICT DO UPDATE，
+重复上传时原地更新并统计新增/更新/未变化条数，以及批次内重复键被丢弃的行数。
+
+写入只在当前 Session 的事务中执行，提交由调用方负责。
+"""
+import io
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, Set
+
+from sqlalchemy import func, insert, or_, text
+from sqlalchemy.orm import Session
+
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.app.services.holding_parser import BATCH_COLUMNS, HoldingBatch
+from etf_service.config import BULK_WRITE_BACKEND, INSERT_PAGE_SIZE
+
+holding_table = HoldingRecord.__table__
+
+# 与唯一索引 uq_holding_record_date_code_account 一致的冲突键
+UPSERT_KEY = ["date", "security_code", "shareholder_account"]
+UPSERT_INDEX_ELEMENTS = ["date", "security_code", text("coalesce(shareholder_account, '')")]
+
+
+@dataclass
+class UpsertStats:
+    inserted: int
+    updated: int
+    unchanged: int
+    seconds: float
+    # 批次内重复键被丢弃的行数（只保留最后一条），不计入 rows
+    duplicates_in_batch: int = 0
+    # 实际新增或更新过的证券代码和日期
+    touched_codes: Set[int] = field(default_factory=set)
+    touched_dates: Set[date] = field(default_factory=set)
+
+    @property
+    def rows(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+
+@dataclass
+class WriteStats:
+    backend: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def copy_writer(db: Session, batch: HoldingBatch) -> int:
+    """COPY FROM STDIN，CSV 中的空字段即 NULL，create_time 由服务端默认值填充"""
+    buf = io.StringIO()
+    batch.frame[BATCH_COLUMNS].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    columns = ", ".join(BATCH_COLUMNS)
+    dbapi_conn = db.connection().connection.dbapi_connection
+    with dbapi_conn.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {holding_table.name} ({columns}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+    return len(batch)
+
+
+def executemany_writer(db: Session, batch: HoldingBatch) -> int:
+    """Core insert executemany，不经过 ORM 实例和 identity map"""
+    rows = batch.to_rows()
+    if rows:
+        db.connection().execute(
+            insert(holding_table).execution_options(insertmanyvalues_page_size=INSERT_PAGE_SIZE),
+            rows,
+        )
+    return len(rows)
+
+
+def orm_writer(db: Session, batch: HoldingBatch) -> int:
+    """逐行构建 HoldingRecord 并 add_all（原实现）"""
+    orm_records = [HoldingRecord(**row) for row in batch.to_rows()]
+    db.add_all(orm_records)
+    db.flush()
+    return len(orm_records)
+
+
+BULK_WRITERS: Dict[str, Callable[[Session, HoldingBatch], int]] = {
+    "copy": copy_writer,
+    "executemany": executemany_writer,
+    "orm": orm_writer,
+}
+
+
+def resolve_backend(db: Session, backend: str = BULK_WRITE_BACKEND) -> str:
+    """auto: psycopg2 连接使用 COPY，其它方言使用 executemany"""
+    if backend != "auto":
+        if backend not in BULK_WRITERS:
+            raise ValueError(f"未知的批量写入后端: {backend}")
+        return backend
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        return "copy"
+    return "executemany"
+
+
+def write_batch(db: Session, batch: HoldingBatch, backend: str = BULK_WRITE_BACKEND) -> WriteStats:
+    """在当前事务中写入一个批次并返回耗时统计（不提交）"""
+    name = resolve_backend(db, backend)
+    start = time.perf_counter()
+    rows = BULK_WRITERS[name](db, batch)
+    return WriteStats(backend=name, rows=rows, seconds=time.perf_counter() - start)
+
+
+def dialect_insert(db: Session):
+    """当前连接方言的 insert（支持 on_conflict_do_update）"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    else:
+        raise ValueError(f"upsert 不支持当前数据库: {dialect}")
+    return upsert_insert
+
+
+def upsert_batch(db: Session, batch: HoldingBatch) -> UpsertStats:
+    """
+    批量 INSERT ... ON CONFLICT DO UPDATE（不提交）
+    只有字段确实变化的行才会被更新；返回行中 update_time 为空的是新增，其余为更新，
+    未返回的行即未变化；批次内重复键的行只写入最后一条，其余计入 duplicates_in_batch
+    """
+    start = time.perf_counter()
+    # 同一语句中不能两次更新同一行，批次内重复键保留最后一条
+    frame = batch.frame.drop_duplicates(subset=UPSERT_KEY, keep="last")
+    duplicates = len(batch.frame) - len(frame)
+    rows = HoldingBatch(frame=frame).to_rows()
+    if not rows:
+        return UpsertStats(0, 0, 0, time.perf_counter() - start, duplicates_in_batch=duplicates)
+
+    stmt = dialect_insert(db)(holding_table)
+    update_columns = [c for c in BATCH_COLUMNS if c not in UPSERT_KEY]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=UPSERT_INDEX_ELEMENTS,
+        set_={**{c: stmt.excluded[c] for c in update_columns}, "update_time": func.now()},
+        where=or_(*[holding_table.c[c].is_distinct_from(stmt.excluded[c]) for c in update_columns]),
+    ).returning(holding_table.c.security_code, holding_table.c.date, holding_table.c.update_time)
+
+    returned = db.connection().execute(stmt, rows).all()
+    inserted = sum(1 for _, _, update_time in returned if update_time is None)
+    return UpsertStats(
+        inserted=inserted,
+        updated=len(returned) - inserted,
+        unchanged=len(rows) - len(returned),
+        seconds=time.perf_counter() - start,
+        duplicates_in_batch=duplicates,
+        touched_codes={code for code, _, _ in returned},
+        touched_dates={day for _, day, _ in returned},
+    )
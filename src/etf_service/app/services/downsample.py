@@ -0,0 +1,137 @@
+# src/etf_service/app/services/downsample.py
+"""
+图表序列降采样（NumPy）
+
+按点数把序列等分为若干桶，每桶保留能代表形状的点，返回保留点的下标（升序）：
+- minmax：每桶保留最小值和最大值所在的点，峰谷不会被抹掉；全部桶用 reduceat 一次算出，没有 Python 循环
+- lttb：Largest-Triangle-Three-Buckets，每桶保留与上一桶选中点、下一桶均值构成三角形面积最大的点；
+  桶之间有先后依赖，按桶循环，桶内计算向量化
+多个字段共用一组日期时，对各字段分别选点后取并集，首尾两点总是保留
+"""
+from typing import Dict, List
+
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """把 [1, n-1) 等分为 buckets 个桶（首尾两点单独保留），返回 buckets + 1 个边界"""
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def _first_per_bucket(mask: np.ndarray, bucket: np.ndarray) -> np.ndarray:
+    """每个桶中第一个 mask 为 True 的下标（没有则该桶不出现）"""
+    pos = np.flatnonzero(mask)
+    b = bucket[pos]
+    return pos[np.concatenate(([True], b[1:] != b[:-1]))] if len(pos) else pos
+
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """每桶保留最小、最大值的下标，结果不超过 max_points（至少 4）个"""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max((max_points - 2) // 2, 1)
+    edges = _bucket_edges(n, buckets)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(buckets), sizes)
+    inner = y[1:n - 1]
+    starts = edges[:-1] - 1
+    # fmin / fmax 忽略 NaN；全为 NaN 的桶不保留点
+    lows = _first_per_bucket(inner == np.repeat(np.fmin.reduceat(inner, starts), sizes), bucket)
+    highs = _first_per_bucket(inner == np.repeat(np.fmax.reduceat(inner, starts), sizes), bucket)
+    return np.unique(np.concatenate(([0, n - 1], lows + 1, highs + 1)))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets，结果不超过 max_points 个"""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    max_points = max(max_points, 3)
+    x = x.astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    filled = np.where(valid, y, 0.0)
+    buckets = max_points - 2
+    edges = _bucket_edges(n, buckets)
+    # 各桶均值（下一桶的代表点），最后一桶的下一桶是末点；NaN 不计入均值
+    starts = edges[:-1]
+    counts = np.maximum(np.add.reduceat(valid[:n - 1].astype(np.int64), starts), 1)
+    avg_x = np.append(np.add.reduceat(x[:n - 1], starts) / np.diff(edges), x[-1])
+    avg_y = np.append(np.add.reduceat(filled[:n - 1], starts) / counts, filled[-1])
+
+    selected = np.empty(buckets + 2, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], filled[a]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs((ax - cx) * (filled[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        area[~valid[lo:hi]] = -1.0
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def select_indices(x: np.ndarray, columns: List[np.ndarray], max_points: int, method: str = "lttb") -> np.ndarray:
+    """
+    对共用 x 的多个字段降采样，返回保留点的下标；总点数不超过 max_points
+    每个字段分到 max_points / 字段数 个点，选点结果取并集
+    """
+    n = len(x)
+    if n <= max_points or not columns:
+        return np.arange(n)
+    per_field = max(max_points // len(columns), 4)
+    if method == "minmax":
+        picked = [minmax_indices(np.asarray(c, dtype=np.float64), per_field) for c in columns]
+    else:
+        picked = [lttb_indices(x, c, per_field) for c in columns]
+    return np.unique(np.concatenate(picked))
+
+
+def downsample_rows(rows: list, codes: List[int], names: List[str], max_points: int, method: str = "lttb") -> dict:
+    """
+    rows 为按 (证券代码, 日期) 排序的 (security_code, date, *字段) 查询结果
+    返回 {证券代码: {"date": [...], 字段: [...], "total_points": 原始点数}}，没有数据的代码为空序列；
+    保留点的值取自原始结果（整数列仍为整数，空值为 None）
+    """
+    series = {}
+    columns = list(zip(*rows)) if rows else [()] * (len(names) + 2)
+    code_arr = np.asarray(columns[0], dtype=np.int64)
+    # 日期转为天数作为横坐标
+    x_all = np.asarray(columns[1], dtype="datetime64[D]").astype(np.int64)
+    values = [np.asarray(c, dtype=np.float64) for c in columns[2:]]
+    for code in codes:
+        lo, hi = np.searchsorted(code_arr, code, side="left"), np.searchsorted(code_arr, code, side="right")
+        idx = lo + select_indices(x_all[lo:hi], [v[lo:hi] for v in values], max_points, method)
+        entry = {"date": [columns[1][i] for i in idx]}
+        for name, column in zip(names, columns[2:]):
+            entry[name] = [column[i] for i in idx]
+        entry["total_points"] = int(hi - lo)
+        series[str(code)] = entry
+    return series
+
+
+def downsample_store_series(
+    series: dict, codes: List[int], fields: Dict[str, str], start, end, max_points: int, method: str = "lttb"
+) -> dict:
+    """
+    与 downsample_rows 相同的输出，数据来自时间序列存储（series_store.SecuritySeries）
+    fields 为 {返回的序列名: holding_record 字段}
+    """
+    out = {}
+    for code in codes:
+        s = series[code]
+        window = s.window(start, end)
+        x = s.days[window]
+        idx = select_indices(x, [s.columns[f][window] for f in fields.values()], max_points, method)
+        idx = idx + window.start
+        entry = {"date": s.dates(idx)}
+        for name, field in fields.items():
+            entry[name] = s.values(field, idx)
+        entry["total_points"] = len(x)
+        out[str(code)] = entry
+    return out
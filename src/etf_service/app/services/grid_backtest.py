@@ -0,0 +1,234 @@
+# src/etf_service/app/services/grid_backtest.py
+"""
+香农半仓网格回测（向量化）
+
+策略：首日以初始价买入半仓，以首日价格为基准设置网格线
+（multiplicative: p0 * (1 + g)^k，否则 p0 * (1 + k * g)，k ∈ [-levels, levels]）。
+记上次成交所在网格为 m，价格触及 m+1 线卖出、触及 m-1 线买入（跳空多格时只成交一次），
+每次成交都把股票市值调整为（扣除手续费后）总资产的一半；超出网格范围后不再交易。
+
+实现要点:
+- 网格状态 m_t = clamp(m_{t-1}, floor(x_t), ceil(x_t))，x_t 为价格所在的连续网格坐标。
+  clamp 的复合仍是 clamp，因此用前缀扫描（log2(T) 次数组运算）一次求出整条状态序列
+- 每次调仓后股票和现金各占一半，相邻两次成交之间权益按 (1 + r) / 2 增长（r 为两次成交价之比），
+  含手续费时同样是常数因子，整条权益曲线是成交点增长因子的累乘
+- 所有参数组合按行堆叠成 (组合数, T) 矩阵，一次计算完整个参数扫描
+- pandas 只在汇总结果时按需导入，接口模块导入本模块不会加载 pandas
+"""
+from dataclasses import dataclass
+from itertools import product
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from etf_service.config import GRID_FEE_RATE, GRID_INITIAL_CAPITAL
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_FEE_RATE = GRID_FEE_RATE
+DEFAULT_INITIAL_CAPITAL = GRID_INITIAL_CAPITAL
+
+
+def grid_levels(
+    init_price: float,
+    grid_percent: float = 0.05,
+    n_levels_up: int = 10,
+    n_levels_down: int = 10,
+    multiplicative: bool = True,
+) -> np.ndarray:
+    """网格线价格（从低到高）"""
+    ks = np.arange(-n_levels_down, n_levels_up + 1)
+    if multiplicative:
+        levels = init_price * (1 + grid_percent) ** ks
+    else:
+        levels = init_price + ks * init_price * grid_percent
+    return np.sort(levels)
+
+
+@dataclass(frozen=True)
+class GridParams:
+    grid_percent: float = 0.05
+    levels: int = 10
+    multiplicative: bool = True
+
+
+def param_grid(
+    grid_percents: Iterable[float],
+    levels: Iterable[int],
+    multiplicative: Iterable[bool] = (True,),
+) -> List[GridParams]:
+    """参数笛卡尔积"""
+    return [GridParams(g, n, m) for g, n, m in product(grid_percents, levels, multiplicative)]
+
+
+def grid_coordinates(prices: np.ndarray, params: Sequence[GridParams]) -> np.ndarray:
+    """价格在每组参数网格中的连续坐标 x（整数即恰好位于网格线上），形状 (P, T)"""
+    g = np.array([p.grid_percent for p in params])[:, None]
+    mult = np.array([p.multiplicative for p in params])[:, None]
+    rel = prices[None, :] / prices[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(mult, np.log(rel) / np.log1p(g), (rel - 1) / g)
+    # 消除浮点误差，使恰好落在网格线上的价格得到整数坐标
+    return np.round(x, 9)
+
+
+def grid_state(x: np.ndarray, n_levels: np.ndarray) -> np.ndarray:
+    """
+    网格状态 m_t = clamp(m_{t-1}, lo_t, hi_t)，m_0 = 0
+    lo/hi 为离 x 最近的两条网格线（限制在 [-levels, levels] 内），
+    用 Hillis-Steele 前缀扫描合成 clamp：clamp_b ∘ clamp_a = clamp(clamp(lo_a), clamp(hi_a))
+    """
+    n = n_levels[:, None]
+    # 网格序号通常很小，用 int16 减少扫描时的内存带宽；层数超出 int16 范围时改用 int32，避免溢出回绕
+    dtype = np.int16 if n_levels.max() <= np.iinfo(np.int16).max else np.int32
+    lo = np.clip(np.floor(x), -n, n).astype(dtype)
+    hi = np.clip(np.ceil(x), -n, n).astype(dtype)
+    steps = x.shape[1]
+    d = 1
+    while d < steps:
+        new_lo = np.maximum(lo[:, :-d], lo[:, d:])
+        np.minimum(new_lo, hi[:, d:], out=new_lo)
+        new_hi = np.maximum(hi[:, :-d], lo[:, d:])
+        np.minimum(new_hi, hi[:, d:], out=new_hi)
+        lo[:, d:] = new_lo
+        hi[:, d:] = new_hi
+        d *= 2
+    return np.minimum(np.maximum(lo, 0), hi)
+
+
+@dataclass
+class SweepResult:
+    """一条价格序列在多组参数下的回测结果，曲线形状均为 (P, T)"""
+
+    params: List[GridParams]
+    prices: np.ndarray
+    level: np.ndarray
+    position: np.ndarray
+    cash: np.ndarray
+    equity: np.ndarray
+    trade_mask: np.ndarray
+    initial_capital: float
+    fee_rate: float
+
+    def summary(self) -> "pd.DataFrame":
+        """每组参数的期末权益、收益率、最大回撤和成交次数，按收益率降序"""
+        import pandas as pd
+
+        peak = np.maximum.accumulate(self.equity, axis=1)
+        frame = pd.DataFrame({
+            "grid_percent": [p.grid_percent for p in self.params],
+            "levels": [p.levels for p in self.params],
+            "multiplicative": [p.multiplicative for p in self.params],
+            "final_equity": self.equity[:, -1],
+            "total_return": self.equity[:, -1] / self.initial_capital - 1,
+            "max_drawdown": (1 - self.equity / peak).max(axis=1),
+            # 不计首日建仓
+            "trade_count": self.trade_mask[:, 1:].sum(axis=1),
+        })
+        return frame.sort_values("total_return", ascending=False, kind="stable")
+
+    def trades(self, i: int, dates: Optional[Sequence] = None) -> List[dict]:
+        """第 i 组参数的成交明细（含首日建仓）"""
+        idx = np.flatnonzero(self.trade_mask[i])
+        qty = np.diff(self.position[i], prepend=0.0)[idx]
+        price = self.prices[idx]
+        return [
+            {
+                "date": dates[t] if dates is not None else int(t),
+                "side": "buy" if q > 0 else "sell",
+                "price": float(p),
+                "quantity": float(abs(q)),
+                "level": int(self.level[i, t]),
+                "fee": float(abs(q) * p * self.fee_rate),
+            }
+            for t, q, p in zip(idx, qty, price)
+        ]
+
+
+def run_sweep(
+    prices: Sequence[float],
+    params: Sequence[GridParams],
+    fee_rate: float = DEFAULT_FEE_RATE,
+    initial_capital: float = DEFAULT_INITIAL_CAPITAL,
+) -> SweepResult:
+    """对一条价格序列批量回测多组参数"""
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 1 or len(prices) == 0:
+        raise ValueError("价格序列不能为空")
+    if not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+        raise ValueError("价格必须为正数")
+    if any(p.grid_percent <= 0 or p.levels < 1 for p in params):
+        raise ValueError("网格间距必须大于 0，网格层数至少为 1")
+    params = list(params)
+
+    level = grid_state(grid_coordinates(prices, params), np.array([p.levels for p in params]))
+    trade_mask = np.zeros_like(level, dtype=bool)
+    trade_mask[:, 0] = True
+    trade_mask[:, 1:] = level[:, 1:] != level[:, :-1]
+
+    # 只在成交点计算增长因子：rows/cols 按行展开，每行第一笔是首日建仓
+    rows, cols = np.nonzero(trade_mask)
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    prev_cols = np.empty_like(cols)
+    prev_cols[0] = 0
+    prev_cols[1:] = cols[:-1]
+    r = prices[cols] / prices[np.where(first, cols, prev_cols)]
+
+    # 买入 (1 + r(1+f)) / (2+f)，卖出 (1 + r(1-f)) / (2-f)，首日建仓 2 / (2+f)
+    f = fee_rate
+    factor = np.where(r < 1, (1 + r * (1 + f)) / (2 + f), (1 + r * (1 - f)) / (2 - f))
+    factor[first] = 2 / (2 + f)
+    log_growth = np.cumsum(np.log(factor))
+    row_base = (log_growth - np.log(factor))[first]
+    counts = np.diff(np.append(np.flatnonzero(first), len(rows)))
+    settled_at_trade = initial_capital * np.exp(log_growth - np.repeat(row_base, counts))
+
+    # 每个时点对应最近一次成交：成交后的总资产和成交价
+    trade_id = np.cumsum(trade_mask.ravel()).reshape(trade_mask.shape) - 1
+    settled = settled_at_trade[trade_id]
+    cash = settled / 2
+    position = settled / (2 * prices[cols][trade_id])
+    equity = cash + position * prices[None, :]
+    return SweepResult(
+        params=params, prices=prices, level=level, position=position, cash=cash,
+        equity=equity, trade_mask=trade_mask, initial_capital=initial_capital, fee_rate=fee_rate,
+    )
+
+
+def run_backtest(
+    prices: Sequence[float],
+    params: GridParams = GridParams(),
+    fee_rate: float = DEFAULT_FEE_RATE,
+    initial_capital: float = DEFAULT_INITIAL_CAPITAL,
+) -> SweepResult:
+    """单组参数回测（结果为只有一行的 SweepResult）"""
+    return run_sweep(prices, [params], fee_rate=fee_rate, initial_capital=initial_capital)
+
+
+def sweep_all(
+    price_frame: "pd.DataFrame",
+    params: Sequence[GridParams],
+    fee_rate: float = DEFAULT_FEE_RATE,
+    initial_capital: float = DEFAULT_INITIAL_CAPITAL,
+) -> "pd.DataFrame":
+    """
+    对多只证券做参数扫描，price_frame 为 security_code / date / latest_price 长表
+    返回每只证券每组参数的汇总
+    """
+    import pandas as pd
+
+    frames = []
+    ordered = price_frame.sort_values(["security_code", "date"])
+    for code, group in ordered.groupby("security_code", sort=False):
+        prices = group["latest_price"].to_numpy(dtype=np.float64)
+        prices = prices[np.isfinite(prices) & (prices > 0)]
+        if len(prices) < 2:
+            continue
+        summary = run_sweep(prices, params, fee_rate, initial_capital).summary()
+        summary.insert(0, "security_code", code)
+        frames.append(summary)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,389 @@
+# src/etf_service/app/services/holding_parser.py
+"""
+持仓导出文件的列式解析
+
+按列完成清洗和校验，校验规则与 HoldingRecordCreate 字段保持一致，
+结果直接是 holding_record 表字段名组成的批次，可直接用于批量插入。
+支持制表符分隔的 txt 和 Excel（xlsx / xls，见 workbook_parser），按文件头识别格式。
+"""
+import codecs
+import io
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from etf_service.app.metrics import INGEST_ROWS_TOTAL, stage
+from etf_service.app.schemas.holding_record import HoldingRecordCreate
+
+# 导出文件列名（HoldingRecordCreate 别名） -> holding_record 表字段
+COLUMN_MAP: Dict[str, str] = {
+    "证券代码": "security_code",
+    "证券名称": "security_name",
+    "持仓数量": "holding_amount",
+    "可用数量": "available_amount",
+    "成本价": "cost_price",
+    "最新价": "latest_price",
+    "持仓盈亏比例": "holding_profit_ratio",
+    "持仓盈亏": "holding_profit",
+    "当日盈亏比例": "daily_profit_ratio",
+    "当日盈亏": "daily_profit",
+    "买入均价": "avg_buy_price",
+    "个股仓位": "position_ratio",
+    "最新市值": "latest_value",
+    "交易市场": "market",
+    "股东账号": "shareholder_account",
+    "币种": "currency",
+}
+INT_COLUMNS = ["持仓数量", "可用数量"]
+FLOAT_COLUMNS = [
+    "成本价", "最新价", "持仓盈亏比例", "持仓盈亏", "当日盈亏比例",
+    "当日盈亏", "买入均价", "个股仓位", "最新市值",
+]
+# 百分比列：去掉 % 后无法转换的值按空值处理（与原 parse_excel 一致）
+PERCENT_COLUMNS = ["持仓盈亏比例", "当日盈亏比例", "个股仓位"]
+STR_COLUMNS = ["证券名称", "交易市场", "股东账号", "币种"]
+REQUIRED_COLUMNS = [
+    f.alias for f in HoldingRecordCreate.model_fields.values()
+    if f.alias and f.is_required()
+]
+BATCH_COLUMNS = ["date"] + list(COLUMN_MAP.values())
+# 解析时先用占位日期补全缺少日期的行，写入前再由 fill_default_date 换成实际日期，
+# 这样同一文件的解析结果与上传日期无关，可以缓存复用
+DEFAULT_DATE_PLACEHOLDER = date(1900, 1, 1)
+# xlsx 为 zip 包，xls 为 OLE2 复合文档
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+@dataclass
+class RowError:
+    """单行校验失败信息，row 为数据行号（从 1 开始，不含表头）"""
+    row: int
+    column: str
+    message: str
+
+
+@dataclass
+class Mismatch:
+    """导出值与由数量、价格重新计算的值超出容差（见 pnl_reconcile）"""
+    date: str
+    security_code: int
+    shareholder_account: Optional[str]
+    field: str
+    reported: float
+    computed: float
+
+
+@dataclass
+class HoldingBatch:
+    """
+    校验通过的持仓数据批次
+    frame 的列为 holding_record 表字段名，空值为 NaN/None
+    """
+    frame: pd.DataFrame
+    errors: List[RowError] = field(default_factory=list)
+    total_rows: int = 0
+    mismatches: List[Mismatch] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def to_rows(self) -> List[dict]:
+        """转换为 insert 可直接使用的字典列表（NaN -> None）"""
+        frame = self.frame.astype(object)
+        return frame.where(self.frame.notna(), None).to_dict("records")
+
+    def error_report(self, limit: Optional[int] = None) -> List[dict]:
+        errors = self.errors if limit is None else self.errors[:limit]
+        return [asdict(e) for e in errors]
+
+    def mismatch_report(self, limit: Optional[int] = None) -> List[dict]:
+        mismatches = self.mismatches if limit is None else self.mismatches[:limit]
+        return [asdict(m) for m in mismatches]
+
+    @classmethod
+    def from_records(cls, records: List[HoldingRecordCreate]) -> "HoldingBatch":
+        """由已校验的 HoldingRecordCreate 列表构建批次（兼容单条/旧调用方）"""
+        data = [r.model_dump(by_alias=True) for r in records]
+        frame = pd.DataFrame(data, columns=["date"] + list(COLUMN_MAP))
+        frame = frame.rename(columns=COLUMN_MAP)
+        frame["security_code"] = pd.to_numeric(frame["security_code"]).astype("int64")
+        return cls(frame=frame, total_rows=len(records))
+
+
+def fill_default_date(batch: HoldingBatch, default_date: date) -> int:
+    """把占位日期换成 default_date（原地修改），返回替换的行数"""
+    mask = (batch.frame["date"] == DEFAULT_DATE_PLACEHOLDER).to_numpy()
+    if mask.any():
+        batch.frame.loc[mask, "date"] = default_date
+    return int(mask.sum())
+
+
+def record_to_row(record: HoldingRecordCreate) -> dict:
+    """单条 HoldingRecordCreate -> holding_record 表字段字典"""
+    data = record.model_dump(by_alias=True)
+    row = {"date": data["date"]}
+    row.update({column: data[alias] for alias, column in COLUMN_MAP.items()})
+    row["security_code"] = int(row["security_code"])
+    return row
+
+
+def decode_content(content: bytes) -> str:
+    """UTF-8 解码，失败时回退 GBK"""
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("gbk", errors="ignore")
+
+
+class DecodedReader(io.TextIOBase):
+    """
+    对二进制流做增量解码，供 pandas 分块读取
+    默认按 UTF-8 解码，遇到非法字节后当前块及剩余内容改用 GBK；
+    GBK 文件的表头即含中文，因此通常在第一块就完成切换
+    """
+
+    def __init__(self, raw: BinaryIO, chunk_size: int = 1024 * 1024):
+        self._raw = raw
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._eof = False
+        self.codec = "utf-8"
+
+    def readable(self) -> bool:
+        return True
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        pending, _ = self._decoder.getstate()
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self.codec = "gbk"
+            self._decoder = codecs.getincrementaldecoder("gbk")(errors="ignore")
+            return self._decoder.decode(pending + data, final)
+
+    def read(self, size: Optional[int] = -1) -> str:
+        size = -1 if size is None else size
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            data = self._raw.read(self._chunk_size)
+            self._eof = not data
+            self._buffer += self._decode(data, final=self._eof)
+        if size < 0:
+            size = len(self._buffer)
+        out, self._buffer = self._buffer[:size], self._buffer[size:]
+        return out
+
+
+def sniff_format(raw: BinaryIO) -> str:
+    """按文件头判断格式（xlsx / xls / txt），读取后回到原位置"""
+    start = raw.tell()
+    head = raw.read(len(XLS_MAGIC))
+    raw.seek(start)
+    if head.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if head == XLS_MAGIC:
+        return "xls"
+    return "txt"
+
+
+def read_holding_excel(raw: BinaryIO, fmt: str, chunksize: Optional[int] = None):
+    """
+    读取 Excel 工作簿（openpyxl / xlrd 在此时才加载），返回字符串 DataFrame 的迭代器
+    工作簿损坏或找不到表头时抛出 ValueError
+    """
+    from etf_service.app.services.workbook_parser import read_workbook
+
+    chunks = read_workbook(raw, fmt, chunksize=chunksize)
+    while True:
+        try:
+            with stage("read_excel"):
+                chunk = next(chunks)
+        except StopIteration:
+            return
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"无法解析 Excel 文件: {e}")
+        yield chunk
+
+
+def read_holding_text(text_io, chunksize: Optional[int] = None):
+    """
+    以 C 引擎读取制表符分隔文本，所有单元格保持为字符串，由 build_batch 按列转换
+    指定 chunksize 时返回按行分块的迭代器
+    """
+    try:
+        return pd.read_csv(
+            text_io,
+            sep="\t",
+            dtype=str,
+            engine="c",
+            skip_blank_lines=True,
+            chunksize=chunksize,
+        )
+    except Exception as e:
+        raise ValueError(f"无法解析文件: {e}")
+
+
+def _blank_to_na(s: pd.Series) -> pd.Series:
+    return s.mask(s.str.strip().eq(""))
+
+
+def _to_number(s: pd.Series, percent: bool = False):
+    """返回 (数值列, 无法转换的非空值掩码)"""
+    s = s.str.strip()
+    if percent:
+        s = s.str.replace("%", "", regex=False)
+    s = s.mask(s.eq(""))
+    values = pd.to_numeric(s, errors="coerce")
+    return values.astype("float64"), (s.notna() & values.isna()).to_numpy()
+
+
+def build_batch(
+    raw: pd.DataFrame,
+    row_offset: int = 0,
+    default_date: Optional[date] = None,
+    require_date: bool = False,
+) -> HoldingBatch:
+    """
+    按列校验原始字符串 DataFrame 并生成 HoldingBatch
+    row_offset 用于分块解析时换算出全文件中的行号
+    require_date=True 且未给出 default_date 时不用当天日期补全（历史回填），
+    文件没有 date 列则报错，date 为空的行记为失败
+    """
+    raw = raw.copy()
+    raw.columns = [str(c).strip() for c in raw.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in raw.columns]
+    if missing:
+        raise ValueError(f"缺少必填列: {', '.join(missing)}")
+
+    n = len(raw)
+    row_numbers = np.arange(row_offset + 1, row_offset + n + 1)
+    invalid = np.zeros(n, dtype=bool)
+    errors: List[RowError] = []
+    out: Dict[str, pd.Series] = {}
+
+    def flag(mask: np.ndarray, column: str, message: str):
+        nonlocal invalid
+        if mask.any():
+            invalid |= mask
+            errors.extend(RowError(int(r), column, message) for r in row_numbers[mask])
+
+    def column(name: str) -> pd.Series:
+        if name in raw.columns:
+            return raw[name]
+        return pd.Series(np.nan, index=raw.index, dtype=object)
+
+    # 日期：文件中有 date 列则使用，否则默认当天
+    if default_date is None and not require_date:
+        default_date = date.today()
+    if "date" in raw.columns:
+        s = _blank_to_na(column("date"))
+        parsed = pd.to_datetime(s, errors="coerce")
+        flag((s.notna() & parsed.isna()).to_numpy(), "date", "日期格式错误")
+        if default_date is None:
+            flag(s.isna().to_numpy(), "date", "缺少必填字段")
+        out["date"] = parsed.dt.date.where(parsed.notna(), default_date)
+    elif default_date is None:
+        raise ValueError("无法确定持仓日期：文件中没有 date 列")
+    else:
+        out["date"] = pd.Series([default_date] * n, index=raw.index, dtype=object)
+
+    # 证券代码：schema 中为字符串，入库列为整数
+    code = column("证券代码").str.strip()
+    code = code.mask(code.eq(""))
+    flag(code.isna().to_numpy(), "证券代码", "缺少必填字段")
+    code_num = pd.to_numeric(code, errors="coerce")
+    flag((code.notna() & (code_num.isna() | (code_num % 1 != 0))).to_numpy(), "证券代码", "证券代码必须为整数")
+    out["security_code"] = code_num
+
+    for alias in INT_COLUMNS + FLOAT_COLUMNS:
+        values, bad = _to_number(column(alias), percent=alias in PERCENT_COLUMNS)
+        if alias not in PERCENT_COLUMNS:
+            flag(bad, alias, "无法转换为数值")
+        if alias in REQUIRED_COLUMNS:
+            flag(values.isna().to_numpy() & ~bad, alias, "缺少必填字段")
+        if alias in INT_COLUMNS:
+            flag((values.notna() & (values % 1 != 0)).to_numpy(), alias, "必须为整数")
+        out[COLUMN_MAP[alias]] = values
+
+    for alias in STR_COLUMNS:
+        s = _blank_to_na(column(alias))
+        if alias in REQUIRED_COLUMNS:
+            flag(s.isna().to_numpy(), alias, "缺少必填字段")
+        out[COLUMN_MAP[alias]] = s
+
+    frame = pd.DataFrame(out, index=raw.index)[BATCH_COLUMNS][~invalid].reset_index(drop=True)
+    for alias in INT_COLUMNS:
+        frame[COLUMN_MAP[alias]] = frame[COLUMN_MAP[alias]].astype("int64")
+    frame["security_code"] = frame["security_code"].astype("int64")
+
+    errors.sort(key=lambda e: e.row)
+    INGEST_ROWS_TOTAL.inc(int(invalid.sum()), result="failed")
+    return HoldingBatch(frame=frame, errors=errors, total_rows=n)
+
+
+def parse_holding_txt(
+    content: bytes, default_date: Optional[date] = None, require_date: bool = False
+) -> HoldingBatch:
+    """解析完整的 txt 文件内容（UTF-8 / GBK，制表符分隔）"""
+    with stage("decode"):
+        text = decode_content(content)
+    with stage("read_csv"):
+        raw = read_holding_text(io.StringIO(text))
+    with stage("validate"):
+        return build_batch(raw, default_date=default_date, require_date=require_date)
+
+
+def parse_holding_file(
+    raw: BinaryIO, default_date: Optional[date] = None, require_date: bool = False
+) -> HoldingBatch:
+    """解析完整的上传文件，txt 或 Excel 按文件头识别"""
+    fmt = sniff_format(raw)
+    if fmt == "txt":
+        return parse_holding_txt(raw.read(), default_date=default_date, require_date=require_date)
+    frame = next(read_holding_excel(raw, fmt))
+    with stage("validate"):
+        return build_batch(frame, default_date=default_date, require_date=require_date)
+
+
+def iter_holding_batches(
+    raw: BinaryIO,
+    batch_size: int,
+    read_chunk_size: int = 1024 * 1024,
+    default_date: Optional[date] = None,
+) -> Iterator[HoldingBatch]:
+    """
+    流式解析二进制文件（txt 或 Excel），每次产出最多 batch_size 行的 HoldingBatch
+    RowError 中的行号为全文件（Excel 为表头之后）的数据行号
+    """
+    fmt = sniff_format(raw)
+    if fmt != "txt":
+        offset = 0
+        for chunk in read_holding_excel(raw, fmt, chunksize=batch_size):
+            with stage("validate"):
+                batch = build_batch(chunk, row_offset=offset, default_date=default_date)
+            yield batch
+            offset += len(chunk)
+        return
+
+    reader = read_holding_text(DecodedReader(raw, read_chunk_size), chunksize=batch_size)
+    offset = 0
+    with reader:
+        while True:
+            try:
+                # 分块读取时解码在 read_csv 内部增量完成，不单独计时
+                with stage("read_csv"):
+                    chunk = next(reader)
+            except StopIteration:
+                return
+            except Exception as e:
+                raise ValueError(f"无法解析文件（第 {offset + 1} 行之后）: {e}")
+            with stage("validate"):
+                batch = build_batch(chunk, row_offset=offset, default_date=default_date)
+            yield batch
+            offset += len(chunk)
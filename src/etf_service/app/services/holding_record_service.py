@@ -1,176 +1,366 @@
 # src/etf_service/app/services/holding_service.py
-import pandas as pd
 import logging
-from datetime import date
 from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from etf_service.app.cache import response_cache
 from etf_service.app.database.session import SessionLocal
+from etf_service.app.events import event_broker
+from etf_service.app.executors import get_executor
+from etf_service.app.metrics import INGEST_ROWS_TOTAL, stage
 from etf_service.app.models.holding_record import HoldingRecord
 from etf_service.app.schemas.holding_record import HoldingRecordCreate
-from concurrent.futures import ThreadPoolExecutor
+from etf_service.app.series_store import series_store
+from etf_service.app.services.bulk_writer import upsert_batch, write_batch
+from etf_service.app.services.holding_parser import (
+    DEFAULT_DATE_PLACEHOLDER, HoldingBatch, fill_default_date, iter_holding_batches,
+    parse_holding_file, record_to_row
+)
+from etf_service.app.services.parsed_cache import parsed_cache
+from etf_service.app.services.pnl_reconcile import reconcile_batch
+from etf_service.app.services.portfolio_summary_service import refresh_daily_summary
+from etf_service.app.services.upload_digest_service import (
+    duplicate_result, find_duplicate, record_upload, sha256_of
+)
+from etf_service.config import INGEST_BATCH_SIZE, UPLOAD_READ_CHUNK_SIZE
 import asyncio
-from typing import List
+import contextvars
+from collections import Counter
+from datetime import date
+from functools import partial
+from typing import BinaryIO, Callable, List, Optional, Union
+
+import pandas as pd
 
 from etf_service.app.logging_config import logger
 
-logger.info("开始插入数据")
-executor = ThreadPoolExecutor(max_workers=4)  # 可根据服务器CPU调整
+MAX_REPORTED_ERRORS = 100  # 响应中最多列出的失败行数
+ERROR_LOG_SAMPLES = 5  # 解析失败汇总日志中列出的行数
 
 # -----------------------
 # 1. Excel解析函数
 # -----------------------
 # src/etf_service/app/services/holding_service.py
-def parse_excel(file: UploadFile) -> List[HoldingRecordCreate]:
+def parse_excel(file: UploadFile, sha256: Optional[str] = None) -> HoldingBatch:
     """
-    解析上传的 txt 文件（UTF-8编码，制表符分隔）
+    解析上传的 txt 文件（UTF-8编码，制表符分隔）或 Excel 工作簿（xlsx / xls）
+    按列清洗和校验，返回可直接批量插入的 HoldingBatch，失败行记录在 batch.errors
+    给出 sha256 时优先读取解析缓存，未命中则解析后写入缓存；
+    缺少日期的行为占位日期，写入前需调用 fill_default_date
     """
-    import io
-
-    logger.info(f"TXT 文件开始解析: {file.filename}")
-
-    # Step 1: 读取文件内容
-    content = file.file.read()
-    sample_bytes = content[:200]
-    logger.info(f"文件头前200字节: {sample_bytes}")
-
-    # Step 2: 解码为字符串（默认UTF-8）
-    try:
-        text_io = io.StringIO(content.decode("utf-8"))
-    except UnicodeDecodeError:
-        logger.warning("UTF-8 解码失败，尝试 GBK")
-        text_io = io.StringIO(content.decode("gbk", errors="ignore"))
-
-    # Step 3: 使用 pandas 读取为 DataFrame
-    try:
-        df = pd.read_csv(
-            text_io,
-            sep="\t",  # 明确是制表符分隔
-            engine="python",
-            skip_blank_lines=True
+    cached = parsed_cache.get(sha256) if sha256 else None
+    if cached is not None:
+        parts = list(cached)
+        logger.info(f"文件命中解析缓存: {file.filename}")
+        return HoldingBatch(
+            frame=pd.concat([p.frame for p in parts], ignore_index=True),
+            errors=[e for p in parts for e in p.errors],
+            total_rows=sum(p.total_rows for p in parts),
         )
-        logger.info(f"TXT 文件解析成功，共 {len(df)} 行，列名: {df.columns.tolist()}")
-    except Exception as e:
-        logger.error(f"TXT 文件解析失败: {e}")
-        raise ValueError(f"无法解析文件: {e}")
-    print(df.head())
-    
-    # Step 4: 清洗列名
-    df.columns = [str(c).strip() for c in df.columns]
-
-    # ✅ 清洗数据
-    # 1. 把证券代码转为字符串（防止被识别为int）
-    if "证券代码" in df.columns:
-        df["证券代码"] = df["证券代码"].astype(str)
-
-    # 2. 去掉百分号并转为浮点数
-    percent_columns = ["持仓盈亏比例", "当日盈亏比例", "个股仓位"]
-    for col in percent_columns:
-        if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace("%", "", regex=False)
-                .replace({"nan": None, "": None})
-            )
-            df[col] = pd.to_numeric(df[col], errors="coerce")  # 转 float，无法转的设为 NaN
-
-    # 3. 空字符串转为 None
-    df = df.replace({r"^\s*$": None}, regex=True)
-
-
-    # Step 5: 映射为 Pydantic 模型
-    records: List[HoldingRecordCreate] = []
-    for idx, row in df.iterrows():
-        try:
-            record_dict = {k: v for k, v in row.to_dict().items() if pd.notna(v)}
-            record_dict.setdefault("date", date.today())
-            record = HoldingRecordCreate(**record_dict)
-            records.append(record)
-        except Exception as e:
-            logger.warning(f"第 {idx+1} 行解析失败: {e}")
-            continue
 
-    logger.info(f"成功解析 {len(records)} 条记录")
-    print(records[:3])  # 打印前5条记录以供检查u
-    
-    return records
+    logger.info(f"文件开始解析: {file.filename}")
+    batch = parse_holding_file(file.file, default_date=DEFAULT_DATE_PLACEHOLDER)
+    writer = parsed_cache.writer(sha256) if sha256 else None
+    if writer is not None:
+        writer.add(batch)
+        writer.commit()
+    logger.info(
+        f"文件解析完成，共 {batch.total_rows} 行，"
+        f"成功 {len(batch)} 行，失败 {batch.total_rows - len(batch)} 行"
+    )
+    log_parse_errors(batch, file.filename)
+    return batch
 
 
+def log_parse_errors(batch: HoldingBatch, filename: Optional[str] = None) -> None:
+    """解析失败的行汇总为一条日志：失败行数、各列失败次数和前几行明细"""
+    if not batch.errors:
+        return
+    by_column = Counter(e.column for e in batch.errors)
+    logger.warning(
+        f"{filename or '上传文件'} 有 {len(batch.errors)} 行解析失败："
+        + "，".join(f"{column} {count} 行" for column, count in by_column.most_common()),
+        extra={
+            "failed_rows": len(batch.errors),
+            "by_column": dict(by_column),
+            "samples": [f"第 {e.row} 行 {e.column}: {e.message}" for e in batch.errors[:ERROR_LOG_SAMPLES]],
+        },
+    )
 
 
 
 # -----------------------
 # 2. 单条插入函数
 # -----------------------
-def insert_record(db: Session, record_in: HoldingRecordCreate) -> HoldingRecord:
+async def insert_record(db: AsyncSession, record_in: HoldingRecordCreate) -> HoldingRecord:
     """
     单条数据插入数据库
     """
-    record = HoldingRecord(**record_in.dict(by_alias=True))
-    p
+    row = record_to_row(record_in)
+    record = HoldingRecord(**row)
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.flush()
+    await db.run_sync(refresh_daily_summary, [record.date])
+    await db.commit()
+    await db.refresh(record)
+    response_cache.invalidate_codes([record.security_code])
+    series_store.merge({key: [value] for key, value in row.items()})
+    event_broker.publish_ingest([record.security_code], [record.date], 1, source="insert")
     return record
 
 # -----------------------
 # 3. 批量插入函数（高性能）
 # -----------------------
-def insert_records_bulk(db: Session, records: List[HoldingRecordCreate]) -> int:
+def insert_records_bulk(
+    db: Session,
+    records: Union[HoldingBatch, List[HoldingRecordCreate]],
+    raise_on_error: bool = False,
+) -> int:
     """
     批量插入，减少commit次数，提高性能
+    records 可以是列式解析得到的 HoldingBatch，也可以是 HoldingRecordCreate 列表
+    raise_on_error=True 时回滚后抛出异常，否则返回 0
     """
-    
-    
-    orm_records = []
-    for r in records:
-        record_data = r.dict(by_alias=True)
-        orm_record = HoldingRecord(
-            date=record_data["date"],
-            security_code=record_data["证券代码"],
-            security_name=record_data["证券名称"],
-            holding_amount=record_data["持仓数量"],
-            available_amount=record_data["可用数量"],
-            cost_price=record_data["成本价"],
-            latest_price=record_data["最新价"],
-            holding_profit_ratio=record_data.get("持仓盈亏比例"),
-            holding_profit=record_data.get("持仓盈亏"),
-            daily_profit_ratio=record_data.get("当日盈亏比例"),
-            daily_profit=record_data.get("当日盈亏"),
-            avg_buy_price=record_data.get("买入均价"),
-            position_ratio=record_data.get("个股仓位"),
-            latest_value=record_data.get("最新市值"),
-            market=record_data.get("交易市场"),
-            shareholder_account=record_data.get("股东账号"),
-            currency=record_data.get("币种"),
-        )
-        orm_records.append(orm_record)
+    if not isinstance(records, HoldingBatch):
+        records = HoldingBatch.from_records(records)
+
     try:
-        db.add_all(orm_records)
-        db.commit()
-        inserted_count = len(orm_records)
-        return inserted_count
+        with stage("write"):
+            stats = write_batch(db, records)
+        with stage("summary"):
+            refresh_daily_summary(db, records.frame["date"].unique())
+        with stage("commit"):
+            db.commit()
+        INGEST_ROWS_TOTAL.inc(stats.rows, result="written")
+        response_cache.invalidate_codes(records.frame["security_code"].unique())
+        series_store.merge(records.frame)
+        event_broker.publish_ingest(
+            records.frame["security_code"].unique(), records.frame["date"].unique(), stats.rows, source="upload"
+        )
+        logger.info(
+            f"批量插入 {stats.rows} 条（{stats.backend}），"
+            f"耗时 {stats.seconds:.3f}s，{stats.rows_per_sec:.0f} 行/秒"
+        )
+        return stats.rows
     except Exception as e:
         db.rollback()
         logger.error(f"批量插入失败: {e}")
+        if raise_on_error:
+            raise
         return 0
 
+
+def upsert_records_bulk(
+    db: Session,
+    records: Union[HoldingBatch, List[HoldingRecordCreate]],
+    raise_on_error: bool = False,
+) -> dict:
+    """
+    批量 upsert：按 (date, security_code, shareholder_account) 冲突时原地更新
+    返回新增/更新/未变化条数和批次内重复键被丢弃的行数，失败时回滚并全部返回 0（raise_on_error=True 时抛出）
+    """
+    if not isinstance(records, HoldingBatch):
+        records = HoldingBatch.from_records(records)
+
+    try:
+        with stage("upsert"):
+            stats = upsert_batch(db, records)
+        with stage("summary"):
+            refresh_daily_summary(db, stats.touched_dates)
+        with stage("commit"):
+            db.commit()
+        INGEST_ROWS_TOTAL.inc(stats.inserted + stats.updated, result="written")
+        response_cache.invalidate_codes(stats.touched_codes)
+        series_store.merge(records.frame)
+        event_broker.publish_ingest(
+            stats.touched_codes, stats.touched_dates, stats.inserted + stats.updated, source="upload"
+        )
+        logger.info(
+            f"批量 upsert {stats.rows} 条：新增 {stats.inserted}，更新 {stats.updated}，"
+            f"未变化 {stats.unchanged}，批次内重复丢弃 {stats.duplicates_in_batch}，耗时 {stats.seconds:.3f}s"
+        )
+        return {
+            "inserted_count": stats.inserted,
+            "updated_count": stats.updated,
+            "unchanged_count": stats.unchanged,
+            "duplicates_in_batch_count": stats.duplicates_in_batch,
+        }
+    except Exception as e:
+        db.rollback()
+        logger.error(f"批量 upsert 失败: {e}")
+        if raise_on_error:
+            raise
+        return {"inserted_count": 0, "updated_count": 0, "unchanged_count": 0, "duplicates_in_batch_count": 0}
+
+
+def empty_counts(upsert: bool) -> dict:
+    counts = {"inserted_count": 0, "mismatch_count": 0, "filled_count": 0}
+    if upsert:
+        counts.update(updated_count=0, unchanged_count=0, duplicates_in_batch_count=0)
+    return counts
+
+
+def reconcile_records(db: Session, batch: HoldingBatch) -> dict:
+    """写入前核对盈亏字段（见 pnl_reconcile）；核对本身出错时只记录日志，不影响导入"""
+    try:
+        with stage("reconcile"):
+            return reconcile_batch(db, batch)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"盈亏核对失败，按导出值写入: {e}")
+        return {"mismatch_count": 0, "filled_count": 0}
+
+
+def write_records_bulk(
+    db: Session, batch: HoldingBatch, upsert: bool = False, raise_on_error: bool = False
+) -> dict:
+    """按导入模式核对并写入一个批次，返回各项计数（含核对的不一致/补全字段数）"""
+    reconciled = reconcile_records(db, batch)
+    if upsert:
+        return {**upsert_records_bulk(db, batch, raise_on_error=raise_on_error), **reconciled}
+    return {"inserted_count": insert_records_bulk(db, batch, raise_on_error=raise_on_error), **reconciled}
+
 # -----------------------
 # 4. 异步 Excel 上传处理函数
 # -----------------------
-async def insert_excel_to_db(file: UploadFile) -> int:
+def _deduplicated(file: UploadFile, upsert: bool, force: bool, ingest: Callable[[str], dict]) -> dict:
+    """
+    计算上传内容的 sha256，已成功导入过时返回首次的结果（force=True 时跳过检查），
+    否则执行 ingest(sha256=...) 并在成功后记录
+    """
+    with stage("hash"):
+        sha256, size = sha256_of(file.file)
+    if not force:
+        with SessionLocal() as db:
+            digest = find_duplicate(db, sha256)
+            if digest is not None:
+                logger.info(f"重复上传 {file.filename}，与 {digest.filename} 内容相同，跳过导入")
+                return duplicate_result(digest)
+    result = ingest(sha256=sha256)
+    with SessionLocal() as db:
+        record_upload(db, sha256, file.filename, size, upsert, result)
+    return result
+
+
+async def insert_excel_to_db(file: UploadFile, upsert: bool = False, force: bool = False) -> dict:
     """
     上传 Excel 文件，解析并批量插入数据库
     使用线程池处理阻塞的数据库操作，支持大文件
+    upsert=True 时重复数据原地更新
+    返回插入（及更新/未变化）条数、解析失败行以及盈亏核对不一致的报告；
+    内容与已成功导入的文件相同时直接返回首次的结果（duplicate=true）
     """
     logger.info("开始处理 Excel 上传")
-    records = parse_excel(file)
     loop = asyncio.get_running_loop()
 
-    # 每个线程使用独立 Session
-    def db_task():
+    # 解析和写入都在线程池中执行，不阻塞事件循环；每个线程使用独立 Session
+    def db_task(sha256: str) -> dict:
+        batch = parse_excel(file, sha256)
+        today = date.today()
+        defaulted = fill_default_date(batch, today)
         with SessionLocal() as db:
-            return insert_records_bulk(db, records)
+            try:
+                counts = write_records_bulk(db, batch, upsert=upsert, raise_on_error=True)
+            except Exception as e:
+                return {
+                    **empty_counts(upsert),
+                    "failed_count": batch.total_rows - len(batch),
+                    "errors": batch.error_report(MAX_REPORTED_ERRORS),
+                    "mismatches": [],
+                    "failed_chunks": [{"start_row": 1, "end_row": batch.total_rows, "error": str(e)}],
+                }
+        return {
+            **counts,
+            "failed_count": batch.total_rows - len(batch),
+            "errors": batch.error_report(MAX_REPORTED_ERRORS),
+            "mismatches": batch.mismatch_report(MAX_REPORTED_ERRORS),
+            "default_date": today.isoformat() if defaulted else None,
+        }
+
+    # 在复制的上下文中运行，各阶段耗时才能汇总到当前请求（慢请求日志）
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), ctx.run, _deduplicated, file, upsert, force, db_task)
 
-    inserted_count = await loop.run_in_executor(executor, db_task)
-    return inserted_count
+
+# -----------------------
+# 5. 流式分块导入（大文件，内存占用恒定）
+# -----------------------
+def ingest_stream(
+    raw: BinaryIO,
+    batch_size: int = INGEST_BATCH_SIZE,
+    upsert: bool = False,
+    on_batch: Optional[Callable[[HoldingBatch, int], None]] = None,
+    sha256: Optional[str] = None,
+) -> dict:
+    """
+    分块读取上传文件，逐批解析并插入，内存占用只与 batch_size 有关
+    每个批次独立提交，失败的批次回滚并在 failed_chunks 中给出数据行号范围
+    on_batch(batch, end_row) 在每个批次处理完后调用，用于汇报进度
+    给出 sha256 时命中解析缓存则逐批读取缓存，否则边解析边写入缓存（完整解析后才提交）
+    """
+    result = {
+        **empty_counts(upsert),
+        "failed_count": 0, "errors": [], "mismatches": [], "failed_chunks": [], "default_date": None,
+    }
+    today = date.today()
+    start_row = 1
+    batches = parsed_cache.get(sha256) if sha256 else None
+    writer = None
+    if batches is None:
+        batches = iter_holding_batches(
+            raw, batch_size, read_chunk_size=UPLOAD_READ_CHUNK_SIZE, default_date=DEFAULT_DATE_PLACEHOLDER
+        )
+        writer = parsed_cache.writer(sha256) if sha256 else None
+    with SessionLocal() as db:
+        try:
+            for batch in batches:
+                if writer is not None:
+                    writer.add(batch)
+                if fill_default_date(batch, today):
+                    result["default_date"] = today.isoformat()
+                end_row = start_row + batch.total_rows - 1
+                try:
+                    counts = write_records_bulk(db, batch, upsert=upsert, raise_on_error=True)
+                    for key, value in counts.items():
+                        result[key] += value
+                except Exception as e:
+                    result["failed_chunks"].append(
+                        {"start_row": start_row, "end_row": end_row, "error": str(e)}
+                    )
+                result["failed_count"] += batch.total_rows - len(batch)
+                for key, report in (("errors", batch.error_report), ("mismatches", batch.mismatch_report)):
+                    remaining = MAX_REPORTED_ERRORS - len(result[key])
+                    if remaining > 0:
+                        result[key].extend(report(remaining))
+                if on_batch is not None:
+                    on_batch(batch, end_row)
+                start_row = end_row + 1
+            if writer is not None:
+                writer.commit()
+                writer = None
+        except ValueError as e:
+            # 首批之前的错误（缺列、无法解析表头）直接抛出；之后的错误只影响剩余部分
+            if start_row == 1:
+                raise
+            result["failed_chunks"].append({"start_row": start_row, "end_row": None, "error": str(e)})
+        finally:
+            if writer is not None:
+                writer.discard()
+
+    logger.info(
+        f"流式导入完成，插入 {result['inserted_count']} 条，"
+        f"解析失败 {result['failed_count']} 行，失败批次 {len(result['failed_chunks'])} 个"
+    )
+    return result
+
+
+async def stream_excel_to_db(file: UploadFile, upsert: bool = False, force: bool = False) -> dict:
+    """
+    流式上传处理：读取、解析和插入全部在线程池中分块完成，不阻塞事件循环
+    内容与已成功导入的文件相同时直接返回首次的结果（duplicate=true）
+    """
+    logger.info(f"开始流式处理上传: {file.filename}")
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    ingest = partial(ingest_stream, file.file, upsert=upsert)
+    return await loop.run_in_executor(get_executor(), ctx.run, _deduplicated, file, upsert, force, ingest)
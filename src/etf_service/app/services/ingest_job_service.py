@@ -0,0 +1,285 @@
+# src/etf_service/app/services/ingest_job_service.py
+"""
+后台导入任务队列
+
+- submit_upload: 上传文件分块保存到 UPLOAD_DIR（同时计算 sha256），写入 ingest_job（queued）后立即返回；
+  内容已成功导入过时不创建任务，抛出 DuplicateUploadError
+- 任务在进程池中执行：pandas 解析是 CPU 密集操作，放在独立进程中不占用事件循环和主进程 GIL；
+  子进程自己建立数据库连接，按批次提交并更新 processed_rows
+- 并发由 INGEST_JOB_WORKERS 控制；当前服务进程中排队 + 执行中的任务达到
+  INGEST_JOB_QUEUE_SIZE 时拒绝新上传（QueueFullError）
+- 子进程返回涉及的证券代码和日期，由主进程失效响应缓存（缓存在主进程内）并发布导入事件；
+  子进程中的阶段耗时和行数同样返回给主进程计入 /metrics
+- 任务记录创建它的服务进程（owner，主机名:pid:启动标识），服务进程每 INGEST_JOB_HEARTBEAT_SECONDS
+  刷新自己任务的心跳；recover_orphaned_jobs 将心跳超时的 queued / running 任务标记为 failed，
+  轮询任务状态的客户端能得到结束状态（容器重启后 pid 和主机名可能相同，不能据此判断存活）
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, BinaryIO, Optional, Set, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from etf_service.app.cache import response_cache
+from etf_service.app.database.session import AsyncSessionLocal, SessionLocal
+from etf_service.app.events import event_broker
+from etf_service.app.logging_config import logger
+from etf_service.app.executors import get_executor
+from etf_service.app.metrics import EXECUTOR_QUEUE, INGEST_ROWS_TOTAL, collect_breakdown, record_stage
+from etf_service.app.models.ingest_job import IngestJob
+from etf_service.app.services.upload_digest_service import (
+    DuplicateUploadError, find_duplicate_async, record_upload
+)
+from etf_service.config import (
+    INGEST_JOB_HEARTBEAT_SECONDS, INGEST_JOB_QUEUE_SIZE, INGEST_JOB_WORKERS, SERIES_STORE_ENABLED, UPLOAD_DIR,
+    UPLOAD_READ_CHUNK_SIZE
+)
+
+if TYPE_CHECKING:
+    from etf_service.app.services.holding_parser import HoldingBatch
+
+
+class QueueFullError(Exception):
+    """排队任务已满"""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0  # 只在事件循环线程中修改
+_tasks: Set[asyncio.Task] = set()
+_owner_id: Optional[Tuple[int, str]] = None  # (pid, owner)
+# 超过 3 个心跳周期未刷新视为创建进程已退出
+HEARTBEAT_TIMEOUT = timedelta(seconds=3 * INGEST_JOB_HEARTBEAT_SECONDS)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """首次提交任务时创建进程池；spawn 方式启动，子进程不继承父进程的连接池和线程"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=INGEST_JOB_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown(wait: bool = True) -> None:
+    """等待执行中的任务结束并关闭进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=wait)
+        _pool = None
+
+
+def pending_jobs() -> int:
+    return _pending
+
+
+def _owner() -> str:
+    """本进程的任务 owner；启动标识按 pid 生成，fork 出的子进程不沿用父进程的标识"""
+    global _owner_id
+    pid = os.getpid()
+    if _owner_id is None or _owner_id[0] != pid:
+        _owner_id = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:12]}")
+    return _owner_id[1]
+
+
+async def heartbeat() -> None:
+    """刷新本进程 queued / running 任务的心跳"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IngestJob)
+            .where(IngestJob.owner == _owner(), IngestJob.status.in_(("queued", "running")))
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+
+
+async def recover_orphaned_jobs() -> int:
+    """
+    将心跳超时（创建进程崩溃或被杀死）的 queued / running 任务标记为 failed，返回标记的任务数
+    增加 owner 字段之前创建、没有心跳的任务同样视为遗留任务
+    """
+    cutoff = datetime.now(timezone.utc) - HEARTBEAT_TIMEOUT
+    async with AsyncSessionLocal() as db:
+        orphaned = (await db.scalars(
+            select(IngestJob).where(
+                IngestJob.status.in_(("queued", "running")),
+                or_(IngestJob.owner.is_(None), IngestJob.owner != _owner()),
+                or_(IngestJob.heartbeat_at.is_(None), IngestJob.heartbeat_at < cutoff),
+            )
+        )).all()
+        now = datetime.now(timezone.utc)
+        for job in orphaned:
+            job.status = "failed"
+            job.error = f"服务进程 {job.owner or '未知'} 心跳超时，任务未完成"
+            job.finished_at = now
+        if orphaned:
+            await db.commit()
+    for job in orphaned:
+        logger.warning(f"导入任务 {job.id} 的服务进程 {job.owner or '未知'} 心跳超时，标记为 failed")
+    return len(orphaned)
+
+
+async def run_heartbeat(interval: float = INGEST_JOB_HEARTBEAT_SECONDS) -> None:
+    """
+    每 interval 秒刷新心跳并回收心跳超时的任务（应用 lifespan 中作为后台任务运行，关闭时取消）
+    启动时先执行一次，其它 worker 崩溃遗留的任务由仍在运行的 worker 回收
+    """
+    while True:
+        try:
+            await heartbeat()
+            await recover_orphaned_jobs()
+        except SQLAlchemyError as e:
+            # 数据库暂不可用或尚未迁移时不影响服务
+            logger.warning(f"刷新导入任务心跳失败: {e}")
+        await asyncio.sleep(interval)
+
+
+EXECUTOR_QUEUE.set_function(lambda: {("ingest_job",): _pending}, key="ingest_job")
+
+
+def save_upload(file: BinaryIO, path: str) -> Tuple[str, int]:
+    """分块保存上传文件，同时计算 sha256，返回 (sha256, 字节数)"""
+    digest, size = hashlib.sha256(), 0
+    with open(path, "wb") as out:
+        for chunk in iter(lambda: file.read(UPLOAD_READ_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def run_ingest_job(job_id: str) -> dict:
+    """
+    在子进程中执行：流式导入任务文件并更新进度
+    返回 {"codes": 涉及的证券代码, "dates": 涉及的日期, "stage_seconds": 各阶段耗时,
+    "written": 写入行数, "failed": 解析失败行数}
+    成功后删除上传文件，失败时保留以便排查
+    """
+    # pandas 只在子进程中加载
+    from etf_service.app.services.holding_record_service import ingest_stream
+
+    codes: Set[int] = set()
+    dates: Set[date] = set()
+    written = failed = 0
+    with SessionLocal() as db, collect_breakdown() as breakdown:
+        job = db.get(IngestJob, job_id)
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        def on_batch(batch: "HoldingBatch", end_row: int):
+            codes.update(int(c) for c in batch.frame["security_code"].unique())
+            dates.update(batch.frame["date"].unique())
+            job.processed_rows = end_row
+            db.commit()
+
+        try:
+            with open(job.path, "rb") as f:
+                result = ingest_stream(f, upsert=job.upsert, on_batch=on_batch, sha256=job.sha256)
+            written = result["inserted_count"] + result.get("updated_count", 0)
+            failed = result["failed_count"]
+            job.result = {**result, "stage_seconds": {k: round(v, 4) for k, v in breakdown.items()}}
+            job.status = "succeeded"
+        except Exception as e:
+            db.rollback()
+            logger.error(f"导入任务 {job_id} 失败: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+
+        if job.status == "succeeded":
+            if job.sha256:
+                record_upload(db, job.sha256, job.filename, os.path.getsize(job.path), job.upsert, result)
+            os.remove(job.path)
+        stage_seconds = dict(breakdown)
+    return {
+        "codes": sorted(codes), "dates": sorted(dates), "stage_seconds": stage_seconds,
+        "written": written, "failed": failed,
+    }
+
+
+async def _mark_failed(job_id: str, error: str) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(IngestJob, job_id)
+        if job is not None and job.status in ("queued", "running"):
+            job.status = "failed"
+            job.error = error
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+
+
+async def _run(job_id: str) -> None:
+    global _pending
+    loop = asyncio.get_running_loop()
+    try:
+        outcome = await loop.run_in_executor(get_pool(), run_ingest_job, job_id)
+        response_cache.invalidate_codes(outcome["codes"])
+        if outcome["written"]:
+            event_broker.publish_ingest(outcome["codes"], outcome["dates"], outcome["written"], source="job")
+        if SERIES_STORE_ENABLED:
+            # 子进程写入的数据无法合并，移出存储后按需重新加载
+            from etf_service.app.series_store import series_store
+
+            series_store.invalidate_codes(outcome["codes"])
+        for name, seconds in outcome["stage_seconds"].items():
+            record_stage(name, seconds)
+        INGEST_ROWS_TOTAL.inc(outcome["written"], result="written")
+        INGEST_ROWS_TOTAL.inc(outcome["failed"], result="failed")
+    except Exception as e:
+        # 子进程异常退出（BrokenProcessPool 等）时任务状态由主进程补记
+        logger.error(f"导入任务 {job_id} 执行异常: {e}")
+        await _mark_failed(job_id, str(e))
+    finally:
+        _pending -= 1
+
+
+async def submit_upload(
+    db: AsyncSession, file: UploadFile, upsert: bool = True, force: bool = False
+) -> IngestJob:
+    """
+    保存上传文件并创建导入任务，返回 queued 状态的任务
+    内容已成功导入过时删除保存的文件并抛出 DuplicateUploadError（force=True 时不检查）
+    """
+    global _pending
+    if _pending >= INGEST_JOB_QUEUE_SIZE:
+        raise QueueFullError(f"导入任务已满（{INGEST_JOB_QUEUE_SIZE}），请稍后重试")
+
+    job_id = uuid.uuid4().hex
+    path = os.path.join(UPLOAD_DIR, f"{job_id}_{os.path.basename(file.filename)}")
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        sha256, _ = await loop.run_in_executor(get_executor(), save_upload, file.file, path)
+        digest = None if force else await find_duplicate_async(db, sha256)
+        if digest is not None:
+            os.remove(path)
+            raise DuplicateUploadError(digest)
+        job = IngestJob(
+            id=job_id, filename=file.filename, path=path, upsert=upsert, sha256=sha256,
+            status="queued", processed_rows=0, owner=_owner(), heartbeat_at=datetime.now(timezone.utc),
+        )
+        db.add(job)
+        await db.commit()
+    except Exception:
+        _pending -= 1
+        raise
+
+    task = asyncio.create_task(_run(job_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info(f"导入任务 {job_id} 已入队: {file.filename}")
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[IngestJob]:
+    return await db.get(IngestJob, job_id)
@@ -0,0 +1,181 @@
+# src/etf_service/app/services/parsed_cache.py
+"""
+上传文件解析结果的磁盘缓存（UPLOAD_DIR/parsed）
+
+- key 为上传内容的 sha256 加批次列布局的指纹，列映射变化后旧缓存自动失效
+- 每个条目是一个目录，按解析批次保存为 part-00000 ...，流式导入时可以逐批读回；
+  安装了 pyarrow 时为 Feather（Arrow IPC，lz4 压缩），否则为 gzip 压缩的 pickle
+- 缺少日期的行保存为占位日期（DEFAULT_DATE_PLACEHOLDER），读回后由调用方换成当天日期
+- 写入先落到临时目录，完成后 rename，其它进程只会看到完整的条目
+- 总大小超过 max_bytes 时按最近使用时间（目录 mtime，命中时更新）淘汰
+- 缓存只是加速：写入、淘汰出错时只记录日志，不影响导入
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Iterator, List, Optional
+
+from etf_service.app.logging_config import logger
+from etf_service.app.services.holding_parser import BATCH_COLUMNS, HoldingBatch, RowError
+from etf_service.config import PARSED_CACHE_ENABLED, PARSED_CACHE_MAX_BYTES, UPLOAD_DIR
+
+LAYOUT = hashlib.sha1(",".join(BATCH_COLUMNS).encode()).hexdigest()[:8]
+
+try:
+    import pyarrow  # noqa: F401
+
+    PART_FORMAT = "feather"
+except ImportError:
+    PART_FORMAT = "pkl.gz"
+
+
+def _write_part(frame, path: str) -> None:
+    if PART_FORMAT == "feather":
+        frame.to_feather(path, compression="lz4")
+    else:
+        frame.to_pickle(path, compression="gzip")
+
+
+def _read_part(path: str):
+    import pandas as pd
+
+    if PART_FORMAT == "feather":
+        return pd.read_feather(path)
+    return pd.read_pickle(path, compression="gzip")
+
+
+class CacheWriter:
+    """
+    逐批写入一个缓存条目；commit() 之前的内容对其它读者不可见
+    解析完整个文件后调用 commit()，中途失败时调用 discard()
+    """
+
+    def __init__(self, cache: "ParsedBatchCache", key: str):
+        self.cache, self.key = cache, key
+        self.tmp_dir = os.path.join(cache.root, f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(self.tmp_dir)
+        self.parts: List[dict] = []
+        self.failed = False
+
+    def add(self, batch: HoldingBatch) -> None:
+        """保存一个批次（在 fill_default_date 之前调用，保存的是占位日期）；写入失败时放弃整个条目"""
+        if self.failed:
+            return
+        name = f"part-{len(self.parts):05d}.{PART_FORMAT}"
+        try:
+            _write_part(batch.frame, os.path.join(self.tmp_dir, name))
+        except OSError as e:
+            logger.warning(f"写入解析缓存失败: {e}")
+            self.failed = True
+            self.discard()
+            return
+        self.parts.append({
+            "file": name,
+            "total_rows": batch.total_rows,
+            "errors": [[e.row, e.column, e.message] for e in batch.errors],
+        })
+
+    def commit(self) -> None:
+        if self.failed:
+            return
+        try:
+            with open(os.path.join(self.tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"format": PART_FORMAT, "parts": self.parts}, f, ensure_ascii=False)
+            # 目标已存在（其它进程写入了同一条目）时 rename 失败
+            os.rename(self.tmp_dir, self.cache.path(self.key))
+        except OSError:
+            self.discard()
+            return
+        try:
+            self.cache.evict()
+        except Exception as e:
+            logger.warning(f"解析缓存淘汰失败: {e}")
+
+    def discard(self) -> None:
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class ParsedBatchCache:
+    def __init__(self, root: str, max_bytes: int, enabled: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def key(self, sha256: str) -> str:
+        return f"{sha256}-{LAYOUT}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, sha256: str) -> Optional[Iterator[HoldingBatch]]:
+        """命中时返回逐批读取的迭代器，未命中返回 None"""
+        if not self.enabled:
+            return None
+        entry = self.path(self.key(sha256))
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("format") != PART_FORMAT:
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            # 读取 meta.json 之后被其它进程淘汰
+            return None
+        return self._iter_parts(entry, meta["parts"])
+
+    @staticmethod
+    def _iter_parts(entry: str, parts: List[dict]) -> Iterator[HoldingBatch]:
+        for part in parts:
+            yield HoldingBatch(
+                frame=_read_part(os.path.join(entry, part["file"])),
+                errors=[RowError(*e) for e in part["errors"]],
+                total_rows=part["total_rows"],
+            )
+
+    def writer(self, sha256: str) -> Optional[CacheWriter]:
+        """开始写入一个缓存条目；缓存关闭或无法创建目录时返回 None"""
+        if not self.enabled:
+            return None
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            return CacheWriter(self, self.key(sha256))
+        except OSError as e:
+            logger.warning(f"无法创建解析缓存目录: {e}")
+            return None
+
+    def evict(self) -> None:
+        """
+        总大小超过 max_bytes 时删除最久未使用的条目
+        其它进程可能同时在淘汰同一批条目，扫描中消失的条目直接跳过
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if not entry.is_dir():
+                        continue
+                    with os.scandir(entry.path) as files:
+                        size = sum(f.stat().st_size for f in files)
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime, size, entry.path))
+                total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+parsed_cache = ParsedBatchCache(
+    os.path.join(UPLOAD_DIR, "parsed"), PARSED_CACHE_MAX_BYTES, enabled=PARSED_CACHE_ENABLED
+)
@@ -0,0 +1,202 @@
+# src/etf_service/app/services/pnl_reconcile.py
+"""
+导入前核对盈亏字段（列式，整批一次计算，没有逐行循环）
+
+由 持仓数量、成本价、最新价 和同一证券/股东账号上一持仓日的记录重新计算：
+- 最新市值 = 持仓数量 × 最新价
+- 持仓盈亏 = (最新价 - 成本价) × 持仓数量，持仓盈亏比例 = (最新价 / 成本价 - 1) × 100
+- 当日盈亏 = 持仓盈亏 - 上一持仓日持仓盈亏（成本价已摊入当日买卖，即扣除资金进出后的市值变化），
+  当日盈亏比例 = 当日盈亏 / 上一持仓日最新市值 × 100；找不到上一持仓日时不计算
+- 个股仓位 = 最新市值 / 总资产 × 100；导出中没有现金，总资产取同日各行 最新市值 / 个股仓位 的中位数，
+  同日都没有个股仓位时按持仓市值合计估算
+持仓数量为 0 的行不计算持仓盈亏和当日盈亏
+
+导出值为空时用计算值补全（金额、比例保留两位小数）；与计算值之差超过容差时记为不一致：
+RECONCILE_MODE=flag 保留导出值，correct 改为计算值，off 不核对
+上一持仓日先在本批次中找，每个证券/股东账号在本批次最早日期之前的再查数据库中 RECONCILE_LOOKBACK_DAYS 天内的记录
+"""
+from datetime import timedelta
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from etf_service.app.logging_config import logger
+from etf_service.app.metrics import RECONCILE_FIELDS_TOTAL
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.app.services.holding_parser import HoldingBatch, Mismatch
+from etf_service.config import (
+    RECONCILE_ABS_TOLERANCE, RECONCILE_LOOKBACK_DAYS, RECONCILE_MODE,
+    RECONCILE_RATIO_TOLERANCE, RECONCILE_REL_TOLERANCE
+)
+
+AMOUNT_FIELDS = ["latest_value", "holding_profit", "daily_profit"]
+RATIO_FIELDS = ["holding_profit_ratio", "daily_profit_ratio", "position_ratio"]
+MODES = ("off", "flag", "correct")
+# 每批最多记录的不一致明细（计数不受限制）
+MAX_MISMATCHES = 100
+# IN 列表每次查询的证券代码数
+_CODE_CHUNK = 500
+_BASE_COLUMNS = ["holding_amount", "cost_price", "latest_price"]
+
+
+def _keys(frame: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "day": pd.to_datetime(frame["date"]),
+        "security_code": frame["security_code"].to_numpy(np.int64),
+        "account": frame["shareholder_account"].fillna("").astype(str).to_numpy(),
+    })
+
+
+def _stored_before(db: Session, frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    查询本批次解决不了的上一持仓日：每个证券/股东账号在本批次最早日期之前、回看天数内已入库的数量和价格
+    之后日期的上一持仓日在本批次中查找；证券按查询窗口分组，单日上传只有一个窗口
+    """
+    lookback = timedelta(days=RECONCILE_LOOKBACK_DAYS)
+    first = _keys(frame).assign(date=frame["date"].to_numpy()).groupby(
+        ["security_code", "account"], sort=False)["date"].min().reset_index()
+    # 同一证券各账号的最早日期不同时按并集查询，多查的行在下面按账号过滤
+    windows = first.groupby("security_code")["date"].agg(["min", "max"]).reset_index()
+    fields = [HoldingRecord.date, HoldingRecord.security_code, HoldingRecord.shareholder_account]
+    fields += [getattr(HoldingRecord, c) for c in _BASE_COLUMNS]
+    rows = []
+    for (lo, hi), group in windows.groupby(["min", "max"], sort=False):
+        codes = [int(c) for c in group["security_code"]]
+        for i in range(0, len(codes), _CODE_CHUNK):
+            rows += db.execute(
+                select(*fields).where(
+                    HoldingRecord.security_code.in_(codes[i:i + _CODE_CHUNK]),
+                    HoldingRecord.date >= lo - lookback,
+                    HoldingRecord.date < hi,
+                )
+            ).all()
+    columns = ["date", "security_code", "shareholder_account"] + _BASE_COLUMNS
+    stored = pd.DataFrame(rows, columns=columns)
+    if stored.empty:
+        return stored
+    stored = stored.assign(account=_keys(stored)["account"].to_numpy()).merge(
+        first.rename(columns={"date": "first_date"}), on=["security_code", "account"])
+    keep = (stored["date"] < stored["first_date"]) & (stored["date"] >= stored["first_date"] - lookback)
+    return stored.loc[keep, columns].reset_index(drop=True)
+
+
+def previous_positions(db: Session, frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    每行同一证券、股东账号上一持仓日的 持仓数量/成本价/最新价（与 frame 行对齐，找不到为 NaN）
+    数据库中只取本批次最早日期之前的记录，之后的上一持仓日都来自本批次（upsert 后即为本批次的值）
+    """
+    stored = _stored_before(db, frame)
+    candidates = pd.concat([_keys(stored).assign(**{c: stored[c].to_numpy(np.float64) for c in _BASE_COLUMNS}),
+                            _keys(frame).assign(**{c: frame[c].to_numpy(np.float64) for c in _BASE_COLUMNS})],
+                           ignore_index=True)
+    candidates = candidates.drop_duplicates(["day", "security_code", "account"], keep="last")
+    left = _keys(frame).assign(row=np.arange(len(frame)))
+    merged = pd.merge_asof(
+        left.sort_values("day", kind="stable"),
+        candidates.sort_values("day", kind="stable"),
+        on="day",
+        by=["security_code", "account"],
+        allow_exact_matches=False,
+        tolerance=pd.Timedelta(days=RECONCILE_LOOKBACK_DAYS),
+    )
+    return merged.sort_values("row")[_BASE_COLUMNS].reset_index(drop=True)
+
+
+def _position_ratio(frame: pd.DataFrame, value: np.ndarray) -> np.ndarray:
+    """
+    按同日总资产（由导出的个股仓位反推，取中位数）计算个股仓位
+    批次内重复的键只有最后一条会写入，之前的行不计入同日总资产
+    """
+    reported = frame["position_ratio"].to_numpy(np.float64)
+    latest = ~_keys(frame).duplicated(["day", "security_code", "account"], keep="last").to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        implied = np.where(latest & (reported > 0) & (value > 0), value / (reported / 100), np.nan)
+    day = frame["date"].to_numpy()
+    total = pd.Series(implied).groupby(day).transform("median").to_numpy()
+    fallback = pd.Series(np.where(latest, value, 0.0)).groupby(day).transform("sum").to_numpy()
+    total = np.where(np.isnan(total), fallback, total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, value / total * 100, np.nan)
+
+
+def compute_fields(frame: pd.DataFrame, previous: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """由数量、价格和上一持仓日记录计算各派生字段，无法计算的为 NaN"""
+    qty = frame["holding_amount"].to_numpy(np.float64)
+    cost = frame["cost_price"].to_numpy(np.float64)
+    price = frame["latest_price"].to_numpy(np.float64)
+    prev_qty, prev_cost, prev_price = (previous[c].to_numpy(np.float64) for c in _BASE_COLUMNS)
+
+    value = qty * price
+    held = qty > 0
+    profit = np.where(held, (price - cost) * qty, np.nan)
+    prev_value = prev_qty * prev_price
+    daily = profit - (prev_price - prev_cost) * prev_qty
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_ratio = np.where(held & (cost > 0), (price / cost - 1) * 100, np.nan)
+        daily_ratio = np.where(prev_value > 0, daily / prev_value * 100, np.nan)
+    return {
+        "latest_value": value,
+        "holding_profit": profit,
+        "holding_profit_ratio": profit_ratio,
+        "daily_profit": daily,
+        "daily_profit_ratio": daily_ratio,
+        "position_ratio": _position_ratio(frame, value),
+    }
+
+
+def reconcile_batch(db: Session, batch: HoldingBatch, mode: str = RECONCILE_MODE) -> dict:
+    """
+    核对并原地修改 batch.frame：补全空值，按 mode 记录或修正超出容差的值；
+    不一致明细追加到 batch.mismatches，返回 {"mismatch_count", "filled_count"}（按字段个数计）
+    """
+    counts = {"mismatch_count": 0, "filled_count": 0}
+    if mode not in MODES:
+        raise ValueError(f"RECONCILE_MODE 必须为 {' / '.join(MODES)}")
+    if mode == "off" or not len(batch):
+        return counts
+
+    frame = batch.frame
+    computed = compute_fields(frame, previous_positions(db, frame))
+    amount_tolerance = RECONCILE_ABS_TOLERANCE + RECONCILE_REL_TOLERANCE * np.abs(computed["latest_value"])
+    bad_rows = np.zeros(len(frame), dtype=bool)
+    for name in AMOUNT_FIELDS + RATIO_FIELDS:
+        value = computed[name]
+        reported = frame[name].to_numpy(np.float64)
+        known = ~np.isnan(value)
+        missing = np.isnan(reported) & known
+        tolerance = amount_tolerance if name in AMOUNT_FIELDS else RECONCILE_RATIO_TOLERANCE
+        with np.errstate(invalid="ignore"):
+            bad = known & (np.abs(reported - value) > tolerance)
+        rounded = np.round(value, 2)
+        replace = missing | bad if mode == "correct" else missing
+        if replace.any():
+            frame[name] = np.where(replace, rounded, reported)
+        if missing.any():
+            counts["filled_count"] += int(missing.sum())
+            RECONCILE_FIELDS_TOTAL.inc(int(missing.sum()), field=name, result="filled")
+        if bad.any():
+            counts["mismatch_count"] += int(bad.sum())
+            RECONCILE_FIELDS_TOTAL.inc(int(bad.sum()), field=name, result="mismatch")
+            bad_rows |= bad
+            room = MAX_MISMATCHES - len(batch.mismatches)
+            for i in np.flatnonzero(bad)[:max(room, 0)]:
+                account = frame["shareholder_account"].iat[i]
+                batch.mismatches.append(Mismatch(
+                    date=str(frame["date"].iat[i]),
+                    security_code=int(frame["security_code"].iat[i]),
+                    shareholder_account=None if pd.isna(account) else account,
+                    field=name,
+                    reported=float(reported[i]),
+                    computed=float(rounded[i]),
+                ))
+
+    if counts["mismatch_count"]:
+        action = "已修正" if mode == "correct" else "保留导出值"
+        logger.warning(
+            f"盈亏核对：{int(bad_rows.sum())} 行共 {counts['mismatch_count']} 个字段超出容差（{action}），"
+            f"补全空值 {counts['filled_count']} 个"
+        )
+    return counts
@@ -0,0 +1,149 @@
+# src/etf_service/app/services/portfolio_summary_service.py
+"""
+portfolio_daily_summary 维护
+
+导入数据后只对受影响的日期重新聚合（单日行数很少），在导入的同一事务中 upsert 汇总行；
+rebuild_summary 按日期区间分块全量重建，用于回填历史数据。
+
+PostgreSQL 上聚合前按日期加事务级 advisory lock：并发导入同一日期时后提交的事务等前者提交后
+再聚合（READ COMMITTED 下能看到前者的行），不会用缺少对方数据的结果覆盖汇总。
+SQLite 同时只有一个写事务，不需要加锁。
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER
+from sqlalchemy.orm import Session
+
+from etf_service.app.logging_config import logger
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.app.models.portfolio_summary import PortfolioDailySummary
+from etf_service.app.services.bulk_writer import dialect_insert
+
+summary_table = PortfolioDailySummary.__table__
+
+# advisory lock 的第一个键，与其它用途的锁区分（第二个键为日期序号）
+SUMMARY_LOCK_NAMESPACE = 0x45544653
+# 按日期升序加锁，避免两个事务以相反顺序等待对方
+_lock_dates = text(
+    "SELECT pg_advisory_xact_lock(:namespace, d) FROM (SELECT unnest(:days) AS d ORDER BY d) AS days"
+).bindparams(bindparam("days", type_=ARRAY(INTEGER)))
+
+
+def lock_summary_dates(db: Session, dates: Iterable[date]) -> None:
+    """对这些日期的汇总加锁到事务结束（仅 PostgreSQL）"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    days = sorted({d.toordinal() for d in dates})
+    if days:
+        db.execute(_lock_dates, {"namespace": SUMMARY_LOCK_NAMESPACE, "days": days})
+
+# 缺少最新市值时用 持仓数量 × 最新价 估算
+_market_value = func.coalesce(
+    HoldingRecord.latest_value, HoldingRecord.holding_amount * HoldingRecord.latest_price
+)
+
+
+def _aggregate(db: Session, condition) -> list:
+    """按 (日期, 证券代码) 聚合后在内存中汇总为每日一行"""
+    stmt = (
+        select(
+            HoldingRecord.date,
+            HoldingRecord.security_code,
+            func.sum(_market_value),
+            func.sum(HoldingRecord.holding_amount * HoldingRecord.cost_price),
+            func.sum(HoldingRecord.holding_profit),
+            func.sum(HoldingRecord.daily_profit),
+        )
+        .where(condition)
+        .group_by(HoldingRecord.date, HoldingRecord.security_code)
+    )
+    days = defaultdict(list)
+    for day, code, value, cost, profit, daily_profit in db.execute(stmt):
+        days[day].append((code, value or 0.0, cost or 0.0, profit or 0.0, daily_profit or 0.0))
+
+    rows = []
+    for day, positions in days.items():
+        total_value = sum(p[1] for p in positions)
+        rows.append({
+            "date": day,
+            "position_count": len(positions),
+            "total_market_value": total_value,
+            "total_cost": sum(p[2] for p in positions),
+            "total_holding_profit": sum(p[3] for p in positions),
+            "total_daily_profit": sum(p[4] for p in positions),
+            "weights": {
+                str(code): round(value / total_value, 6) if total_value else 0.0
+                for code, value, *_ in positions
+            },
+        })
+    return rows
+
+
+def _upsert_summary(db: Session, rows: list) -> None:
+    if not rows:
+        return
+    stmt = dialect_insert(db)(summary_table)
+    columns = [c for c in rows[0] if c != "date"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date"],
+        set_={**{c: stmt.excluded[c] for c in columns}, "update_time": func.now()},
+    )
+    db.execute(stmt, rows)
+
+
+def refresh_daily_summary(db: Session, dates: Iterable[date]) -> int:
+    """
+    重新计算指定日期的汇总（不提交，由导入事务统一提交）
+    日期下已无持仓时删除对应汇总行
+    """
+    dates = {d for d in dates if d is not None}
+    if not dates:
+        return 0
+    lock_summary_dates(db, dates)
+    rows = _aggregate(db, HoldingRecord.date.in_(dates))
+    _upsert_summary(db, rows)
+    empty = dates - {r["date"] for r in rows}
+    if empty:
+        db.execute(delete(summary_table).where(summary_table.c.date.in_(empty)))
+    return len(rows)
+
+
+def rebuild_summary(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_days: int = 31,
+) -> int:
+    """
+    按日期区间分块重建汇总，每块单独提交
+    未指定 start/end 时使用 holding_record 中的最早/最晚日期；chunk_days 小于 1 时抛出 ValueError
+    """
+    if chunk_days < 1:
+        raise ValueError(f"chunk_days 必须为正整数，当前为 {chunk_days}")
+    if start is None or end is None:
+        first, last = db.execute(
+            select(func.min(HoldingRecord.date), func.max(HoldingRecord.date))
+        ).one()
+        start = start or first
+        end = end or last
+    if start is None or end is None:
+        return 0
+
+    total = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        lock_summary_dates(db, (chunk_start + timedelta(days=i) for i in range((chunk_end - chunk_start).days + 1)))
+        db.execute(
+            delete(summary_table).where(summary_table.c.date.between(chunk_start, chunk_end))
+        )
+        rows = _aggregate(db, HoldingRecord.date.between(chunk_start, chunk_end))
+        _upsert_summary(db, rows)
+        db.commit()
+        total += len(rows)
+        logger.info(f"组合汇总重建 {chunk_start} ~ {chunk_end}: {len(rows)} 天")
+        chunk_start = chunk_end + timedelta(days=1)
+    return total
@@ -0,0 +1,305 @@
+# src/etf_service/app/services/snapshot_service.py
+"""
+holding_record 的 Parquet 快照（SNAPSHOT_DIR，需要 pyarrow）
+
+- 按月分区（与数据库分区一致）：<SNAPSHOT_DIR>/holding_record/month=2024-01/data.parquet，
+  分区内按 (security_code, date) 排序，行组统计可按证券代码、日期跳过；
+  目录为 hive 风格，分析时可直接用 pyarrow.dataset / DuckDB / pandas 读取整个目录
+- 增量导出：按天汇总 (行数, 最大 id, 最大更新时间) 得到各月指纹，与上次导出的清单比较，
+  只重写有变化的月份，删除数据库中已没有数据的月份
+- 每个分区先写临时文件再 os.replace；同一目录同时只有一个导出（文件锁），其余直接跳过
+- 区间查询只打开覆盖的月份文件，以 memory_map 方式读取并下推过滤条件，不访问数据库；
+  按月份顺序逐月读取，读够 limit 行即停止，内存占用不超过一个月的数据加上 limit 行
+"""
+import asyncio
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from etf_service.app.database.partitioning import month_start, next_month
+from etf_service.app.logging_config import logger
+from etf_service.app.models.holding_record import HoldingRecord
+from etf_service.config import SNAPSHOT_COMPRESSION, SNAPSHOT_DIR
+
+TABLE = "holding_record"
+MANIFEST_NAME = "_manifest.json"
+LOCK_NAME = ".export.lock"
+ROW_GROUP_SIZE = 100_000
+# 快照中的列（holding_record 业务字段）
+COLUMNS = [
+    "date", "security_code", "security_name", "holding_amount", "available_amount",
+    "cost_price", "latest_price", "holding_profit_ratio", "holding_profit",
+    "daily_profit_ratio", "daily_profit", "avg_buy_price", "position_ratio",
+    "latest_value", "market", "shareholder_account", "currency",
+]
+
+
+class SnapshotUnavailable(RuntimeError):
+    """未安装 pyarrow 或还没有导出过快照"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SnapshotUnavailable("Parquet 快照需要安装 pyarrow（poetry install -E snapshot）")
+    return pa, pq
+
+
+def schema():
+    pa, _ = _pyarrow()
+    types = {
+        "date": pa.date32(), "security_code": pa.int64(), "available_amount": pa.int64(),
+        "security_name": pa.string(), "market": pa.string(),
+        "shareholder_account": pa.string(), "currency": pa.string(),
+    }
+    return pa.schema([(c, types.get(c, pa.float64())) for c in COLUMNS])
+
+
+def month_key(d: date) -> str:
+    return d.strftime("%Y-%m")
+
+
+def partition_path(root: str, key: str) -> str:
+    return os.path.join(root, TABLE, f"month={key}", "data.parquet")
+
+
+@dataclass
+class PartitionState:
+    rows: int
+    max_id: int
+    max_time: Optional[str]
+    exported_at: Optional[str] = None
+
+    def fingerprint(self) -> tuple:
+        return self.rows, self.max_id, self.max_time
+
+
+@dataclass
+class ExportStats:
+    partitions: int = 0
+    written: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    skipped: bool = False  # 另一个导出正在进行
+
+
+def _load_manifest(root: str) -> Dict[str, PartitionState]:
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {k: PartitionState(**v) for k, v in json.load(f)["partitions"].items()}
+
+
+def _save_manifest(root: str, partitions: Dict[str, PartitionState]) -> None:
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp = os.path.join(root, f".{MANIFEST_NAME}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"table": TABLE, "partitions": {k: asdict(v) for k, v in sorted(partitions.items())}},
+                  f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _export_lock(root: str) -> Iterator[bool]:
+    """非阻塞文件锁：拿到锁时 yield True，其它进程正在导出时 yield False"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_NAME), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def current_partitions(db: Session) -> Dict[str, PartitionState]:
+    """按天汇总后合并为各月的 (行数, 最大 id, 最大创建/更新时间)"""
+    changed_at = func.max(func.coalesce(HoldingRecord.update_time, HoldingRecord.create_time))
+    rows = db.execute(
+        select(HoldingRecord.date, func.count(), func.max(HoldingRecord.id), changed_at)
+        .group_by(HoldingRecord.date)
+    ).all()
+    out: Dict[str, PartitionState] = {}
+    for day, count, max_id, max_time in rows:
+        key = month_key(day)
+        max_time = str(max_time) if max_time is not None else None
+        state = out.get(key)
+        if state is None:
+            out[key] = PartitionState(count, max_id, max_time)
+        else:
+            state.rows += count
+            state.max_id = max(state.max_id, max_id)
+            if max_time is not None and (state.max_time is None or max_time > state.max_time):
+                state.max_time = max_time
+    return out
+
+
+def _write_partition(db: Session, root: str, key: str, compression: str) -> int:
+    """流式查询一个月的数据写入 Parquet（每 ROW_GROUP_SIZE 行一个行组），返回行数"""
+    pa, pq = _pyarrow()
+    start = month_start(date.fromisoformat(f"{key}-01"))
+    stmt = (
+        select(*[getattr(HoldingRecord, c) for c in COLUMNS])
+        .where(HoldingRecord.date >= start, HoldingRecord.date < next_month(start))
+        .order_by(HoldingRecord.security_code, HoldingRecord.date, HoldingRecord.shareholder_account)
+        .execution_options(yield_per=ROW_GROUP_SIZE)
+    )
+    path = partition_path(root, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(path), f".data.parquet.{os.getpid()}.tmp")
+    target_schema = schema()
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp, target_schema, compression=compression) as writer:
+            for chunk in db.execute(stmt).partitions():
+                columns = list(zip(*chunk))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(col, type=target_schema.field(i).type) for i, col in enumerate(columns)],
+                    schema=target_schema,
+                ), row_group_size=ROW_GROUP_SIZE)
+                rows += len(chunk)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def export_snapshot(
+    session_factory, root: str = SNAPSHOT_DIR, full: bool = False, compression: str = SNAPSHOT_COMPRESSION
+) -> ExportStats:
+    """
+    增量导出快照：只重写指纹变化（或文件缺失）的月份，full=True 时全部重写
+    另一个进程正在导出同一目录时直接返回 skipped=True
+    """
+    _pyarrow()
+    start_time = time.perf_counter()
+    stats = ExportStats()
+    with _export_lock(root) as acquired:
+        if not acquired:
+            stats.skipped = True
+            return stats
+        manifest = _load_manifest(root)
+        with session_factory() as db:
+            current = current_partitions(db)
+            stats.partitions = len(current)
+            for key, state in sorted(current.items()):
+                previous = manifest.get(key)
+                if (
+                    not full and previous is not None
+                    and previous.fingerprint() == state.fingerprint()
+                    and os.path.exists(partition_path(root, key))
+                ):
+                    stats.unchanged += 1
+                    continue
+                # 写入期间的新提交不计入本次指纹，下次导出会再次重写该月
+                stats.rows += _write_partition(db, root, key, compression)
+                state.exported_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+                manifest[key] = state
+                stats.written.append(key)
+                _save_manifest(root, manifest)
+                logger.info(f"快照分区 {key} 已导出：{state.rows} 行")
+        for key in sorted(set(manifest) - set(current)):
+            path = partition_path(root, key)
+            if os.path.exists(path):
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            del manifest[key]
+            stats.removed.append(key)
+        _save_manifest(root, manifest)
+    stats.seconds = time.perf_counter() - start_time
+    logger.info(
+        f"快照导出完成：{stats.partitions} 个分区，重写 {len(stats.written)}，未变化 {stats.unchanged}，"
+        f"删除 {len(stats.removed)}，{stats.rows} 行，耗时 {stats.seconds:.1f}s"
+    )
+    return stats
+
+
+def snapshot_status(root: str = SNAPSHOT_DIR) -> dict:
+    manifest = _load_manifest(root)
+    return {
+        "directory": os.path.abspath(root),
+        "partitions": {k: asdict(v) for k, v in sorted(manifest.items())},
+        "rows": sum(v.rows for v in manifest.values()),
+    }
+
+
+def _months(start: Optional[date], end: Optional[date], available: Sequence[str]) -> List[str]:
+    lo = month_key(start) if start else None
+    hi = month_key(end) if end else None
+    return [k for k in sorted(available) if (lo is None or k >= lo) and (hi is None or k <= hi)]
+
+
+def query_snapshot(
+    codes: Optional[Sequence[int]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: str = SNAPSHOT_DIR,
+    limit: Optional[int] = None,
+):
+    """
+    从快照读取 [start, end] 区间（可按证券代码过滤）的记录，返回按 (date, security_code) 排序的 pyarrow.Table
+    只打开覆盖的月份文件，memory_map 读取，过滤条件下推到行组统计；
+    给出 limit 时最多返回 limit + 1 行（调用方据此判断是否截断），读够后不再打开后面的月份
+    """
+    pa, pq = _pyarrow()
+    import pyarrow.compute as pc
+
+    manifest = _load_manifest(root)
+    if not manifest:
+        raise SnapshotUnavailable("还没有导出快照")
+    columns = list(columns or COLUMNS)
+    filters = []
+    if codes:
+        filters.append(("security_code", "in", list(codes)))
+    if start is not None:
+        filters.append(("date", ">=", start))
+    if end is not None:
+        filters.append(("date", "<=", end))
+    # 过滤、排序需要的列先一并读取，最后再按请求的列返回
+    read_columns = list(dict.fromkeys(columns + ["security_code", "date"]))
+    tables, rows = [], 0
+    for key in _months(start, end, manifest):
+        path = partition_path(root, key)
+        if not os.path.exists(path):
+            continue
+        table = pq.read_table(path, columns=read_columns, filters=filters or None, memory_map=True)
+        # 分区文件按 (security_code, date) 存储；月份按时间顺序读取，各月内按 (date, security_code) 排序即整体有序
+        table = table.take(pc.sort_indices(table, sort_keys=[("date", "ascending"), ("security_code", "ascending")]))
+        if limit is not None and rows + table.num_rows > limit + 1:
+            table = table.slice(0, limit + 1 - rows)
+        tables.append(table.select(columns))
+        rows += table.num_rows
+        if limit is not None and rows > limit:
+            break
+    if not tables:
+        return schema().empty_table().select(columns)
+    return pa.concat_tables(tables)
+
+
+async def run_periodic_export(session_factory, executor, interval: float, root: str = SNAPSHOT_DIR) -> None:
+    """每 interval 秒在 executor 中增量导出一次（应用 lifespan 中作为后台任务运行，关闭时取消）"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(executor, export_snapshot, session_factory, root)
+        except Exception as e:
+            logger.error(f"定时快照导出失败: {e}")
@@ -0,0 +1,98 @@
+# src/etf_service/app/services/upload_digest_service.py
+"""
+上传内容去重
+
+- 上传内容在保存/读取时计算 sha256
+- 导入成功（没有失败批次）后在 upload_digest 中记录 sha256 和导入结果，
+  再次上传相同内容时直接返回首次的结果，不再解析和写入
+- 缺少日期、按上传当天补全的文件记录补全日期，只在同一天内视为重复
+"""
+import hashlib
+from datetime import date
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from etf_service.app.logging_config import logger
+from etf_service.app.models.upload_digest import UploadDigest
+from etf_service.config import UPLOAD_DEDUP_ENABLED, UPLOAD_READ_CHUNK_SIZE
+
+
+class DuplicateUploadError(Exception):
+    """上传内容已成功导入过"""
+
+    def __init__(self, digest: UploadDigest):
+        super().__init__(f"文件内容已于 {digest.create_time} 导入（{digest.filename}）")
+        self.digest = digest
+
+
+def sha256_of(raw: BinaryIO) -> Tuple[str, int]:
+    """从当前位置逐块计算 sha256 和字节数，完成后回到原位置"""
+    start = raw.tell()
+    digest, size = hashlib.sha256(), 0
+    for chunk in iter(lambda: raw.read(UPLOAD_READ_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    raw.seek(start)
+    return digest.hexdigest(), size
+
+
+def _duplicate_stmt(sha256: str, today: Optional[date] = None):
+    today = today or date.today()
+    return (
+        select(UploadDigest)
+        .where(
+            UploadDigest.sha256 == sha256,
+            or_(UploadDigest.default_date.is_(None), UploadDigest.default_date == today),
+        )
+        .limit(1)
+    )
+
+
+def find_duplicate(db: Session, sha256: str) -> Optional[UploadDigest]:
+    if not UPLOAD_DEDUP_ENABLED:
+        return None
+    return db.execute(_duplicate_stmt(sha256)).scalar_one_or_none()
+
+
+async def find_duplicate_async(db: AsyncSession, sha256: str) -> Optional[UploadDigest]:
+    if not UPLOAD_DEDUP_ENABLED:
+        return None
+    return (await db.execute(_duplicate_stmt(sha256))).scalar_one_or_none()
+
+
+def record_upload(db: Session, sha256: str, filename: str, size: int, upsert: bool, result: dict) -> None:
+    """导入成功后记录（有失败批次时不记录，重新上传会再次导入）"""
+    if not UPLOAD_DEDUP_ENABLED or result.get("failed_chunks"):
+        return
+    default_date = result.get("default_date")
+    db.add(UploadDigest(
+        sha256=sha256,
+        default_date=date.fromisoformat(default_date) if default_date else None,
+        filename=filename,
+        size=size,
+        upsert=upsert,
+        result=result,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # 相同内容同时上传，另一请求已记录
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"记录上传摘要失败: {e}")
+
+
+def duplicate_result(digest: UploadDigest) -> dict:
+    """重复上传的响应：首次导入的结果加上重复标记"""
+    return {
+        **(digest.result or {}),
+        "duplicate": True,
+        "sha256": digest.sha256,
+        "original_filename": digest.filename,
+        "imported_at": digest.create_time.isoformat() if digest.create_time else None,
+    }
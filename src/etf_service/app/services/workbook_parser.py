@@ -0,0 +1,144 @@
+# src/etf_service/app/services/workbook_parser.py
+"""
+Excel 持仓导出（.xlsx / .xls）的流式读取
+
+- xlsx 用 openpyxl 只读模式逐行读取，不把整个工作簿载入内存；
+  xls（BIFF）无法流式读取，由 xlrd 按需加载工作表（on_demand）
+- 依次在各工作表的前 HEADER_SCAN_ROWS 行中查找包含全部必填列的表头，使用第一个找到的工作表
+- 只保留可识别的列，单元格统一转换为与 txt 相同的字符串，再交给 build_batch 按列校验；
+  百分比格式的数值（0.0523）换算为 5.23，与 txt 导出一致
+"""
+from datetime import date, datetime, time
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from etf_service.app.logging_config import logger
+from etf_service.app.services.holding_parser import COLUMN_MAP, PERCENT_COLUMNS, REQUIRED_COLUMNS
+
+HEADER_SCAN_ROWS = 20
+KNOWN_COLUMNS = ["date"] + list(COLUMN_MAP)
+
+# (工作表名, 原始行迭代器, 单元格 -> 字符串)
+Sheet = Tuple[str, Iterator[tuple], Callable[[object, bool], Optional[str]]]
+
+
+def _number_text(value: float, percent: bool) -> str:
+    if percent:
+        value = round(value * 100, 10)
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _value_text(value, percent: bool) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        return _number_text(value, percent)
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _xlsx_sheets(raw: BinaryIO) -> Iterator[Sheet]:
+    import openpyxl
+
+    def text(cell, percent: bool) -> Optional[str]:
+        fmt = cell.number_format or ""
+        return _value_text(cell.value, percent and "%" in fmt)
+
+    workbook = openpyxl.load_workbook(raw, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            # 部分导出工具写入的 dimension 不准确，忽略它读到工作表末尾
+            sheet.reset_dimensions()
+            yield sheet.title, sheet.iter_rows(), text
+    finally:
+        workbook.close()
+
+
+def _xls_sheets(raw: BinaryIO) -> Iterator[Sheet]:
+    import xlrd
+
+    book = xlrd.open_workbook(file_contents=raw.read(), on_demand=True, formatting_info=True)
+
+    def is_percent(cell) -> bool:
+        xf = book.xf_list[cell.xf_index]
+        fmt = book.format_map.get(xf.format_key)
+        return fmt is not None and "%" in fmt.format_str
+
+    def text(cell, percent: bool) -> Optional[str]:
+        if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+            return None
+        if cell.ctype == xlrd.XL_CELL_DATE:
+            return _value_text(xlrd.xldate_as_datetime(cell.value, book.datemode), False)
+        if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+            return str(bool(cell.value))
+        if cell.ctype == xlrd.XL_CELL_ERROR:
+            return xlrd.error_text_from_code.get(cell.value, "#ERROR")
+        return _value_text(cell.value, percent and is_percent(cell))
+
+    try:
+        for name in book.sheet_names():
+            sheet = book.sheet_by_name(name)
+            yield name, (sheet.row(i) for i in range(sheet.nrows)), text
+            book.unload_sheet(name)
+    finally:
+        book.release_resources()
+
+
+def _find_header(rows: Iterator[tuple], text) -> Optional[Tuple[int, List[Tuple[int, str]]]]:
+    """在前 HEADER_SCAN_ROWS 行中查找表头，返回 (表头行号, [(列序号, 列名)])"""
+    for number in range(1, HEADER_SCAN_ROWS + 1):
+        row = next(rows, None)
+        if row is None:
+            return None
+        names = [(text(cell, False) or "").strip() for cell in row]
+        if all(c in names for c in REQUIRED_COLUMNS):
+            # 同名列取第一个
+            seen = {}
+            for i, name in enumerate(names):
+                if name in KNOWN_COLUMNS and name not in seen:
+                    seen[name] = i
+            return number, [(i, name) for name, i in seen.items()]
+    return None
+
+
+def read_workbook(raw: BinaryIO, fmt: str, chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    逐块读取工作簿中的持仓数据，产出与 read_holding_text 相同的字符串 DataFrame
+    （列为表头中的可识别列，空单元格为 None，跳过空行）；chunksize 为 None 时整表一块
+    """
+    sheets = _xlsx_sheets(raw) if fmt == "xlsx" else _xls_sheets(raw)
+    try:
+        for title, rows, text in sheets:
+            found = _find_header(rows, text)
+            if found is None:
+                continue
+            header_row, columns = found
+            logger.info(f"读取工作表 {title}，表头在第 {header_row} 行")
+            names = [name for _, name in columns]
+            percent = [name in PERCENT_COLUMNS for name in names]
+            chunk: List[list] = []
+            for row in rows:
+                values = [
+                    text(row[i], p) if i < len(row) else None
+                    for (i, _), p in zip(columns, percent)
+                ]
+                if all(v is None or not v.strip() for v in values):
+                    continue
+                chunk.append(values)
+                if chunksize is not None and len(chunk) >= chunksize:
+                    yield pd.DataFrame(chunk, columns=names, dtype=object)
+                    chunk = []
+            if chunk or chunksize is None:
+                yield pd.DataFrame(chunk, columns=names, dtype=object)
+            return
+    finally:
+        sheets.close()
+    raise ValueError(f"缺少必填列: 所有工作表的前 {HEADER_SCAN_ROWS} 行中都没有包含 {', '.join(REQUIRED_COLUMNS)} 的表头")
@@ -5,16 +5,124 @@ import os
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# 异步接口使用的数据库地址，未设置时由 DATABASE_URL 推导（psycopg2 -> asyncpg，sqlite -> aiosqlite）
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# 连接池配置：DB_POOL_SIZE / DB_MAX_OVERFLOW 为异步引擎（API 读写），同步引擎（上传入库）未设置时与之相同
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", DB_POOL_SIZE))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", DB_MAX_OVERFLOW))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", 8000))
+# python -m etf_service serve：worker 进程数（0 为 CPU 核数）、keep-alive 秒数、监听队列长度，
+# 以及关闭时等待进行中请求结束的秒数
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", 5))
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", 2048))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+# 全部 worker 合计可占用的数据库连接数（0 不限制）：serve 启动时据此计算每个 worker 的
+# 连接池大小和 INGEST_WORKERS，覆盖 DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_SYNC_* 的设置
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 0))
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./tmp/uploads")
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+# 流式导入：每批解析/插入的行数，以及每次从上传文件读取的字节数
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 5000))
+UPLOAD_READ_CHUNK_SIZE = int(os.getenv("UPLOAD_READ_CHUNK_SIZE", 1024 * 1024))
+# 批量写入后端：auto（PostgreSQL 用 COPY，其它用 executemany）/ copy / executemany / orm
+BULK_WRITE_BACKEND = os.getenv("BULK_WRITE_BACKEND", "auto")
+INSERT_PAGE_SIZE = int(os.getenv("INSERT_PAGE_SIZE", 1000))
+# 上传解析/入库线程池大小
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+# 后台导入任务：进程池大小，以及单个服务进程内排队+执行中任务的上限（超过返回 429）
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", 2))
+INGEST_JOB_QUEUE_SIZE = int(os.getenv("INGEST_JOB_QUEUE_SIZE", 16))
+# 服务进程刷新自己导入任务心跳的间隔；超过 3 个间隔未刷新的未完成任务标记为 failed
+INGEST_JOB_HEARTBEAT_SECONDS = int(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", 30))
+# 图表/证券代码接口响应缓存（进程内 LRU，按条目数限制）
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+# 上传去重：内容相同（sha256）且已成功导入的文件直接返回上次的结果
+UPLOAD_DEDUP_ENABLED = os.getenv("UPLOAD_DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+# 解析结果磁盘缓存（UPLOAD_DIR/parsed），超过 PARSED_CACHE_MAX_BYTES 时淘汰最久未使用的文件
+PARSED_CACHE_ENABLED = os.getenv("PARSED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PARSED_CACHE_MAX_BYTES = int(os.getenv("PARSED_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# 热点证券时间序列的进程内存储（列式数组，按内存预算 LRU 淘汰），启动时预热
+SERIES_STORE_ENABLED = os.getenv("SERIES_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+SERIES_STORE_MAX_BYTES = int(os.getenv("SERIES_STORE_MAX_BYTES", 256 * 1024 * 1024))
+SERIES_STORE_WARM = os.getenv("SERIES_STORE_WARM", "true").lower() in ("1", "true", "yes")
+# 批量图表接口：默认/最大返回点数（每个证券）和单次请求的证券数上限
+CHART_DEFAULT_POINTS = int(os.getenv("CHART_DEFAULT_POINTS", 500))
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 5000))
+CHART_MAX_CODES = int(os.getenv("CHART_MAX_CODES", 50))
+# holding_record 的 Parquet 快照目录（需要 pyarrow）；SNAPSHOT_INTERVAL_SECONDS > 0 时服务进程定时增量导出
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./tmp/snapshots")
+SNAPSHOT_COMPRESSION = os.getenv("SNAPSHOT_COMPRESSION", "snappy")
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("SNAPSHOT_INTERVAL_SECONDS", 0))
+SNAPSHOT_MAX_ROWS = int(os.getenv("SNAPSHOT_MAX_ROWS", 1_000_000))
+# 导入时按 持仓数量、成本价、最新价 和上一持仓日记录核对盈亏/市值/仓位字段：
+# off 不核对 / flag 只补全空值并记录不一致 / correct 同时把不一致的值改为计算值
+RECONCILE_MODE = os.getenv("RECONCILE_MODE", "flag").lower()
+# 金额容差 = ABS + REL × |最新市值|；比例字段（%）的容差为百分点
+RECONCILE_ABS_TOLERANCE = float(os.getenv("RECONCILE_ABS_TOLERANCE", 0.01))
+RECONCILE_REL_TOLERANCE = float(os.getenv("RECONCILE_REL_TOLERANCE", 0.002))
+RECONCILE_RATIO_TOLERANCE = float(os.getenv("RECONCILE_RATIO_TOLERANCE", 0.1))
+# 上一持仓日最多向前查找的天数（覆盖长假）
+RECONCILE_LOOKBACK_DAYS = int(os.getenv("RECONCILE_LOOKBACK_DAYS", 15))
+# 导入事件推送（SSE）：local 为进程内，多 worker 部署用 postgres（LISTEN/NOTIFY）；
+# 每个连接的事件队列长度、心跳间隔，以及单个连接的最长时间（到期后浏览器自动重连）
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "local").lower()
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+EVENT_HEARTBEAT_SECONDS = int(os.getenv("EVENT_HEARTBEAT_SECONDS", 15))
+EVENT_STREAM_MAX_SECONDS = int(os.getenv("EVENT_STREAM_MAX_SECONDS", 300))
+# 网格回测默认手续费率（双边，按成交额）和初始资金
+GRID_FEE_RATE = float(os.getenv("GRID_FEE_RATE", 0.0003))
+GRID_INITIAL_CAPITAL = float(os.getenv("GRID_INITIAL_CAPITAL", 100_000))
+# 响应压缩：不小于 COMPRESSION_MIN_SIZE 字节的文本类响应按 Accept-Encoding 压缩（br 需要安装 brotli）
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+# 静态文件（HTML 除外）的浏览器缓存时间；STATIC_PRECOMPRESS 为 true 时启动时生成 .gz / .br 预压缩文件
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 7 * 24 * 3600))
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "true").lower() in ("1", "true", "yes")
+# 日志：json 每条一行 JSON，text 为单行文本；服务进程内日志异步写出，队列满时丢弃；
+# 带 sample_key 的高频日志每 LOG_SAMPLE_SECONDS 秒最多输出一条（0 不限流）
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_SAMPLE_SECONDS = float(os.getenv("LOG_SAMPLE_SECONDS", 10))
+# /metrics 指标端点；请求耗时超过 SLOW_REQUEST_MS 毫秒时输出带各阶段耗时的慢请求日志（0 关闭）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 1000))
 
 # 可选：用于测试或调试
 if __name__ == "__main__":
     print("✅ Configuration loaded:")
     print(f"DATABASE_URL: {DATABASE_URL}")
+    print(f"ASYNC_DATABASE_URL: {ASYNC_DATABASE_URL}")
+    print(f"DB_POOL_SIZE: {DB_POOL_SIZE} (+{DB_MAX_OVERFLOW} overflow)")
+    print(f"DB_SYNC_POOL_SIZE: {DB_SYNC_POOL_SIZE} (+{DB_SYNC_MAX_OVERFLOW} overflow)")
+    print(f"DB_MAX_CONNECTIONS: {DB_MAX_CONNECTIONS}")
     print(f"APP_HOST: {APP_HOST}")
     print(f"APP_PORT: {APP_PORT}")
+    print(f"WEB_WORKERS: {WEB_WORKERS} (keep-alive {WEB_KEEPALIVE}s, backlog {WEB_BACKLOG}, graceful {WEB_GRACEFUL_TIMEOUT}s)")
     print(f"UPLOAD_DIR: {UPLOAD_DIR}")
-    print(f"MAX_UPLOAD_SIZE: {MAX_UPLOAD_SIZE} bytes")
\ No newline at end of file
+    print(f"MAX_UPLOAD_SIZE: {MAX_UPLOAD_SIZE} bytes")
+    print(f"INGEST_BATCH_SIZE: {INGEST_BATCH_SIZE} rows")
+    print(f"UPLOAD_READ_CHUNK_SIZE: {UPLOAD_READ_CHUNK_SIZE} bytes")
+    print(f"BULK_WRITE_BACKEND: {BULK_WRITE_BACKEND}")
+    print(f"UPLOAD_DEDUP_ENABLED: {UPLOAD_DEDUP_ENABLED}")
+    print(f"PARSED_CACHE_ENABLED: {PARSED_CACHE_ENABLED} (max {PARSED_CACHE_MAX_BYTES} bytes)")
+    print(f"INGEST_JOB_WORKERS: {INGEST_JOB_WORKERS} (queue {INGEST_JOB_QUEUE_SIZE}, heartbeat {INGEST_JOB_HEARTBEAT_SECONDS}s)")
+    print(f"SERIES_STORE_ENABLED: {SERIES_STORE_ENABLED} (max {SERIES_STORE_MAX_BYTES} bytes, warm {SERIES_STORE_WARM})")
+    print(f"CHART_DEFAULT_POINTS: {CHART_DEFAULT_POINTS} (max {CHART_MAX_POINTS}, {CHART_MAX_CODES} codes)")
+    print(f"SNAPSHOT_DIR: {SNAPSHOT_DIR} ({SNAPSHOT_COMPRESSION}, every {SNAPSHOT_INTERVAL_SECONDS}s)")
+    print(f"RECONCILE_MODE: {RECONCILE_MODE} (abs {RECONCILE_ABS_TOLERANCE}, rel {RECONCILE_REL_TOLERANCE}, ratio {RECONCILE_RATIO_TOLERANCE}pp)")
+    print(f"EVENT_BACKEND: {EVENT_BACKEND} (queue {EVENT_QUEUE_SIZE}, heartbeat {EVENT_HEARTBEAT_SECONDS}s)")
+    print(f"GRID_FEE_RATE: {GRID_FEE_RATE} (initial capital {GRID_INITIAL_CAPITAL})")
+    print(f"COMPRESSION_ENABLED: {COMPRESSION_ENABLED} (min {COMPRESSION_MIN_SIZE} bytes, gzip {GZIP_LEVEL}, br {BROTLI_QUALITY})")
+    print(f"LOG_LEVEL: {LOG_LEVEL} ({LOG_FORMAT}, queue {LOG_QUEUE_SIZE}, sample {LOG_SAMPLE_SECONDS}s)")
+    print(f"METRICS_ENABLED: {METRICS_ENABLED} (slow request {SLOW_REQUEST_MS} ms)")
\ No newline at end of file
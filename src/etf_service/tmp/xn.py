@@ -1,6 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from etf_service.app.services.grid_backtest import grid_levels
+
 def draw_shannon_grid(init_price: float,
                       grid_percent: float = 0.05,
                       n_levels_up: int = 10,
@@ -13,16 +15,8 @@ def draw_shannon_grid(init_price: float,
     绘制香农半仓网格线（仅画线，不计算持仓）。
     """
 
-    # === 计算网格线价格 ===
-    if multiplicative:
-        ks = np.arange(-n_levels_down, n_levels_up + 1)
-        levels = init_price * (1 + grid_percent) ** ks
-    else:
-        step = init_price * grid_percent
-        ks = np.arange(-n_levels_down, n_levels_up + 1)
-        levels = init_price + ks * step
-
-    levels = np.sort(levels)
+    # === 计算网格线价格（回测使用同一套网格，见 app/services/grid_backtest.py） ===
+    levels = grid_levels(init_price, grid_percent, n_levels_up, n_levels_down, multiplicative)
 
     # === 创建图 ===
     fig, ax = plt.subplots(figsize=figsize)
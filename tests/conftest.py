@@ -0,0 +1,15 @@
+# tests/conftest.py
+"""
+测试在临时目录中的 SQLite 数据库上运行（同步引擎 pysqlite，异步接口 aiosqlite）；
+config 在导入时读取环境变量，必须在导入 etf_service 之前设置（覆盖 .env 中的设置）
+"""
+import os
+import tempfile
+
+_WORKDIR = tempfile.mkdtemp(prefix="etf_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["UPLOAD_DIR"] = os.path.join(_WORKDIR, "uploads")
+os.environ["EVENT_BACKEND"] = "local"
+os.environ["SNAPSHOT_INTERVAL_SECONDS"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,176 @@
+# tests/test_api.py
+"""
+接口测试：TestClient 执行应用 lifespan，异步接口经 aiosqlite 访问临时 SQLite 数据库
+覆盖单条插入、同步 / 流式 / 后台任务上传、按内容去重和遗留任务回收
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+RECORD = {
+    "date": "2024-01-02", "证券代码": "510300", "证券名称": "沪深300ETF", "持仓数量": 1000, "可用数量": 1000,
+    "成本价": 3.5, "最新价": 3.6, "股东账号": "A123456789",
+}
+HEADER = "证券代码\t证券名称\t持仓数量\t可用数量\t成本价\t最新价\t股东账号\tdate"
+ROWS = [
+    "510300\t沪深300ETF\t1000\t1000\t3.5\t3.6\tA123456789\t2024-01-02",
+    "510300\t沪深300ETF\t1200\t1200\t3.5\t3.7\tA123456789\t2024-01-03",
+    "510500\t中证500ETF\t500\t500\t6.1\t6.0\tA123456789\t2024-01-02",
+]
+JOB_TIMEOUT_SECONDS = 60
+
+
+def holding_file(rows, name: str = "holding.txt") -> dict:
+    return {"file": (name, ("\n".join([HEADER, *rows]) + "\n").encode("utf-8"))}
+
+
+def reset_database() -> None:
+    from etf_service.app.cache import response_cache
+    from etf_service.app.database.base import Base
+    from etf_service.app.database.session import engine
+    from etf_service.app.models import holding_record, ingest_job, portfolio_summary, upload_digest  # noqa: F401
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    response_cache.clear()
+
+
+@pytest.fixture(scope="module")
+def client():
+    from etf_service.app.main import app
+
+    reset_database()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def clean_database(client):
+    reset_database()
+
+
+def upload(client, rows, **params):
+    params.setdefault("background", "false")
+    return client.post("/api/v1/holding/upload", params=params, files=holding_file(rows))
+
+
+def wait_for_job(client, status_url: str) -> dict:
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        job = client.get(status_url).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.1)
+    pytest.fail(f"导入任务 {JOB_TIMEOUT_SECONDS}s 内未结束: {job}")
+
+
+def test_ready(client):
+    assert client.get("/ready").json() == {"status": "ok"}
+
+
+def test_create_holding(client):
+    response = client.post("/api/v1/holding/", json=RECORD)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] > 0
+    assert body["证券代码"] == RECORD["证券代码"]
+    assert client.get("/api/v1/holding/security-codes").json() == ["510300"]
+
+
+def test_upload_sync(client):
+    response = upload(client, ROWS)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted_count"] == 3
+    assert result["failed_count"] == 0
+    chart = client.get("/api/v1/holding/chart/510300").json()
+    assert [row["holding_qty"] for row in chart] == [1000, 1200]
+
+
+def test_upload_sync_upsert_counts(client):
+    upload(client, ROWS)
+    # 2024-01-03 只有一条持仓，改价不影响同日其它持仓的仓位占比；批次内重复的行保留最后一条
+    changed = [ROWS[0], ROWS[1].replace("\t3.7\t", "\t3.8\t"), ROWS[2], ROWS[0]]
+    result = upload(client, changed).json()
+    assert result["inserted_count"] == 0
+    assert result["updated_count"] == 1
+    assert result["unchanged_count"] == 2
+    assert result["duplicates_in_batch_count"] == 1
+
+
+def test_upload_stream(client):
+    response = upload(client, ROWS, stream="true")
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted_count"] == 3
+    assert result["failed_chunks"] == []
+    assert sorted(client.get("/api/v1/holding/security-codes").json()) == ["510300", "510500"]
+
+
+def test_upload_reports_unparsable_rows(client):
+    result = upload(client, ROWS + ["abc\t坏数据\tx\t1\t1\t1\tA123456789\t2024-01-02"], stream="true").json()
+    assert result["inserted_count"] == 3
+    assert result["failed_count"] == 1
+    assert {error["row"] for error in result["errors"]} == {4}
+
+
+def test_upload_background(client):
+    response = upload(client, ROWS, background="true")
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["status_url"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["result"]["inserted_count"] == 3
+    assert job["processed_rows"] == 3
+    assert client.get("/api/v1/holding/chart/510500").json()[0]["holding_qty"] == 500
+
+
+def test_recover_orphaned_jobs(client):
+    from etf_service.app.database.session import SessionLocal
+    from etf_service.app.models.ingest_job import IngestJob
+    from etf_service.app.services import ingest_job_service
+
+    me = ingest_job_service._owner()
+    host, pid, _ = me.split(":")
+    now = datetime.now(timezone.utc)
+    stale = now - ingest_job_service.HEARTBEAT_TIMEOUT - timedelta(seconds=1)
+    jobs = {
+        # 容器重启后新进程沿用了旧进程的主机名和 pid，只有启动标识不同
+        "reused_pid": (f"{host}:{pid}:000000000000", stale),
+        "no_owner": (None, None),
+        "alive": ("other-host:1:000000000000", now),
+        "mine": (me, stale),
+    }
+    with SessionLocal() as db:
+        for job_id, (owner, heartbeat_at) in jobs.items():
+            db.add(IngestJob(
+                id=job_id, filename="holding.txt", path="/nonexistent", upsert=True,
+                status="running", processed_rows=0, owner=owner, heartbeat_at=heartbeat_at,
+            ))
+        db.commit()
+
+    assert client.portal.call(ingest_job_service.recover_orphaned_jobs) == 2
+    status = {job_id: client.get(f"/api/v1/holding/jobs/{job_id}").json()["status"] for job_id in jobs}
+    assert status == {"reused_pid": "failed", "no_owner": "failed", "alive": "running", "mine": "running"}
+
+
+def test_upload_duplicate_content(client):
+    first = upload(client, ROWS).json()
+    second = upload(client, ROWS).json()
+    assert second["duplicate"] is True
+    assert second["inserted_count"] == first["inserted_count"] == 3
+
+    # 后台上传同样在入队前去重，不创建任务
+    queued = upload(client, ROWS, background="true")
+    assert queued.status_code == 200
+    assert queued.json()["duplicate"] is True
+
+    forced = upload(client, ROWS, force="true").json()
+    assert "duplicate" not in forced
+    assert forced["unchanged_count"] == 3
+
+
+def test_upload_rejects_unknown_suffix(client):
+    response = client.post("/api/v1/holding/upload", files=holding_file(ROWS, name="holding.csv"))
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+# tests/test_grid_backtest.py
+"""
+向量化网格回测与逐日模拟对照：随机游走价格上比较网格状态、权益曲线、成交明细和手续费
+"""
+import math
+
+import numpy as np
+import pytest
+
+from etf_service.app.services.grid_backtest import grid_coordinates, grid_state, param_grid, run_sweep
+
+FEE_RATE = 0.0003
+CAPITAL = 100_000.0
+
+
+def random_walk(seed: int, steps: int = 300, sigma: float = 0.03) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 3.0 * np.exp(np.cumsum(np.r_[0.0, rng.normal(0, sigma, steps - 1)]))
+
+
+def naive_states(x: np.ndarray, levels: int) -> list:
+    """逐日推进网格状态：价格越过上次成交所在网格的相邻网格线时移动到最近的网格线（限制在 ±levels）"""
+    m, states = 0, [0]
+    for xt in x[1:]:
+        lo = max(-levels, min(levels, math.floor(xt)))
+        hi = max(-levels, min(levels, math.ceil(xt)))
+        m = min(max(m, lo), hi)
+        states.append(m)
+    return states
+
+
+def naive_backtest(prices: np.ndarray, states: list, fee_rate: float, capital: float):
+    """逐笔调仓：每次成交后股票市值等于扣除手续费后的现金，返回权益曲线和成交明细"""
+    p0 = prices[0]
+    qty = capital / (2 + fee_rate) / p0
+    cash = capital - qty * p0 * (1 + fee_rate)
+    trades = [{"side": "buy", "price": p0, "quantity": qty, "level": 0, "fee": qty * p0 * fee_rate}]
+    equity = [cash + qty * p0]
+    for t in range(1, len(prices)):
+        price = prices[t]
+        if states[t] != states[t - 1]:
+            gap = cash - qty * price
+            value = gap / (2 + fee_rate) if gap > 0 else gap / (2 - fee_rate)
+            fee = abs(value) * fee_rate
+            qty += value / price
+            cash -= value + fee
+            trades.append({
+                "side": "buy" if value > 0 else "sell", "price": price,
+                "quantity": abs(value) / price, "level": states[t], "fee": fee,
+            })
+        equity.append(cash + qty * price)
+    return np.array(equity), trades
+
+
+PARAMS = param_grid([0.01, 0.03, 0.05], [1, 3, 10], [True, False])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_state_matches_naive_loop(seed):
+    prices = random_walk(seed)
+    x = grid_coordinates(prices, PARAMS)
+    state = grid_state(x, np.array([p.levels for p in PARAMS]))
+    for i, params in enumerate(PARAMS):
+        assert state[i].tolist() == naive_states(x[i], params.levels), params
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_sweep_matches_naive_backtest(seed):
+    prices = random_walk(seed)
+    result = run_sweep(prices, PARAMS, fee_rate=FEE_RATE, initial_capital=CAPITAL)
+    x = grid_coordinates(prices, PARAMS)
+    for i, params in enumerate(PARAMS):
+        states = naive_states(x[i], params.levels)
+        equity, trades = naive_backtest(prices, states, FEE_RATE, CAPITAL)
+        assert result.level[i].tolist() == states
+        np.testing.assert_allclose(result.equity[i], equity, rtol=1e-9)
+
+        got = result.trades(i)
+        assert [t["side"] for t in got] == [t["side"] for t in trades]
+        assert [t["level"] for t in got] == [t["level"] for t in trades]
+        for key in ("price", "quantity", "fee"):
+            np.testing.assert_allclose([t[key] for t in got], [t[key] for t in trades], rtol=1e-9)
+        assert result.summary().loc[i, "trade_count"] == len(trades) - 1
+
+
+@pytest.mark.parametrize("levels", [32767, 32768, 40000])
+def test_grid_state_beyond_int16_levels(levels):
+    # 等差网格间距 1e-5：价格偏离首日 ±50% 时网格坐标约 ±50000，超出 int16 范围
+    prices = np.linspace(1.0, 1.5, 50).tolist() + np.linspace(1.5, 0.5, 100).tolist()
+    prices = np.array(prices) * np.exp(np.random.default_rng(levels).normal(0, 0.01, len(prices)))
+    params = param_grid([1e-5], [levels], [False])
+    x = grid_coordinates(prices, params)
+    expected = naive_states(x[0], levels)
+    assert max(abs(m) for m in expected) == levels
+    assert grid_state(x, np.array([levels]))[0].tolist() == expected
+
+    result = run_sweep(prices, params, fee_rate=FEE_RATE, initial_capital=CAPITAL)
+    equity, _ = naive_backtest(prices, expected, FEE_RATE, CAPITAL)
+    np.testing.assert_allclose(result.equity[0], equity, rtol=1e-9)
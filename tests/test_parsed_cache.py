@@ -0,0 +1,84 @@
+# tests/test_parsed_cache.py
+"""解析缓存出错（条目被其它进程同时淘汰、磁盘写入失败）时不影响导入"""
+import os
+
+import pandas as pd
+import pytest
+
+from etf_service.app.services import parsed_cache as module
+from etf_service.app.services.holding_parser import HoldingBatch
+from etf_service.app.services.parsed_cache import ParsedBatchCache
+
+
+def batch(rows: int = 1000) -> HoldingBatch:
+    return HoldingBatch(frame=pd.DataFrame({"security_code": range(rows), "latest_price": 1.5}), total_rows=rows)
+
+
+def store(cache: ParsedBatchCache, sha256: str) -> None:
+    writer = cache.writer(sha256)
+    writer.add(batch())
+    writer.commit()
+
+
+def test_round_trip(tmp_path):
+    cache = ParsedBatchCache(str(tmp_path), max_bytes=1 << 30)
+    store(cache, "a")
+    parts = list(cache.get("a"))
+    assert len(parts) == 1
+    assert parts[0].total_rows == 1000
+
+
+def test_evict_skips_entries_removed_concurrently(tmp_path, monkeypatch):
+    cache = ParsedBatchCache(str(tmp_path), max_bytes=1 << 30)
+    for sha256 in ("a", "b", "c"):
+        store(cache, sha256)
+    vanished = cache.path(cache.key("b"))
+    scandir = os.scandir
+
+    def racing_scandir(path="."):
+        if path == vanished:
+            raise FileNotFoundError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(module.os, "scandir", racing_scandir)
+    cache.max_bytes = 1
+    cache.evict()
+    assert cache.get("a") is None and cache.get("c") is None
+
+
+def test_commit_ignores_eviction_errors(tmp_path, monkeypatch):
+    cache = ParsedBatchCache(str(tmp_path), max_bytes=1 << 30)
+
+    def broken_evict():
+        raise FileNotFoundError("entry removed by another worker")
+
+    monkeypatch.setattr(cache, "evict", broken_evict)
+    store(cache, "a")
+    assert cache.get("a") is not None
+
+
+def test_write_failure_abandons_entry(tmp_path, monkeypatch):
+    cache = ParsedBatchCache(str(tmp_path), max_bytes=1 << 30)
+    writer = cache.writer("a")
+
+    def disk_full(frame, path):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(module, "_write_part", disk_full)
+    writer.add(batch())
+    writer.add(batch())
+    writer.commit()
+    assert cache.get("a") is None
+    assert not os.path.exists(writer.tmp_dir)
+
+
+@pytest.mark.parametrize("entry_removed", [True, False])
+def test_get_after_concurrent_eviction(tmp_path, monkeypatch, entry_removed):
+    cache = ParsedBatchCache(str(tmp_path), max_bytes=1 << 30)
+    store(cache, "a")
+    if entry_removed:
+        def removed(path, *args, **kwargs):
+            raise FileNotFoundError(path)
+
+        monkeypatch.setattr(module.os, "utime", removed)
+    assert (cache.get("a") is None) == entry_removed
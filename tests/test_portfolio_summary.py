@@ -0,0 +1,19 @@
+# tests/test_portfolio_summary.py
+import pytest
+
+from etf_service.__main__ import main
+from etf_service.app.services.portfolio_summary_service import rebuild_summary
+
+
+@pytest.mark.parametrize("chunk_days", [0, -1])
+def test_rebuild_summary_rejects_non_positive_chunk_days(chunk_days):
+    with pytest.raises(ValueError):
+        rebuild_summary(None, chunk_days=chunk_days)
+
+
+@pytest.mark.parametrize("chunk_days", ["0", "-3", "x"])
+def test_cli_rejects_non_positive_chunk_days(chunk_days, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["rebuild-summary", "--chunk-days", chunk_days])
+    assert exc.value.code == 2
+    assert "--chunk-days" in capsys.readouterr().err
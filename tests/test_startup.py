@@ -0,0 +1,90 @@
+# tests/test_startup.py
+"""
+应用启动预算：在全新的子进程中导入 etf_service.app.main，检查
+
+- 导入耗时（多次取中位数）和进程峰值 RSS 不超过预算（STARTUP_MAX_SECONDS / STARTUP_MAX_RSS_MB 可覆盖）
+- 导入后没有加载 pandas / numpy / matplotlib / 数据库驱动
+- 导入后没有创建数据库引擎，也没有启动额外线程
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+MAX_SECONDS = float(os.getenv("STARTUP_MAX_SECONDS", 1.5))
+MAX_RSS_MB = float(os.getenv("STARTUP_MAX_RSS_MB", 120))
+RUNS = 5
+
+# 应用导入阶段不应加载的模块（在首次使用时按需加载）
+LAZY_MODULES = ["pandas", "numpy", "matplotlib", "openpyxl", "xlrd", "psycopg2", "asyncpg", "aiosqlite"]
+
+# 峰值 RSS 优先取 /proc/self/status 的 VmHWM：Linux 上 ru_maxrss 在 fork / exec 后保留父进程的峰值，
+# 从已加载 pandas 的 pytest 进程启动时会偏大
+PROBE = """
+import json, resource, sys, threading, time
+start = time.perf_counter()
+import etf_service.app.main
+elapsed = time.perf_counter() - start
+from etf_service.app.database import session
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": peak_rss_mb(),
+    "loaded": [m for m in %r if m in sys.modules],
+    "engines": sorted(session._engines),
+    "threads": [t.name for t in threading.enumerate() if t is not threading.main_thread()],
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    # 导入阶段不连接数据库，给一个占位地址即可
+    env["DATABASE_URL"] = "sqlite:///:memory:"
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def probes():
+    return [probe() for _ in range(RUNS)]
+
+
+def test_import_time_within_budget(probes):
+    seconds = statistics.median(r["seconds"] for r in probes)
+    assert seconds <= MAX_SECONDS, f"导入耗时 {seconds:.3f}s 超过预算 {MAX_SECONDS}s"
+
+
+def test_peak_rss_within_budget(probes):
+    rss = max(r["rss_mb"] for r in probes)
+    assert rss <= MAX_RSS_MB, f"峰值 RSS {rss:.1f} MB 超过预算 {MAX_RSS_MB} MB"
+
+
+def test_heavy_modules_not_loaded(probes):
+    assert probes[-1]["loaded"] == []
+
+
+def test_no_engines_created(probes):
+    assert probes[-1]["engines"] == []
+
+
+def test_no_threads_started(probes):
+    assert probes[-1]["threads"] == []